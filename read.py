@@ -5,22 +5,33 @@ read.py
 """
 from __future__ import annotations
 
+import argparse
 import json
 import logging
 from pathlib import Path
 from typing import Dict, List
 
-import pandas as pd
-
-
 from 股票.function import (
     stock_end,
     stock_cache,
-    
+    http_client,
+    http_cache,
+    rate_limiter,
+    excel_utils,
+    symbol_reader,
+    code_table,
+    etf_classifier,
+    instrumentation,
+    profiler,
+    vcr,
 )
 from 股票.function.realtime_market import RealtimeMarket
 from 股票.function.excel_utils import ExcelSession
 from 股票.function.stock_add_sheet import ensure_code_sheets
+from 股票.function.freshness import FreshnessStore
+from 股票.function.snapshot_store import SnapshotStore
+from 股票.function.results_store import ResultsStore
+from 股票.function.market_tables import MarketTables
 
 # ──────────────────────────────
 # 1. 設定與常數
@@ -28,14 +39,18 @@ from 股票.function.stock_add_sheet import ensure_code_sheets
 CONFIG_PATH = Path("setting.json")
 
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[logging.StreamHandler()],
-)
 logger = logging.getLogger(__name__)
 
 
+def setup_logging() -> None:
+    """只在以程式進入點執行時設定根 logger；被匯入（測試、基準）時不改動呼叫端的設定。"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[logging.StreamHandler()],
+    )
+
+
 # ──────────────────────────────
 # 2. 公用工具
 # ──────────────────────────────
@@ -44,9 +59,9 @@ def load_config(path: Path = CONFIG_PATH) -> Dict:
         return json.load(fp)
 
 
-def read_symbols(file: str, sheet: str) -> List[str]:
-    df = pd.read_excel(file, sheet)
-    return df.iloc[:, 1].astype(str).tolist()
+def read_symbols(file: str, sheet: str, cache_path: str | None = ".cache/symbols.json") -> List[str]:
+    """讀取檔 B 欄的代碼；檔案未變動時直接用快取（見 symbol_reader）。"""
+    return symbol_reader.read_symbols(file, sheet, cache_path)
 
 
 def symbols_match_config(symbols: List[str], codes_cfg: Dict[str, bool]) -> bool:
@@ -64,46 +79,116 @@ class FatalError(Exception):
 
 
 
-def run() -> None:
+def _configure(cfg: Dict) -> None:
+    """依 setting.json 設定各模組的共用實例。"""
+    http_client.configure(**cfg.get("http", {}))   # 共用連線池（keep-alive / 壓縮 / HTTP2）
+    rate_limiter.configure(**cfg.get("rate_limit", {}))   # 每 host 令牌桶＋AIMD
+    vcr.configure(**cfg.get("vcr", {}))                   # 錄製 / 重播所有回應（off = 照常連網）
+    instrumentation.configure(**cfg.get("instrumentation", {}))   # 延遲 / bytes / 重試 / 解析時間
+    # 頁面快取（TTL＋條件式 GET）；錄製 / 重播時停用，每個請求都經過錄影帶
+    http_cache.configure(**(cfg.get("cache", {}) if vcr.active() is None else {"enabled": False}))
+    stock_end.configure_parser(**cfg.get("parser", {}))   # lxml＋只解析需要的元素
+    excel_utils.configure(cfg.get("excel_backend", "xlwings"))   # openpyxl = 不需要 Excel
+    code_table.configure(**cfg.get("code_table", {}))
+    code_table.get_table().refresh_if_stale()             # 本機代碼表過期才在背景更新
+    etf_classifier.configure(**cfg.get("etf", {}))        # ETF 判斷：代碼表 → 已存結果 → API
+
+
+def run(profile: str | None = None) -> None:
+    """profile：timing / cprofile / sample 時開啟分段剖析（覆寫 setting.json 的 "profile" 區塊）。"""
     cfg = load_config()
-    symbols = read_symbols(cfg["read_file"], cfg["read_sheet"])
+    prof_cfg = dict(cfg.get("profile", {}))
+    if profile:
+        prof_cfg.update(enabled=True, mode=profile)
+    prof = profiler.configure(**prof_cfg)   # 各階段 wall / CPU / 記憶體峰值，見 profiler
+    with prof.stage("configure"):
+        _configure(cfg)
+    with prof.stage("read_symbols"):
+        symbols = read_symbols(cfg["read_file"], cfg["read_sheet"],
+                               cfg.get("symbols_cache", ".cache/symbols.json"))
 
     # 若 symbols 不在設定檔 code 區塊，嘗試更新後重新載入
     if not symbols_match_config(symbols, cfg["code"]):
         logger.info("symbols 與設定檔不一致，執行 stock_cache.update_code_section()")
-        stock_cache.update_code_section(symbols)
-        cfg = load_config()  # 熱重載
+        with prof.stage("code_update"):
+            stock_cache.update_code_section(symbols)
+            cfg = load_config()  # 熱重載
         have_changed = True
     else:
         have_changed = False
         print("symbols 與設定檔一致，無需更新")
     
-    # 1. 歷史資料
-    with ExcelSession(cfg["write_file"], cfg["write_sheet"]) as xls_hist:
+    # 結果資料庫：啟用時同時負責檢查點（取代 snapshot 的 SnapshotStore）
+    res_cfg = dict(cfg.get("results", {}))
+    results = ResultsStore(**res_cfg) if res_cfg.pop("enabled", False) else None
+
+    # 1. 歷史資料（history 含開啟 / 存檔活頁簿，子階段不含）
+    with prof.stage("history"), ExcelSession(cfg["write_file"], cfg["write_sheet"]) as xls_hist:
         if have_changed:
-            ensure_code_sheets(xls_hist,symbols )
+            with prof.stage("sheets"):
+                ensure_code_sheets(xls_hist,symbols )
 
         try:
             logger.info("更新歷史資料 …")
-            stock_end.update_data_parallel(xls_hist, cfg["code"])
+            columns = cfg.get("columns") or None     # 空清單 = 全部欄位
+            inc_cfg = dict(cfg.get("incremental", {}))
+            freshness = FreshnessStore(**inc_cfg) if inc_cfg.pop("enabled", False) else None
+            snap_cfg = dict(cfg.get("snapshot", {}))
+            resume = snap_cfg.pop("resume", False)
+            if results is not None:
+                snapshots = results if snap_cfg.pop("enabled", True) else None
+            else:
+                snapshots = SnapshotStore(**snap_cfg) if snap_cfg.pop("enabled", True) else None
+            bulk_cfg = dict(cfg.get("bulk", {}))
+            bulk = MarketTables(**bulk_cfg) if bulk_cfg.pop("enabled", True) else None
+            with prof.stage("crawl"):
+                if cfg.get("engine", "thread") == "async":
+                    from 股票.function import async_engine   # 只有 async 引擎需要載入 asyncio
+                    async_engine.update_data_async(xls_hist, cfg["code"], columns=columns,
+                                                   freshness=freshness, snapshots=snapshots,
+                                                   resume=resume, bulk=bulk,
+                                                   max_workers=cfg.get("max_workers", 24),
+                                                   **cfg.get("async", {}))
+                else:
+                    stock_end.update_data_parallel(xls_hist, cfg["code"],
+                                                   max_workers=cfg.get("max_workers", 24),
+                                                   columns=columns, freshness=freshness,
+                                                   snapshots=snapshots, resume=resume, bulk=bulk)
+            if results is not None:
+                with prof.stage("compact"):
+                    results.compact()                   # 今天的數值指標建成欄式分區
         except Exception as exc:  # pylint: disable=broad-except
-            raise FatalError("更新歷史資料失敗") from exc
+            raise FatalError("更新歷史資料失敗（已完成的股票已存入快照，"
+                             "setting.json 設 snapshot.resume=true 可續跑）") from exc
 
     
 
-    # 2. 收盤後最後一次拉即時 & 分類
-    RealtimeMarket(
-        codes=symbols,
-        xls_path=cfg["write_file"],
-        sheet_name=cfg["write_sheet"],
-        auto_close=cfg["excel_auto_close"],
-        have_changed=have_changed,
-    ).run()
+    # 2. 收盤後最後一次拉即時 & 分類（子階段見 RealtimeMarket.run）
+    with prof.stage("market"):
+        RealtimeMarket(
+            codes=symbols,
+            xls_path=cfg["write_file"],
+            sheet_name=cfg["write_sheet"],
+            auto_close=cfg["excel_auto_close"],
+            have_changed=have_changed,
+            results=results,
+            **cfg.get("realtime", {}),          # chunk_size / max_workers：批次即時報價
+        ).run()
     
 
+    http_cache.log_report()
+    etf_classifier.get_classifier().log_summary()
+    metrics = instrumentation.get_metrics()
+    metrics.log_summary()   # 最慢的代碼 / 指標，並輸出 JSON 與 Prometheus 報告
+    vcr.close()
+
     if cfg.get("save"):
         import 股票.save_as as save_as  # 避免循環匯入
-        save_as.save_as(cfg["read_file"])
+        with prof.stage("save_as"):
+            save_as.save_as(cfg["read_file"])
+
+    # 抓取 / 解析 / 擷取的累計秒數一併寫入，判斷 crawl 的時間花在網路還是解析
+    prof.finish({"metrics": metrics.totals()} if metrics.enabled else None)
 
     if cfg.get("ending_wait"):
         input("流程完畢，按任意鍵結束…")
@@ -112,9 +197,18 @@ def run() -> None:
 # ──────────────────────────────
 # 4. 進入點
 # ──────────────────────────────
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="更新歷史資料、收盤即時報價與分類")
+    parser.add_argument("--profile", nargs="?", const="timing", choices=profiler.MODES, default=None,
+                        help="分段剖析：timing（預設）/ cprofile / sample，輸出到 .cache/profile/")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    setup_logging()
+    args = parse_args()
     try:
-        run()
+        run(profile=args.profile)
     except FatalError as exc:
         logger.error("致命錯誤：%s", exc)
     except KeyboardInterrupt:
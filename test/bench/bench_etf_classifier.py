@@ -0,0 +1,74 @@
+"""
+新增 50 檔代碼的 ETF 判斷：逐檔查 Yahoo（舊 is_etf）vs etf_classifier（代碼表 → 已存結果 → 同時查詢）。
+
+用法：
+    python test/bench/bench_etf_classifier.py            # 假的 Yahoo 回應，每次請求延遲 0.2s
+    python test/bench/bench_etf_classifier.py --live     # 實際連線
+"""
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 讓本模組可以從 CLI 執行
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+# ──────────────────────────────
+from 股票.function import code_table, http_client
+from 股票.function.etf_classifier import EtfClassifier, query_yahoo
+
+LATENCY = 0.2
+N_CODES = 50
+NOT_IN_TABLE = ["9999A", "9999B", "9999C"]       # 代碼表沒有 → 需要查 API
+
+
+class _FakeResponse:
+    status_code = 200
+
+    def __init__(self, symbol: str) -> None:
+        self.symbol = symbol
+
+    def json(self) -> dict:
+        is_etf = self.symbol.startswith("00")
+        return {"quotes": [{"typeDisp": "ETF" if is_etf else "Equity",
+                            "quoteType": "ETF" if is_etf else "EQUITY"}]}
+
+
+def fake_get(url: str, **kwargs) -> _FakeResponse:
+    time.sleep(LATENCY)
+    return _FakeResponse(url.split("q=")[1].split(".")[0])
+
+
+def main() -> None:
+    live = "--live" in sys.argv
+    if not live:
+        http_client.get = fake_get
+    logging.disable(logging.INFO)
+    table = code_table.get_table()
+    codes = [c for c in table if c.isdigit()][:N_CODES - len(NOT_IN_TABLE)] + NOT_IN_TABLE
+
+    t0 = time.perf_counter()
+    old = {c: query_yahoo(c) for c in codes}
+    sequential = time.perf_counter() - t0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clf = EtfClassifier(Path(tmp) / "etf.sqlite")
+        t0 = time.perf_counter()
+        new = clf.classify_many(codes)
+        first = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        clf.classify_many(codes)
+        again = time.perf_counter() - t0
+        stats = dict(clf.stats)
+        clf.close()
+
+    diff = [c for c in codes if old[c] is not None and old[c] != new[c]]
+    print(f"{len(codes)} 檔（{len(NOT_IN_TABLE)} 檔不在代碼表）{'實際連線' if live else f'假回應，每次 {LATENCY}s'}")
+    print(f"逐檔查詢   : {sequential:6.2f}s")
+    print(f"分類器首次 : {first:6.2f}s")
+    print(f"分類器再次 : {again:6.3f}s  {stats}")
+    print(f"結果不同   : {diff or '無'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+End 解析方法的離線基準：以 test/fixtures/pages/ 存下的頁面量測每個指標的 解析＋擷取 時間，
+以及每檔 End.judge 的總時間（fetch_html 換成讀取 fixture，不連網），並與基準值比較。
+
+用法：
+    python test/bench/bench_extractors.py                    # 與 baselines/extractors.json 比較，退步時以 1 結束
+    python test/bench/bench_extractors.py --save-baseline    # 以本次結果覆寫基準值
+    python test/bench/bench_extractors.py --threshold 1.3    # 超過基準 1.3 倍視為退步（預設 1.5）
+    python test/bench/bench_extractors.py --record 2308 0050 # 連網重新錄製 個股 / ETF 頁面
+
+基準值與機器有關：換機器或換 Python 版本後先 --save-baseline 一次。
+"""
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# 讓本模組可以從 CLI 執行
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+# ──────────────────────────────
+from 股票.function import metric_registry, stock_end
+from 股票.function.stock_end import End, parse_html
+
+FIXTURES = Path(__file__).resolve().parents[1] / "fixtures" / "pages"
+BASELINE = Path(__file__).resolve().parent / "baselines" / "extractors.json"
+
+# 路徑 → (fixture 子資料夾, 代碼, is_etf)
+PATHS = {
+    "stock": ("stock", "2308", False),
+    "etf":   ("etf", "0050", True),
+}
+# ETF 沒有配股，除權除息頁的除權日本來就是空白
+EXPECTED_BLANK = {"etf": {"除權日"}}
+REPEAT = 15
+MIN_DELTA_MS = 0.3            # 小於此差距不算退步（避免微秒級雜訊）
+
+
+def load_pages(folder: str) -> dict[str, bytes]:
+    return {p.stem: p.read_bytes() for p in sorted((FIXTURES / folder).glob("*.html"))}
+
+
+def record(code: str, folder: str, is_etf: bool) -> None:
+    """連網抓取 plan 需要的所有頁面並存成 fixture。"""
+    from 股票.function import http_client
+
+    out = FIXTURES / folder
+    out.mkdir(parents=True, exist_ok=True)
+    stock = End(code, 2)
+    for page in dict.fromkeys(p for p, _ in metric_registry.plan(is_etf)):
+        resp = http_client.get(stock.url(page))
+        (out / f"{page}.html").write_bytes(resp.content)
+        print(f"錄製 {folder}/{page}.html  HTTP {resp.status_code}  {len(resp.content):,} bytes")
+
+
+def _median_ms(fn) -> float:
+    samples = []
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def bench_path(name: str) -> tuple[dict[str, float], list[str]]:
+    """回傳 ({"stock/get_PE": ms, ..., "stock/judge": ms}, 擷取失敗的欄位)。"""
+    folder, code, is_etf = PATHS[name]
+    pages = load_pages(folder)
+    results: dict[str, float] = {}
+
+    for page, extractor in metric_registry.plan(is_etf):
+        content = pages[page]
+        results[f"{name}/{extractor}"] = _median_ms(
+            lambda: getattr(End(code, 2), extractor)(parse_html(content, page)))
+
+    def fixture_fetch(url: str, page: str | None = None):
+        return parse_html(pages[page], page)
+
+    stock_end.fetch_html = fixture_fetch          # judge 經 CrawlScheduler 呼叫模組層級的 fetch_html
+    results[f"{name}/judge"] = _median_ms(lambda: End(code, 2, is_etf).judge())
+
+    stock = End(code, 2, is_etf)
+    stock.judge()
+    wanted = metric_registry.applicable(metric_registry.FIELDS, is_etf)
+    missing = [f for f in wanted
+               if getattr(stock, f) in ("-", "") and f not in EXPECTED_BLANK.get(name, set())]
+    return results, missing
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], threshold: float) -> list[str]:
+    print(f"{'項目':<32}{'本次':>10}{'基準':>10}{'倍率':>8}")
+    regressions = []
+    for key, ms in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"{key:<32}{ms:>8.2f}ms{'—':>10}{'新':>8}")
+            continue
+        ratio = ms / base if base else float("inf")
+        bad = ratio > threshold and ms - base > MIN_DELTA_MS
+        if bad:
+            regressions.append(key)
+        print(f"{key:<32}{ms:>8.2f}ms{base:>8.2f}ms{ratio:>7.2f}x" + ("  ← 退步" if bad else ""))
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=1.5)
+    parser.add_argument("--record", nargs=2, metavar=("STOCK", "ETF"))
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record[0], "stock", False)
+        record(args.record[1], "etf", True)
+        return
+
+    logging.getLogger("crawler").setLevel(logging.WARNING)   # judge 的逐檔訊息不需要印
+    results: dict[str, float] = {}
+    failed = False
+    for name in PATHS:
+        timings, missing = bench_path(name)
+        results.update(timings)
+        if missing:
+            failed = True
+            print(f"[{name}] 擷取失敗（fixture 與解析方法不符）：{', '.join(missing)}")
+
+    if args.save_baseline:
+        BASELINE.parent.mkdir(parents=True, exist_ok=True)
+        BASELINE.write_text(json.dumps({k: round(v, 3) for k, v in results.items()}, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"已寫入基準值 {BASELINE}（{len(results)} 項）")
+        sys.exit(1 if failed else 0)
+
+    baseline = json.loads(BASELINE.read_text(encoding="utf-8")) if BASELINE.exists() else {}
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"退步超過 {args.threshold}x：{', '.join(regressions)}")
+    sys.exit(1 if failed or regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+壓力測試：對本機替身伺服器（mock_server.py）跑完整的 update_data_parallel / update_data_async
+與批次即時報價，掃過不同引擎與執行緒數，回報吞吐量、每檔延遲 p50 / p99 與記憶體峰值。
+
+每組設定在獨立的子行程執行（記憶體峰值互不影響），替身伺服器留在父行程，
+因此伺服器的延遲注入不會與被測程式搶 GIL。每檔延遲 = 排入抓取（End.plan）到寫進鏡像（finish_stock）。
+記憶體峰值取子行程的 max RSS；沒有 resource 模組（Windows）或加上 --tracemalloc 時改用 tracemalloc
+（只計 Python 配置，且會讓解析慢數倍，吞吐量不可與未開啟時比較）。
+
+用法：
+    python test/bench/bench_load.py                                  # thread / async × 8, 24, 50 執行緒，300 檔
+    python test/bench/bench_load.py --codes 2000 --workers 24 50     # 2000 檔
+    python test/bench/bench_load.py --engines thread --latency-scale 3 --error-rate 0.05
+    python test/bench/bench_load.py --limits setting                 # 改用 setting.json 的 rate_limit（實際限流）
+    python test/bench/bench_load.py --json out.json                  # 另存每組結果
+    python test/bench/bench_load.py --tracemalloc                    # 記憶體峰值改用 tracemalloc
+
+工作表以 openpyxl 建在暫存資料夾，不需要 Excel；頁面快取關閉，每個請求都打到替身伺服器。
+"""
+import argparse
+import json
+import logging
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from importlib.util import find_spec
+from pathlib import Path
+
+# 讓本模組可以從 CLI 執行
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+sys.path.append(str(Path(__file__).resolve().parent))
+# ──────────────────────────────
+import mock_server
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# 壓測預設限流：放寬到不成為瓶頸，只靠伺服器的 429 讓 AIMD 調速。
+# MIS 仍沿用 setting.json 的 per_host：twstock 不回報狀態碼，AIMD 看不到 MIS 的 429
+UNLIMITED = {"rate": 1000, "max_rate": 5000, "burst": 200, "concurrency": 64, "max_concurrency": 256}
+ETF_SHARE = 0.1                # 清單中 ETF 的比例（約同實際追蹤清單）
+
+
+def load_limits(mode: str) -> dict:
+    """rate_limiter.configure 的參數：setting = 原樣使用 setting.json；unlimited = 放寬預設值、保留 per_host。"""
+    cfg = json.loads((ROOT / "setting.json").read_text(encoding="utf-8")).get("rate_limit", {})
+    if mode == "setting":
+        return cfg
+    return {**UNLIMITED, "per_host": cfg.get("per_host", {})}
+
+
+def pick_codes(n: int) -> dict[str, bool]:
+    """本機代碼表中的個股與 ETF（約 ETF_SHARE 比例，不足時補流水號），值為 is_etf；明確給定，不查 Yahoo。"""
+    from 股票.function import code_table
+
+    table = code_table.get_table()
+    etfs = [c for c in table if mock_server.is_etf(c)][:round(n * ETF_SHARE)]
+    stocks = [c for c in table if c.isdigit() and len(c) == 4 and not mock_server.is_etf(c)][:n - len(etfs)]
+    codes = stocks + etfs
+    codes += [str(100000 + i) for i in range(n - len(codes))]
+    return {c: mock_server.is_etf(c) for c in codes}
+
+
+def peak_memory_mb(traced: bool) -> tuple[float, str]:
+    """(峰值 MB, 來源)；max RSS 在 Linux 為 KiB、macOS 為 bytes。"""
+    if traced:
+        return tracemalloc.get_traced_memory()[1] / 2**20, "tracemalloc"
+    import resource
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (2**20 if sys.platform == "darwin" else 2**10), "rss"
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return float("nan")
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+# ──────────────────────────────
+# 子行程：實際執行一組設定
+# ──────────────────────────────
+def run_once(base_url: str, engine: str, workers: int, n_codes: int, limits: str, traced: bool) -> dict:
+    from 股票.function import (
+        async_engine, excel_utils, get_stock, http_cache, http_client, rate_limiter, stock_end,
+    )
+    from 股票.function.excel_utils import ExcelSession
+
+    logging.basicConfig(level=logging.WARNING)
+    http_client.configure(hosts=mock_server.client_hosts(base_url), pool_maxsize=max(workers, 32))
+    http_cache.configure(enabled=False)
+    rate_limiter.configure(**load_limits(limits))
+    excel_utils.configure("openpyxl")
+    codes = pick_codes(n_codes)
+
+    # 每檔延遲：第一次 plan（排入抓取）→ finish_stock（寫進鏡像）
+    started: dict[str, float] = {}
+    latencies: list[float] = []
+    plan, finish = stock_end.End.plan, stock_end.finish_stock
+
+    def timed_plan(self, is_etf):
+        started.setdefault(self.code, time.perf_counter())
+        return plan(self, is_etf)
+
+    def timed_finish(mirror, stock, *args, **kwargs):
+        finish(mirror, stock, *args, **kwargs)
+        latencies.append(time.perf_counter() - started.get(stock.code, time.perf_counter()))
+
+    stock_end.End.plan = timed_plan
+    stock_end.finish_stock = timed_finish
+    async_engine.finish_stock = timed_finish          # async_engine 以名稱匯入
+
+    traced = traced or find_spec("resource") is None      # 沒有 max RSS 可用時退回 tracemalloc
+    if traced:
+        tracemalloc.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        with ExcelSession(str(Path(tmp) / "load.xlsx"), "load") as xls:
+            t0 = time.perf_counter()
+            if engine == "async":
+                async_engine.update_data_async(xls, codes, per_host=workers)
+            else:
+                stock_end.update_data_parallel(xls, codes, max_workers=workers)
+            elapsed = time.perf_counter() - t0
+            rows = xls.sh.range(f"P2:AN{len(codes) + 1}").value
+
+        t0 = time.perf_counter()
+        quotes = get_stock.fetch_realtime(list(codes))
+        realtime = time.perf_counter() - t0
+    peak, source = peak_memory_mb(traced)
+
+    blank = sum(1 for row in rows if all(v in (None, "-", "") for v in row))
+    return {
+        "engine": engine,
+        "workers": workers,
+        "stocks": len(latencies),
+        "blank_rows": blank,
+        "seconds": round(elapsed, 3),
+        "stocks_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0,
+        "p50_s": round(_percentile(latencies, 50), 3),
+        "p99_s": round(_percentile(latencies, 99), 3),
+        "peak_mb": round(peak, 1),
+        "peak_source": source,
+        "realtime_s": round(realtime, 3),
+        "realtime_quotes": len(quotes),
+        "rates": rate_limiter.rates(),
+    }
+
+
+# ──────────────────────────────
+# 父行程：起伺服器、掃設定、彙整
+# ──────────────────────────────
+def sweep(args: argparse.Namespace) -> list[dict]:
+    engines = list(args.engines)
+    if "async" in engines and find_spec("httpx") is None:
+        print("未安裝 httpx，略過 async 引擎")
+        engines.remove("async")
+
+    profiles = mock_server.scaled_profiles(args.latency_scale, args.error_rate, not args.no_throttle)
+    results = []
+    with mock_server.MockServer(0, profiles, args.seed) as server:
+        for engine in engines:
+            for workers in args.workers:
+                server.reset_stats()
+                proc = subprocess.run(
+                    [sys.executable, __file__, "--child", server.base_url, engine, str(workers),
+                     str(args.codes), args.limits, str(int(args.tracemalloc))],
+                    cwd=ROOT, capture_output=True, text=True, encoding="utf-8",
+                )
+                if proc.returncode != 0:
+                    print(f"[{engine} × {workers}] 失敗：\n{proc.stderr[-2000:]}")
+                    continue
+                result = json.loads(proc.stdout.strip().splitlines()[-1])
+                result["server"] = server.snapshot()
+                results.append(result)
+                report(result)
+    return results
+
+
+def report(r: dict) -> None:
+    served = {site: sum(codes.values()) for site, codes in r["server"].items()}
+    throttled = sum(codes.get(429, 0) for codes in r["server"].values())
+    errors = sum(n for codes in r["server"].values() for status, n in codes.items() if int(status) >= 500)
+    print(f"{r['engine']:<6} ×{r['workers']:>3}  {r['stocks']:>5} 檔 {r['seconds']:>7.1f}s  "
+          f"{r['stocks_per_s']:>7.1f} 檔/s  p50 {r['p50_s']:>6.2f}s  p99 {r['p99_s']:>6.2f}s  "
+          f"峰值 {r['peak_mb']:>6.1f}MB（{r['peak_source']}）  即時 {r['realtime_quotes']} 檔 {r['realtime_s']:.1f}s  "
+          f"429 {throttled}  5xx {errors}  空白列 {r['blank_rows']}")
+    print(f"         請求數 {served}")
+
+
+def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        base_url, engine, workers, n_codes, limits, traced = sys.argv[2:8]
+        print(json.dumps(run_once(base_url, engine, int(workers), int(n_codes), limits, traced == "1")))
+        return
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--codes", type=int, default=300, help="股票檔數")
+    parser.add_argument("--engines", nargs="+", default=["thread", "async"], choices=["thread", "async"])
+    parser.add_argument("--workers", nargs="+", type=int, default=[8, 24, 50],
+                        help="thread = max_workers；async = 每 host 併發上限")
+    parser.add_argument("--limits", choices=["unlimited", "setting"], default="unlimited",
+                        help="用戶端限流：放寬 / setting.json 的 rate_limit")
+    parser.add_argument("--tracemalloc", action="store_true", help="記憶體峰值改用 tracemalloc")
+    parser.add_argument("--json", type=Path, default=None, help="另存結果")
+    mock_server.add_arguments(parser)
+    args = parser.parse_args()
+
+    print(f"{args.codes} 檔，延遲倍率 {args.latency_scale}，"
+          f"錯誤率 {'預設' if args.error_rate is None else args.error_rate}，"
+          f"{'不限流' if args.no_throttle else '伺服器限流'}，用戶端限流 {args.limits}")
+    results = sweep(args)
+    if args.json:
+        args.json.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"已寫入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+整批匯入前後的請求數比較：只更新 市盈率 / 市淨率 / 殖利率 時，逐檔抓取 vs MarketTables。
+
+用法：
+    python test/bench/bench_market_tables.py                  # 使用 test/fixtures/market_tables/ 的本機檔案
+    python test/bench/bench_market_tables.py <twse> <tpex>    # 指定 URL 或檔案路徑
+"""
+import logging
+import sys
+from pathlib import Path
+
+# 讓本模組可以從 CLI 執行
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+# ──────────────────────────────
+from 股票.function import stock_end
+from 股票.function.market_tables import FIELDS, MarketTables
+from 股票.function.scheduler import CrawlScheduler
+
+FIXTURES = Path(__file__).resolve().parents[1] / "fixtures" / "market_tables"
+
+
+def count_requests(codes: list[str], tables: MarketTables | None) -> int:
+    """用假的 fetch 跑一次排程，回傳實際需要抓的頁面數。"""
+    calls = []
+
+    def fake_fetch(url: str, page: str):
+        calls.append(url)
+        return stock_end.parse_html(b"<html></html>", page)
+
+    stocks = stock_end.iter_stocks(dict.fromkeys(codes, False), FIELDS, bulk=tables)
+    for _ in CrawlScheduler(fake_fetch, max_workers=8).run(stocks):
+        pass
+    return len(calls)
+
+
+def main() -> None:
+    twse, tpex = sys.argv[1:3] if len(sys.argv) > 2 else (
+        FIXTURES / "twse_BWIBBU_ALL.json", FIXTURES / "tpex_peratio.csv")
+    logging.disable(logging.WARNING)              # 假頁面解析失敗的警告不需要印
+    tables = MarketTables({"twse": str(twse), "tpex": str(tpex)})
+    codes = sorted(tables) + ["0050"]          # 0050：表中沒有，需逐檔補抓
+    per_stock = count_requests(codes, None)
+    bulk = count_requests(codes, tables)
+    print(f"{len(codes)} 檔，欄位 {FIELDS}")
+    print(f"逐檔抓取 : {per_stock} 次請求")
+    print(f"整批匯入 : {len(tables.sources)} 個檔案 + {bulk} 次逐檔補抓")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+解析後端效能比較：html.parser / lxml / lxml + SoupStrainer，逐頁列出每次解析耗時。
+
+用法：
+    python test/bench/bench_parser.py                 # 使用內建合成頁面
+    python test/bench/bench_parser.py <html 資料夾>    # 使用實際存下的頁面，檔名為頁面代號，如 本益比.html
+"""
+import sys
+import time
+from pathlib import Path
+
+# 讓本模組可以從 CLI 執行
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+# ──────────────────────────────
+from 股票.function.stock_end import End, parse_html, configure_parser
+
+REPEAT = 20
+CONFIGS = [
+    ("html.parser", False),
+    ("lxml", False),
+    ("lxml", True),
+]
+
+
+def synthetic_page(page: str) -> bytes:
+    """模擬實際頁面的體積與結構：大量 script / nav，只有一小塊是我們要的資料。"""
+    noise = "".join(
+        f'<script>var x{i} = {{"k": "{"v" * 200}"}};</script>'
+        f'<nav><ul>{"<li><a href=/a>連結</a></li>" * 20}</ul></nav>'
+        for i in range(40)
+    )
+    if page == "quote":
+        body = '<ul><li class="price-detail-item"><span>昨收</span><span>100.5</span></li></ul>'
+    elif page == "profile":
+        cell = '<div class="Py(8px) Pstart(12px) Bxz(bb)">2025/01/01</div>'
+        body = f'<div class="table-grid Mb(20px) row-fit-half" style="a">{cell * 8}</div>' * 2
+    elif page == "cash-flow":
+        body = "".join('<li class="List(n)"><span>項目</span><span>1,234</span></li>' for _ in range(8))
+    else:
+        rows = "".join(f"<tr>{'<td>1.23</td>' * 10}</tr>" for _ in range(40))
+        body = f'<table><tr><td style="x">15.2</td>{"<td>1</td>" * 9}</tr>{rows}</table>'
+    return f"<html><head><title>{page}</title>{noise}</head><body>{body}</body></html>".encode()
+
+
+def load_pages(folder: Path | None) -> dict[str, bytes]:
+    if folder is None:
+        return {page: synthetic_page(page) for page in End.PAGE_URLS}
+    return {p.stem: p.read_bytes() for p in sorted(folder.glob("*.html")) if p.stem in End.PAGE_URLS}
+
+
+def bench(pages: dict[str, bytes]) -> None:
+    header = f"{'page':<16}" + "".join(f"{b + (' +strain' if s else ''):>20}" for b, s in CONFIGS)
+    print(header)
+    totals = [0.0] * len(CONFIGS)
+    for page, content in pages.items():
+        line = f"{page:<16}"
+        for i, (backend, strain) in enumerate(CONFIGS):
+            configure_parser(backend, strain)
+            t0 = time.perf_counter()
+            for _ in range(REPEAT):
+                parse_html(content, page)
+            ms = (time.perf_counter() - t0) / REPEAT * 1000
+            totals[i] += ms
+            line += f"{ms:>17.2f} ms"
+        print(line)
+    print(f"{'TOTAL':<16}" + "".join(f"{t:>17.2f} ms" for t in totals))
+    configure_parser()
+
+
+if __name__ == "__main__":
+    folder = Path(sys.argv[1]) if len(sys.argv) > 1 else None
+    bench(load_pages(folder))
@@ -0,0 +1,77 @@
+"""
+即時報價：逐檔 twstock.realtime.get(code) vs 批次 fetch_realtime(codes)。
+
+預設以假的 MIS 伺服器（每次請求固定延遲）量測，只比較往返次數與總耗時；
+加上 --live 則直接打 mis.twse.com.tw（需在可連網的環境、盤中或收盤後）。
+
+用法：
+    python test/bench/bench_realtime.py                 # 300 檔、每次請求 0.1 秒
+    python test/bench/bench_realtime.py 600 0.2         # 600 檔、每次請求 0.2 秒
+    python test/bench/bench_realtime.py 300 0 --live
+"""
+import logging
+import sys
+import time
+from pathlib import Path
+
+# 讓本模組可以從 CLI 執行
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+# ──────────────────────────────
+import twstock
+
+from 股票.function import rate_limiter
+from 股票.function.get_stock import RealtimeStockData
+
+args = [a for a in sys.argv[1:] if not a.startswith("--")]
+N_CODES = int(args[0]) if args else 300
+LATENCY = float(args[1]) if len(args) > 1 else 0.1
+LIVE = "--live" in sys.argv
+
+requests_sent = 0
+
+
+def fake_get_raw(stocks) -> dict:
+    """模擬 MIS getStockInfo：一次往返 LATENCY 秒，回傳每個代碼一筆。"""
+    global requests_sent
+    requests_sent += 1
+    time.sleep(LATENCY)
+    codes = stocks if isinstance(stocks, list) else [stocks]
+    now = int(time.time() * 1000)
+    return {
+        "rtcode": "0000",
+        "msgArray": [
+            {"tlong": str(now), "c": c, "ch": f"{c}.tw", "n": c, "nf": c,
+             "z": "100.0", "tv": "1", "v": "1000", "b": "99.5_99.0_", "g": "1_2_",
+             "a": "100.5_101.0_", "f": "3_4_", "o": "99.0", "h": "101.0", "l": "98.5"}
+            for c in codes
+        ],
+    }
+
+
+def main() -> None:
+    logging.disable(logging.INFO)
+    codes = [str(1101 + i) for i in range(N_CODES)]
+    if LIVE:
+        codes = [c for c in twstock.twse if c.isdigit() and len(c) == 4][:N_CODES]
+    else:
+        twstock.realtime.get_raw = fake_get_raw
+        rate_limiter.configure(rate=1000, burst=1000, concurrency=64)   # 只量往返次數，不量限流
+
+    global requests_sent
+    t0 = time.perf_counter()
+    loop = [RealtimeStockData.from_code(c, i + 2) for i, c in enumerate(codes)]
+    t_loop, n_loop = time.perf_counter() - t0, requests_sent
+
+    requests_sent = 0
+    t0 = time.perf_counter()
+    batch = RealtimeStockData.from_codes(codes)
+    t_batch, n_batch = time.perf_counter() - t0, requests_sent
+
+    print(f"{len(codes)} 檔{'（live）' if LIVE else f'，每次請求 {LATENCY}s'}")
+    print(f"逐檔 : {t_loop:7.2f}s  {n_loop if not LIVE else len(codes)} 次請求  空白 {sum(s.blank for s in loop)}")
+    print(f"批次 : {t_batch:7.2f}s  {n_batch if not LIVE else '-'} 次請求  空白 {sum(s.blank for s in batch)}")
+    print(f"加速 : {t_loop / t_batch:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
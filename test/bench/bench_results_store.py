@@ -0,0 +1,63 @@
+"""
+結果資料庫的單一指標讀取：2000 檔 × 250 天，history 逐列掃描 vs columns 欄式分區。
+
+用法：
+    python test/bench/bench_results_store.py                  # 2000 檔 × 250 天
+    python test/bench/bench_results_store.py <檔數> <天數>
+"""
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# 讓本模組可以從 CLI 執行
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+# ──────────────────────────────
+from 股票.function import metric_registry
+from 股票.function.results_store import ResultsStore
+
+FIELD = "市盈率"
+
+
+def populate(store: ResultsStore, n_codes: int, n_days: int) -> list[str]:
+    """直接整批寫入 history（不經 save()，避免量測到快照的 JSON 合併）。"""
+    rng = np.random.default_rng(0)
+    codes = [f"{1000 + i}" for i in range(n_codes)]
+    fields = [f for f in metric_registry.FIELDS if metric_registry.dtype_of(f) == "real"]
+    cols = ", ".join(f'"{f}"' for f in fields)
+    start = date(2025, 1, 1)
+    days = [(start + timedelta(days=d)).isoformat() for d in range(n_days)]
+    for day in days:
+        values = rng.normal(15, 5, (n_codes, len(fields)))
+        store._db.executemany(
+            f"INSERT INTO history (code, date, {cols}, updated_at) "
+            f"VALUES (?, ?, {', '.join('?' * len(fields))}, ?)",
+            [(c, day, *map(float, row), day) for c, row in zip(codes, values)],
+        )
+    store._db.commit()
+    return days
+
+
+def timed(label: str, fn) -> None:
+    t0 = time.perf_counter()
+    codes, dates, values = fn()
+    print(f"{label:<10}: {time.perf_counter() - t0:6.3f}s  → {values.shape[0]} 天 × {values.shape[1]} 檔")
+
+
+def main() -> None:
+    n_codes, n_days = (int(a) for a in sys.argv[1:3]) if len(sys.argv) > 2 else (2000, 250)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultsStore(Path(tmp) / "results.sqlite")
+        days = populate(store, n_codes, n_days)
+        timed("逐列掃描", lambda: store.metric(FIELD))
+        for day in days:
+            store.compact(day)
+        timed("欄式分區", lambda: store.metric(FIELD))
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+冷啟動時間：以 `python -X importtime` 量測各進入點的匯入耗時，列出最重的模組，超過預算時以非 0 結束。
+
+用法：
+    python test/bench/bench_startup.py                 # 每個進入點跑 5 次取中位數
+    python test/bench/bench_startup.py -n 10 --top 15
+    python test/bench/bench_startup.py --budget 1.5    # 預算放寬 1.5 倍（較慢的機器）
+
+匯入期間不應載入 pandas / xlwings / twstock / bs4 / requests / numpy；
+這些套件列在 HEAVY，若出現在某個進入點的匯入清單中也視為失敗。
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# 進入點 → 匯入耗時預算（ms）
+BUDGET_MS: dict[str, float] = {
+    "read": 150,
+    "股票.function.stock_end": 120,
+    "股票.function.realtime_market": 120,
+    "股票.function.async_engine": 150,
+    "股票.function.results_export": 400,          # openpyxl（連帶 numpy / lxml）約 200ms
+}
+
+HEAVY = ("pandas", "xlwings", "twstock", "bs4", "requests", "numpy", "lxml")
+# openpyxl 有安裝 numpy / lxml 時會自行匯入，匯出工具無法避免
+ALLOWED: dict[str, set[str]] = {"股票.function.results_export": {"numpy", "lxml"}}
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def importtime(module: str) -> list[tuple[int, int, str]]:
+    """回傳 [(self µs, cumulative µs, 模組名)]，依 -X importtime 的輸出順序。"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, encoding="utf-8", check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((int(m.group(1)), int(m.group(2)), m.group(4)))
+    return rows
+
+
+def measure(module: str, runs: int) -> tuple[float, list[tuple[int, int, str]]]:
+    """中位數（ms）與最後一次的明細；只計算 module 本身的累計時間（不含直譯器的 site）。"""
+    totals, rows = [], []
+    for _ in range(runs):
+        rows = importtime(module)
+        totals.append(next(cum for _, cum, name in rows if name == module) / 1000)
+    return statistics.median(totals), rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=5, help="每個進入點的量測次數")
+    parser.add_argument("--top", type=int, default=8, help="列出最耗時的幾個模組（self time）")
+    parser.add_argument("--budget", type=float, default=1.0, help="預算倍率")
+    args = parser.parse_args()
+
+    failed = False
+    for module, budget in BUDGET_MS.items():
+        ms, rows = measure(module, args.n)
+        limit = budget * args.budget
+        loaded = {name.split(".")[0] for _, _, name in rows}
+        heavy = sorted(loaded & set(HEAVY) - ALLOWED.get(module, set()))
+        ok = ms <= limit and not heavy
+        failed |= not ok
+        print(f"{'OK ' if ok else 'FAIL'} {module:<32} {ms:7.1f} ms  (預算 {limit:.0f} ms)"
+              + (f"  載入了 {', '.join(heavy)}" if heavy else ""))
+        for self_us, _, name in sorted(rows, reverse=True)[:args.top]:
+            print(f"       {self_us / 1000:7.1f} ms  {name}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+讀取代碼清單：pd.read_excel vs symbol_reader（首次 / 快取命中）。
+
+用法：
+    python test/bench/bench_symbols.py                    # 產生 300 張工作表的測試活頁簿
+    python test/bench/bench_symbols.py <檔案> <工作表>      # 量測既有活頁簿
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 讓本模組可以從 CLI 執行
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+# ──────────────────────────────
+from 股票.function.symbol_reader import read_symbols
+
+
+def make_workbook(path: Path, sheets: int = 300, rows: int = 200) -> str:
+    """主工作表 300 檔代碼＋每檔一張 rows × 30 的工作表（仿寫入檔的版面）。"""
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "new title"
+    ws.append(["日期", "代碼"])
+    codes = [str(1000 + i) for i in range(sheets)]
+    for code in codes:
+        ws.append([None, code])
+    for code in codes:
+        sheet = wb.create_sheet(code)
+        for r in range(rows):
+            sheet.append(list(range(30)))
+    wb.save(path)
+    return "new title"
+
+
+def timed(label: str, fn) -> None:
+    t0 = time.perf_counter()
+    n = len(fn())
+    print(f"{label:<14}: {time.perf_counter() - t0:7.3f}s  ({n} 檔)")
+
+
+def main() -> None:
+    import pandas as pd
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if len(sys.argv) > 2:
+            file, sheet = sys.argv[1], sys.argv[2]
+        else:
+            file = Path(tmp) / "book.xlsx"
+            sheet = make_workbook(file)
+        cache = Path(tmp) / "symbols.json"
+        timed("pd.read_excel", lambda: pd.read_excel(file, sheet).iloc[:, 1].tolist())
+        timed("串流（首次）", lambda: read_symbols(file, sheet, cache))
+        timed("快取命中", lambda: read_symbols(file, sheet, cache))
+
+
+if __name__ == "__main__":
+    main()
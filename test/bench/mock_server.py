@@ -0,0 +1,310 @@
+"""
+本機替身伺服器：依 URL 樣式回傳 test/fixtures 存下的 histock / Yahoo / MIS / 整批表回應，
+並可注入延遲分布、錯誤率與 429 限流，讓壓力測試不必打真正的網站。
+
+搭配 http_client 的 hosts 設定把各網站導到這裡（見 HOSTS 與 client_hosts()）：
+    http_client.configure(hosts=mock_server.client_hosts("http://127.0.0.1:8765"))
+
+用法：
+    python test/bench/mock_server.py                         # 預設延遲 / 錯誤率 / 限流，埠 8765
+    python test/bench/mock_server.py --port 9000 --latency-scale 2 --error-rate 0.05
+    python test/bench/mock_server.py --no-throttle --latency-scale 0   # 只量本機處理能力
+
+路由（同一個埠，依 path 分辨網站）：
+    /stock/index.jsp、/stock/api/getStockInfo.jsp   MIS 即時報價（依 ex_ch 逐檔產生）
+    /stock/{code}/{頁面}                            histock 各頁（pages/stock 或 pages/etf）
+    /quote/{code}[/profile|/cash-flow-statement]    Yahoo 股市頁面
+    /v1/finance/search?q={code}.tw                   Yahoo Search API（00 開頭視為 ETF）
+    /v1/exchangeReport/BWIBBU_ALL、/openapi/v1/tpex_mainboard_peratio_analysis   整批表
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+FIXTURES = Path(__file__).resolve().parents[1] / "fixtures"
+
+# 要導到本伺服器的 host → 網站代號（限流與統計依網站分開計算）
+HOSTS: dict[str, str] = {
+    "histock.tw": "histock",
+    "tw.stock.yahoo.com": "yahoo",
+    "query2.finance.yahoo.com": "yahoo",
+    "mis.twse.com.tw": "mis",
+    "openapi.twse.com.tw": "bulk",
+    "www.tpex.org.tw": "bulk",
+}
+
+
+@dataclass
+class SiteProfile:
+    median_ms: float = 80.0        # 延遲中位數
+    sigma: float = 0.5             # 對數常態的 σ；0 = 固定延遲
+    error_rate: float = 0.0        # 回 503 的機率
+    rps: float = 0.0               # 每秒請求上限，超過回 429；0 = 不限流
+    burst: float = 20.0
+
+
+# 預設值大致對應實際觀察：Yahoo 較慢且偶爾失敗，MIS 回應快但限流嚴格
+DEFAULT_PROFILES: dict[str, SiteProfile] = {
+    "histock": SiteProfile(median_ms=80, sigma=0.5, error_rate=0.005, rps=400, burst=100),
+    "yahoo":   SiteProfile(median_ms=150, sigma=0.8, error_rate=0.01, rps=200, burst=50),
+    "mis":     SiteProfile(median_ms=60, sigma=0.3, error_rate=0.0, rps=5, burst=5),
+    "bulk":    SiteProfile(median_ms=200, sigma=0.2),
+}
+
+# Yahoo 頁面後綴 → End.PAGE_URLS 的頁面代號
+_YAHOO_PAGES = {"": "quote", "/profile": "profile", "/cash-flow-statement": "cash-flow"}
+_BULK_FILES = {
+    "/v1/exchangeReport/BWIBBU_ALL": ("market_tables/twse_BWIBBU_ALL.json", "application/json"),
+    "/openapi/v1/tpex_mainboard_peratio_analysis": ("market_tables/tpex_peratio.csv", "text/csv"),
+}
+
+_HISTOCK = re.compile(r"^/stock/(?P<code>[^/]+)/(?P<page>[^/]+)$")
+_YAHOO = re.compile(r"^/quote/(?P<code>[^/]+?)(?P<sub>/profile|/cash-flow-statement)?$")
+
+
+def is_etf(code: str) -> bool:
+    """台股 ETF 代碼都以 00 開頭；替身伺服器與壓測程式共用這個判斷。"""
+    return code.startswith("00")
+
+
+def client_hosts(base_url: str) -> dict[str, str]:
+    """http_client.configure(hosts=...) 用：所有 HOSTS 都導到 base_url。"""
+    return {host: base_url for host in HOSTS}
+
+
+class _Bucket:
+    """伺服器端令牌桶；沒有令牌就回 429。"""
+
+    def __init__(self, rps: float, burst: float) -> None:
+        self.rps, self.burst = rps, burst
+        self.tokens, self.stamp = burst, time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rps)
+            self.stamp = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class MockServer:
+    """
+    Parameters
+    ----------
+    port : int
+        0 = 由系統挑選空閒埠（見 base_url）。
+    profiles : dict[str, SiteProfile] | None
+        網站代號 → 延遲 / 錯誤率 / 限流設定，覆寫 DEFAULT_PROFILES 的對應項目。
+    seed : int | None
+        亂數種子，固定後延遲與錯誤序列可重現。
+    """
+
+    def __init__(self,
+                 port: int = 8765,
+                 profiles: dict[str, SiteProfile] | None = None,
+                 seed: int | None = None) -> None:
+        self.profiles = {**DEFAULT_PROFILES, **(profiles or {})}
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._buckets = {site: _Bucket(p.rps, p.burst) for site, p in self.profiles.items() if p.rps > 0}
+        self._pages = {folder: {p.stem: p.read_bytes() for p in (FIXTURES / "pages" / folder).glob("*.html")}
+                       for folder in ("stock", "etf")}
+        self._stats_lock = threading.Lock()
+        self.stats: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # ---------- 啟動 / 停止 ----------
+    def start(self) -> "MockServer":
+        """在背景執行緒服務，回傳自己（可直接 with）。"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self.stats.clear()
+
+    def snapshot(self) -> dict[str, dict[int, int]]:
+        """{網站: {狀態碼: 次數}}。"""
+        with self._stats_lock:
+            return {site: dict(codes) for site, codes in self.stats.items()}
+
+    # ---------- 回應 ----------
+    def _delay(self, profile: SiteProfile) -> float:
+        if profile.median_ms <= 0:
+            return 0.0
+        with self._rng_lock:
+            factor = self._rng.lognormvariate(0, profile.sigma) if profile.sigma else 1.0
+        return profile.median_ms / 1000 * factor
+
+    def _fail(self, profile: SiteProfile) -> bool:
+        with self._rng_lock:
+            return self._rng.random() < profile.error_rate
+
+    def route(self, path: str, query: str) -> tuple[str, int, bytes, str]:
+        """回傳 (網站代號, 狀態碼, 內容, Content-Type)；不含延遲與錯誤注入。"""
+        if path == "/stock/index.jsp":
+            return "mis", 200, b"<html></html>", "text/html"
+        if path == "/stock/api/getStockInfo.jsp":
+            return "mis", 200, self._mis(parse_qs(query).get("ex_ch", [""])[0]), "application/json"
+        if path == "/v1/finance/search":
+            code = parse_qs(query).get("q", [""])[0].split(".")[0]
+            return "yahoo", 200, self._search(code), "application/json"
+        if path in _BULK_FILES:
+            name, ctype = _BULK_FILES[path]
+            return "bulk", 200, (FIXTURES / name).read_bytes(), ctype
+        if m := _HISTOCK.match(path):
+            return "histock", *self._page(m["code"], unquote(m["page"]))
+        if m := _YAHOO.match(path):
+            return "yahoo", *self._page(m["code"], _YAHOO_PAGES[m["sub"] or ""])
+        return "other", 404, b"not found", "text/plain"
+
+    def _page(self, code: str, page: str) -> tuple[int, bytes, str]:
+        """ETF 優先用 pages/etf，沒有該頁時退回 pages/stock 的版面。"""
+        folders = ("etf", "stock") if is_etf(code) else ("stock",)
+        for folder in folders:
+            content = self._pages[folder].get(page)
+            if content is not None:
+                return 200, content, "text/html; charset=utf-8"
+        return 404, b"not found", "text/plain"
+
+    @staticmethod
+    def _search(code: str) -> bytes:
+        kind = ("ETF", "ETF") if is_etf(code) else ("Equity", "EQUITY")
+        return json.dumps({"quotes": [{"symbol": f"{code}.TW", "typeDisp": kind[0],
+                                       "quoteType": kind[1]}]}).encode()
+
+    @staticmethod
+    def _mis(ex_ch: str) -> bytes:
+        """ex_ch=tse_2330.tw|otc_6488.tw → 每個代碼一筆 getStockInfo 格式的資料。"""
+        now = str(int(time.time() * 1000))
+        rows = []
+        for item in filter(None, ex_ch.split("|")):
+            channel = item.split("_", 1)[-1]
+            code = channel.removesuffix(".tw")
+            rows.append({"tlong": now, "c": code, "ch": channel, "n": code, "nf": code,
+                         "z": "100.0", "tv": "1", "v": "1000", "b": "99.5_99.0_", "g": "1_2_",
+                         "a": "100.5_101.0_", "f": "3_4_", "o": "99.0", "h": "101.0",
+                         "l": "98.5", "y": "99.0"})
+        return json.dumps({"rtcode": "0000", "rtmessage": "OK", "msgArray": rows}).encode()
+
+    def respond(self, path: str, query: str) -> tuple[int, bytes, str, dict[str, str]]:
+        """route ＋ 限流 / 錯誤 / 延遲注入；回傳 (狀態碼, 內容, Content-Type, 額外標頭)。"""
+        site, status, body, ctype = self.route(path, query)
+        profile = self.profiles.get(site, SiteProfile(median_ms=0))
+        headers: dict[str, str] = {}
+        bucket = self._buckets.get(site)
+        if bucket is not None and not bucket.take():
+            status, body, ctype = 429, b"too many requests", "text/plain"
+            headers["Retry-After"] = "1"
+        else:
+            time.sleep(self._delay(profile))
+            if status == 200 and self._fail(profile):
+                status, body, ctype = 503, b"service unavailable", "text/plain"
+        with self._stats_lock:
+            self.stats[site][status] += 1
+        return status, body, ctype, headers
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"          # keep-alive，與真實網站一樣重用連線
+
+            def do_GET(self) -> None:  # noqa: N802 — http.server 的命名
+                parts = urlsplit(self.path)
+                status, body, ctype, headers = server.respond(parts.path, parts.query)
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:   # 不逐筆印存取紀錄
+                pass
+
+        return Handler
+
+
+def scaled_profiles(latency_scale: float = 1.0,
+                    error_rate: float | None = None,
+                    throttle: bool = True) -> dict[str, SiteProfile]:
+    """依 CLI 參數調整 DEFAULT_PROFILES：延遲乘上倍率、統一錯誤率、關閉限流。"""
+    out = {}
+    for site, p in DEFAULT_PROFILES.items():
+        p = replace(p, median_ms=p.median_ms * latency_scale)
+        if error_rate is not None:
+            p = replace(p, error_rate=error_rate)
+        if not throttle:
+            p = replace(p, rps=0.0)
+        out[site] = p
+    return out
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """伺服器參數；bench_load.py 共用同一組。"""
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="延遲倍率（0 = 不延遲）")
+    parser.add_argument("--error-rate", type=float, default=None, help="所有網站統一的 503 機率")
+    parser.add_argument("--no-throttle", action="store_true", help="不回 429")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockServer(args.port, scaled_profiles(args.latency_scale, args.error_rate,
+                                                   not args.no_throttle), args.seed)
+    print(f"mock server：{server.base_url}（Ctrl+C 結束）")
+    for site, p in server.profiles.items():
+        print(f"  {site:<8} 延遲中位數 {p.median_ms:.0f}ms σ={p.sigma}  錯誤率 {p.error_rate:.1%}"
+              f"  限流 {p.rps or '無'} req/s")
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        for site, codes in sorted(server.snapshot().items()):
+            print(f"  {site:<8} {dict(sorted(codes.items()))}")
+
+
+if __name__ == "__main__":
+    main()
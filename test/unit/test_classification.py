@@ -0,0 +1,71 @@
+"""classification：代碼完全比對工作表開頭代碼，每張工作表一次插入、一次寫入（以 openpyxl 後端執行）。"""
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from 股票.function import classification, excel_utils
+from 股票.function.classification import _stack_rows, build_index
+from 股票.function.excel_utils import ExcelSession
+
+
+def test_build_index_exact_leading_code():
+    index = build_index(["2308台達電", "23081測試", "0050元大台灣50", "說明"], ["2308", "23081", "0050"])
+    assert index == {"2308": ["2308台達電"], "23081": ["23081測試"], "0050": ["0050元大台灣50"]}
+    assert build_index(["23081測試", "2308 (2)"], ["2308"]) == {"2308": ["2308 (2)"]}
+
+
+def test_build_index_latin_names():
+    # rename_code_only_sheets 以 twstock 的名稱命名：-KY 公司名稱以英文字母開頭
+    names = ["3673TPK-KY", "6456GIS-KY", "00632R元大台灣50反1", "00632", "2308"]
+    index = build_index(names, ["3673", "6456", "00632R", "00632", "2308", "1232"])
+    assert index == {"3673": ["3673TPK-KY"], "6456": ["6456GIS-KY"],
+                     "00632R": ["00632R元大台灣50反1"], "00632": ["00632"], "2308": ["2308"]}
+
+
+def test_stack_rows():
+    a, b = ["2025/06/02", "x"], ["2025/06/03", "y"]
+    assert _stack_rows("2025/06/01", [a]) == (1, [a])          # 新的一天 → 插入
+    assert _stack_rows("2025/06/02", [a]) == (0, [a])          # 同一天 → 覆寫第 5 列
+    assert _stack_rows("2025/06/01", [a, b]) == (2, [b, a])    # 最新的在最上面
+    a2 = ["2025/06/02", "z"]
+    assert _stack_rows("2025/06/01", [a, a2]) == (1, [a2])     # 同一天兩筆只留最後一筆
+
+
+@pytest.fixture
+def workbook(tmp_path, monkeypatch):
+    monkeypatch.setattr(excel_utils, "_backend", "openpyxl")
+    path = tmp_path / "write.xlsx"
+    wb = Workbook()
+    src = wb.active
+    src.title = "new title"
+    for r, code in enumerate(["2308", "0050", "3673"], start=2):
+        src.cell(r, 1, "2025/06/02")
+        src.cell(r, 2, code)
+        src.cell(r, 3, f"name-{code}")
+    for name, top in (("2308台達電", "2025/06/01"), ("23081測試", "2025/06/01"), ("0050元大台灣50", "2025/06/02"),
+                      ("3673TPK-KY", "2025/06/01")):
+        ws = wb.create_sheet(name)
+        ws["A5"], ws["B5"] = top, "old"
+        ws["A6"] = "older"
+    wb.save(path)
+    return path
+
+
+def test_classification_writes_matching_sheets_only(workbook):
+    with ExcelSession(str(workbook), "new title") as xls:
+        classification.classification(["2308", "0050", "3673"], xls, autofit=False)
+
+    wb = load_workbook(workbook)
+    dst = wb["2308台達電"]
+    assert [dst[f"{c}5"].value for c in "ABC"] == ["2025/06/02", "2308", "name-2308"]
+    assert (dst["A6"].value, dst["B6"].value, dst["A7"].value) == ("2025/06/01", "old", "older")
+
+    other = wb["23081測試"]                                      # 2308 不會誤中 23081
+    assert (other["A5"].value, other["B5"].value, other["A6"].value) == ("2025/06/01", "old", "older")
+
+    etf = wb["0050元大台灣50"]                                    # 同一天 → 覆寫、不插入
+    assert [etf[f"{c}5"].value for c in "ABC"] == ["2025/06/02", "0050", "name-0050"]
+    assert etf["A6"].value == "older"
+
+    ky = wb["3673TPK-KY"]
+    assert [ky[f"{c}5"].value for c in "ABC"] == ["2025/06/02", "3673", "name-3673"]
+    assert ky["A6"].value == "2025/06/01"
@@ -0,0 +1,37 @@
+"""code_table：解析證交所 ISIN 頁面（MS950），不收錄權證；以本機檔案更新代碼表。"""
+from pathlib import Path
+
+from 股票.function.code_table import CodeInfo, CodeTable, parse_isin
+
+FIXTURES = Path(__file__).resolve().parents[1] / "fixtures" / "code_table"
+SOURCES = {"twse": str(FIXTURES / "isin_twse.html"), "tpex": str(FIXTURES / "isin_tpex.html")}
+
+
+def test_parse_isin_categories_and_warrants():
+    rows = parse_isin((FIXTURES / "isin_twse.html").read_bytes(), "twse")
+    assert [r.code for r in rows] == ["1101", "2308", "2330", "0050", "0056", "00981A"]
+    assert rows[1] == CodeInfo("2308", "台達電", "股票", "上市", "電子零組件業", "twse")
+    assert rows[3].kind == "ETF" and rows[3].group == ""
+    assert "030001" not in {r.code for r in rows}           # 認購(售)權證不收錄
+
+
+def test_parse_isin_tpex():
+    rows = {r.code: r for r in parse_isin((FIXTURES / "isin_tpex.html").read_bytes(), "tpex")}
+    assert rows["5483"].market == "上櫃"
+    assert rows["00679B"].kind == "ETF"
+    assert all(r.source == "tpex" for r in rows.values())
+
+
+def test_refresh_saves_and_reloads(tmp_path, monkeypatch):
+    monkeypatch.setattr("股票.function.code_table._bundled_rows", lambda: [])
+    path = tmp_path / "codes.json"
+    table = CodeTable(path, sources=SOURCES)
+    assert len(table) == 0 and table.stale
+
+    assert table.refresh() == 12
+    assert not table.stale
+    assert (table.name("2330"), table.market("6488"), table.kind("0056")) == ("台積電", "上櫃", "ETF")
+    assert table.get("9999") is None
+
+    reloaded = CodeTable(path, sources=SOURCES)
+    assert len(reloaded) == 12 and reloaded.fetched_at == table.fetched_at
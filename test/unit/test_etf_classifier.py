@@ -0,0 +1,63 @@
+"""EtfClassifier：代碼表優先、API 結果存檔；查詢失敗（None）在 unknown_ttl 內不重查。"""
+import pytest
+
+from 股票.function import etf_classifier
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    clock = Clock()
+    calls: list[str] = []
+    answers: dict[str, bool | None] = {}
+    monkeypatch.setattr(etf_classifier.time, "time", clock.time)
+    monkeypatch.setattr(etf_classifier, "from_code_table",
+                        lambda code: {"2330": False, "0050": True}.get(code))
+    monkeypatch.setattr(etf_classifier, "query_yahoo",
+                        lambda code: calls.append(code) or answers.get(code))
+    clf = etf_classifier.EtfClassifier(tmp_path / "etf.sqlite", max_age_days=30, unknown_ttl_hours=24)
+    yield clf, clock, calls, answers
+    clf.close()
+
+
+def test_code_table_first(env):
+    clf, _, calls, _ = env
+    assert clf.classify_many(["2330", "0050"]) == {"2330": False, "0050": True}
+    assert calls == []
+    assert clf.stats == {"table": 2, "stored": 0, "api": 0}
+
+
+def test_unknown_result_kept_for_ttl(env):
+    clf, clock, calls, answers = env
+    assert clf.classify("00999X") is None                  # API 失敗
+    assert calls == ["00999X"]
+
+    clock.now += 23 * 3600
+    assert clf.classify("00999X") is None                  # TTL 內不重查
+    assert calls == ["00999X"]
+    assert clf.stats["stored"] == 1
+
+    clock.now += 2 * 3600
+    answers["00999X"] = True
+    assert clf.classify("00999X") is True                  # 過了 TTL 重查
+    assert calls == ["00999X", "00999X"]
+
+    clock.now += 29 * 86400
+    assert clf.classify("00999X") is True                  # 確定結果保留 max_age_days
+    assert len(calls) == 2
+
+
+def test_known_result_expires(env):
+    clf, clock, calls, answers = env
+    answers["6666"] = False
+    assert clf.classify_many(["6666", "6666"]) == {"6666": False}
+    clock.now += 31 * 86400
+    clf.classify("6666")
+    assert calls == ["6666", "6666"]
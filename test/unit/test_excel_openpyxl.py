@@ -0,0 +1,59 @@
+"""openpyxl 後端：公式儲存格讀回計算結果（同 xlwings）、存檔保留公式；未安裝 xlwings 時不會默默換後端。"""
+import zipfile
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from 股票.function import excel_utils
+from 股票.function.excel_utils import ExcelSession
+
+
+def excel_saved(path):
+    """openpyxl 寫入公式、再補上計算結果（模擬由 Excel 存過的檔案）。"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "new title"
+    ws["A1"], ws["B1"], ws["C1"] = 2, "=A1*3", "=A1+1"
+    ws["A5"] = "=B1"
+    wb.save(path)
+    with zipfile.ZipFile(path) as zf:
+        parts = {name: zf.read(name) for name in zf.namelist()}
+    sheet = parts["xl/worksheets/sheet1.xml"].decode()
+    sheet = sheet.replace("<f>A1*3</f><v></v>", "<f>A1*3</f><v>6</v>")
+    sheet = sheet.replace("<f>B1</f><v></v>", "<f>B1</f><v>6</v>")
+    parts["xl/worksheets/sheet1.xml"] = sheet.encode()
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in parts.items():
+            zf.writestr(name, data)
+
+
+def test_formula_cells_read_as_values(tmp_path, monkeypatch):
+    monkeypatch.setattr(excel_utils, "_backend", "openpyxl")
+    path = tmp_path / "formula.xlsx"
+    excel_saved(path)
+    with ExcelSession(str(path), "new title") as xls:
+        assert xls.range("A1:C1").value == [2, 6, None]         # 沒有快取值的公式 → None
+        mirror = xls.mirror("A1:C1")
+        mirror.set(1, 1, 5)
+        mirror.flush()                                          # 只寫回 A1，公式不會被覆寫成值
+        xls.save()
+
+    ws = load_workbook(path)["new title"]
+    assert (ws["A1"].value, ws["B1"].value, ws["C1"].value) == (5, "=A1*3", "=A1+1")
+
+
+def test_cached_values_follow_inserted_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(excel_utils, "_backend", "openpyxl")
+    path = tmp_path / "formula.xlsx"
+    excel_saved(path)
+    with ExcelSession(str(path), "new title") as xls:
+        xls.insert_rows(1, 2)
+        assert xls.range("B3").value == 6
+        assert xls.range("A7").value == 6
+
+
+def test_missing_xlwings_is_an_error(monkeypatch):
+    monkeypatch.setattr(excel_utils, "_backend", "xlwings")
+    monkeypatch.setattr(excel_utils, "_xlwings", lambda: None)
+    with pytest.raises(ImportError, match="excel_backend"):
+        ExcelSession("data.xlsx", "new title")
@@ -0,0 +1,84 @@
+"""FreshnessStore：daily / quarterly / event 的到期規則；失敗欄位不記錄、不適用欄位不排入。"""
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from 股票.function import etf_classifier, metric_registry
+from 股票.function.freshness import FreshnessStore
+from 股票.function.stock_end import End, iter_stocks
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = FreshnessStore(tmp_path / "freshness.sqlite")
+    yield s
+    s.close()
+
+
+def test_never_fetched_is_due(store):
+    assert store.is_due("ROE", None, datetime(2025, 6, 1))
+
+
+def test_daily_max_age(store):
+    fetched = datetime(2025, 6, 2, 15)
+    assert not store.is_due("昨收", fetched, datetime(2025, 6, 3, 10))     # 19 小時
+    assert store.is_due("昨收", fetched, datetime(2025, 6, 3, 11))         # 20 小時
+
+
+def test_quarterly_due_after_deadline(store):
+    fetched = datetime(2025, 5, 10)
+    assert not store.is_due("ROE", fetched, datetime(2025, 5, 14, 23))
+    assert store.is_due("ROE", fetched, datetime(2025, 5, 15, 9))          # 過了 05-15
+    # 期限之後才抓的不需要重抓，直到下一個期限（未滿 30 天的 max_age）
+    assert not store.is_due("ROE", datetime(2025, 7, 20), datetime(2025, 8, 13, 23))
+    assert store.is_due("ROE", datetime(2025, 7, 20), datetime(2025, 8, 14, 1))
+
+
+def test_quarterly_deadline_wraps_year(store):
+    # 1 月時最近的期限是去年 11-14
+    assert store._last_deadline(datetime(2025, 1, 20)) == datetime(2024, 11, 14)
+    assert store.is_due("ROE", datetime(2024, 11, 1), datetime(2025, 1, 20))
+    assert store.is_due("ROE", datetime(2025, 3, 1), datetime(2025, 3, 31, 8))
+
+
+def test_quarterly_max_age(tmp_path):
+    s = FreshnessStore(tmp_path / "f.sqlite", max_age_hours={"quarterly": 24})
+    assert s.is_due("ROE", datetime(2025, 6, 1), datetime(2025, 6, 2, 1))
+    s.close()
+
+
+def test_event_max_age(store):
+    fetched = datetime(2025, 6, 1)
+    assert not store.is_due("除息日", fetched, datetime(2025, 6, 7, 23))
+    assert store.is_due("除息日", fetched, datetime(2025, 6, 8))
+
+
+def test_due_skips_recorded_fields_but_not_failures(store):
+    now = datetime(2025, 6, 2, 15)
+    stock = SimpleNamespace(code="2330", fields=["昨收", "市盈率", "ROE", "股票股利"],
+                            昨收="950", 市盈率="-", ROE="7.5", 股票股利="-", failed={"市盈率"})
+    store.record(stock, now)
+    # 抓取失敗的 市盈率 不記錄；沒有配股（值本來就是 "-"）照樣記錄
+    assert store.last_values("2330") == {"昨收": "950", "ROE": "7.5", "股票股利": "-"}
+    assert store.due("2330", ["昨收", "市盈率", "ROE", "股票股利"], datetime(2025, 6, 2, 20)) == ["市盈率"]
+    assert (store.skipped, store.refreshed) == (3, 1)
+
+
+def test_end_marks_failed_fields():
+    stock = End("2330", 2, False, ["昨收", "市盈率", "殖利率", "除息日"])
+    stock.bulk = {"殖利率": "2.1"}
+    stock.mark_failed("財務報表")                      # 除權除息頁失敗：整批填入的 殖利率 不算
+    assert stock.failed == {"除息日"}
+
+
+def test_unknown_etf_flag_resolved_before_due(store, monkeypatch):
+    monkeypatch.setattr(etf_classifier, "classify", lambda code: code == "0050")
+    now = datetime.now()
+    for code, flag in (("2330", False), ("0050", True)):
+        done = End(code, 2, flag, metric_registry.applicable(metric_registry.FIELDS, flag))
+        store.record(done, now)
+    # 設定檔沒指定 ETF 與否：不適用的欄位（個股的 管理費、ETF 的 ROE …）不會被當成到期
+    stocks = list(iter_stocks(["2330", "0050"], metric_registry.FIELDS, store))
+    assert stocks == []
+    assert store.refreshed == 0
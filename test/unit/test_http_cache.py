@@ -0,0 +1,39 @@
+"""http_cache：configure() 前為不快取的替身；lookup 更新的 LRU 時間會確實寫入。"""
+import sqlite3
+import time
+
+from 股票.function import http_cache
+
+
+def test_default_cache_is_pass_through(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(http_cache, "_cache", http_cache._NoCache())
+    cache = http_cache.get_cache()
+    assert isinstance(cache, http_cache._NoCache)
+    assert cache.begin("https://histock.tw/stock/2308/x") == (None, {}, None)
+    assert not (tmp_path / ".cache").exists()
+
+
+def test_lookup_commits_access_time(tmp_path):
+    path = tmp_path / "http.sqlite"
+    cache = http_cache.HttpCache(path)
+    cache.store("u", b"body", {})
+    with sqlite3.connect(path) as db:
+        db.execute("UPDATE responses SET accessed_at = 0")
+    before = time.time()
+    assert cache.lookup("u")[0] == b"body"
+    with sqlite3.connect(path, timeout=0.1) as db:          # 未提交時此處會因寫鎖逾時
+        db.execute("UPDATE responses SET size = size")
+        accessed = db.execute("SELECT accessed_at FROM responses").fetchone()[0]
+    assert accessed >= before
+    cache.close()
+
+
+def test_user_ttl_overrides_default_pattern(tmp_path):
+    quarterly = next(p for p, s in http_cache.DEFAULT_TTL.items() if s == 7 * 24 * 3600 and "histock" in p)
+    cache = http_cache.HttpCache(tmp_path / "http.sqlite", ttl={quarterly: 60, r"histock\.tw/stock/": 30})
+    roe = "https://histock.tw/stock/2308/%E5%A0%B1%E9%85%AC%E7%8E%87"
+    assert cache.ttl_for(roe) == 60                                   # 同一個樣式：使用者的值生效
+    assert cache.ttl_for("https://histock.tw/stock/2308/%E6%9C%AC%E7%9B%8A%E6%AF%94") == 30
+    assert cache.ttl_for("https://tw.stock.yahoo.com/quote/2308/profile") == 24 * 3600   # 其餘沿用預設
+    cache.close()
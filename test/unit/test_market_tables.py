@@ -0,0 +1,60 @@
+"""MarketTables：以 test/fixtures/market_tables 的本機檔案驗證解析、填值與逐檔補抓的範圍。"""
+from pathlib import Path
+
+import pytest
+
+from 股票.function.market_tables import FIELDS, MarketTables
+from 股票.function.stock_end import End
+
+FIXTURES = Path(__file__).resolve().parents[1] / "fixtures" / "market_tables"
+
+
+@pytest.fixture
+def tables() -> MarketTables:
+    return MarketTables({"twse": str(FIXTURES / "twse_BWIBBU_ALL.json"),
+                         "tpex": str(FIXTURES / "tpex_peratio.csv")})
+
+
+def test_parses_both_markets(tables):
+    assert len(tables) == 8
+    assert tables.lookup("2308") == {"市盈率": "31.27", "市淨率": "6.44", "殖利率": "1.62"}
+    # 櫃買 CSV 為 cp950，前有標題列、後有說明列
+    assert tables.lookup("5483") == {"市盈率": "12.40", "市淨率": "1.35", "殖利率": "4.12"}
+    assert tables.lookup("3105")["市盈率"] == "-"          # N/A
+    assert tables.lookup("2409")["市盈率"] == "-"          # 空字串
+
+
+def test_fill_listed_code_skips_all_pages(tables):
+    stock = End("2308", 2, False, list(FIELDS))
+    assert tables.fill(stock) == FIELDS
+    assert (stock.市盈率, stock.市淨率, stock.殖利率) == ("31.27", "6.44", "1.62")
+    assert stock.plan(False) == []
+
+
+def test_blank_values_fall_back_to_scraping(tables):
+    stock = End("2409", 2, False, list(FIELDS))
+    assert tables.fill(stock) == ["市淨率", "殖利率"]
+    assert stock.市盈率 == "-"
+    assert "市盈率" not in stock.bulk
+    assert stock.plan(False) == [("本益比", "get_PE")]
+
+    stock = End("3105", 3, False, list(FIELDS))
+    assert tables.fill(stock) == ["市淨率", "殖利率"]
+    assert stock.plan(False) == [("本益比", "get_PE")]
+
+
+def test_missing_code_is_scraped(tables):
+    stock = End("0050", 2, True, list(FIELDS))
+    assert tables.fill(stock) == []
+    assert stock.bulk == {}
+    assert stock.plan(True) == [("除權除息", "財務報表")]
+    assert (tables.filled, tables.missing) == (0, 1)
+
+
+def test_fill_only_requested_fields(tables):
+    stock = End("2105", 2, False, ["昨收", "市淨率"])
+    assert tables.fill(stock) == ["市淨率"]
+    assert stock.市盈率 == "-"
+    assert stock.plan(False) == [("quote", "yesterday_close")]
+    assert tables.fill(End("2105", 3, False, ["昨收"])) == []
+    assert (tables.filled, tables.missing) == (1, 0)
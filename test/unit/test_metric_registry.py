@@ -0,0 +1,41 @@
+"""metric_registry：依欄位算出最少頁面、欄位切成連續區段。"""
+import pytest
+
+from 股票.function import metric_registry as reg
+
+
+def test_plan_shares_pages_and_keeps_order():
+    assert reg.plan(False, ["市盈率", "市淨率", "殖利率"]) == [
+        ("本益比", "get_PE"), ("股價淨值比", "get_PB"), ("除權除息", "財務報表"),
+    ]
+    # 同一頁的多個欄位只排一次
+    assert reg.plan(False, ["盈餘", "現金股利", "除息日"]) == [("除權除息", "財務報表")]
+    assert reg.plan(False, ["ROE", "資產報酬率"]) == [("報酬率", "杜邦分析")]
+
+
+def test_plan_by_asset():
+    assert reg.plan(True, ["市盈率"]) == []                    # 個股專用欄位
+    assert reg.plan(True, ["股息發放日"]) == [("profile", "股息發放日_ETF")]
+    assert reg.plan(False, ["股息發放日"]) == [("profile", "股息發放日_person")]
+    assert reg.plan(True, ["管理費"]) == [("profile", "ManagementFee")]
+
+
+def test_plan_all_fields_visits_each_page_method_once():
+    steps = reg.plan(False)
+    assert len(steps) == len(set(steps))
+    assert {m for _, m in steps} >= {"yesterday_close", "get_PE", "get_現金流"}
+
+
+def test_select_validates():
+    assert reg.select(None) == reg.FIELDS
+    assert reg.select(["殖利率", "昨收"]) == ["昨收", "殖利率"]
+    with pytest.raises(ValueError):
+        reg.select(["不存在"])
+
+
+def test_column_runs():
+    assert reg.column_runs(["昨收", "市盈率", "殖利率"]) == [
+        ("P", "Q", ["昨收", "市盈率"]), ("AH", "AH", ["殖利率"]),
+    ]
+    assert reg.column_runs(reg.FIELDS) == [("P", "AN", reg.FIELDS)]
+    assert reg.column_runs([]) == []
@@ -0,0 +1,56 @@
+"""rate_limiter：Retry-After 解析，且同步 / asyncio 兩條路徑都會依 Retry-After 暫停整個 host。"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from 股票.function import async_engine, http_cache, rate_limiter
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_limiter", rate_limiter.RateLimiter())
+    monkeypatch.setattr(http_cache, "_cache", http_cache._NoCache())
+    monkeypatch.setattr(rate_limiter, "retry_delay", lambda host, attempt: 0.0)
+    return rate_limiter.get_limiter()
+
+
+def test_parse_retry_after():
+    assert rate_limiter.parse_retry_after("7") == 7.0
+    assert rate_limiter.parse_retry_after(None) is None
+    assert rate_limiter.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") is None
+
+
+def test_sync_slot_blocks_host(limiter):
+    with limiter.limit("h") as slot:
+        slot.status = 429
+        slot.retry_after = 0.3
+    t0 = time.monotonic()
+    with limiter.limit("h"):
+        pass
+    assert time.monotonic() - t0 >= 0.25
+
+
+class FakeClient:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.times: list[float] = []
+
+    async def get(self, url, headers=None, timeout=None):
+        self.times.append(time.monotonic())
+        status, retry_after = self.responses.pop(0)
+        return SimpleNamespace(status_code=status, content=b"<html><title>ok</title></html>",
+                               headers={"Retry-After": retry_after} if retry_after else {})
+
+
+def test_async_path_honours_retry_after(limiter):
+    client = FakeClient([(429, "0.3"), (200, None)])
+
+    async def main():
+        return await async_engine.AsyncFetcher(client).fetch_html("https://histock.tw/stock/2330/x")
+
+    soup = asyncio.run(main())
+    assert soup.title.text == "ok"
+    assert client.times[1] - client.times[0] >= 0.25
+    assert limiter.host("histock.tw").rate < rate_limiter.LimitConfig().rate     # 429 也觸發降速
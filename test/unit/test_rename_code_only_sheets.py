@@ -0,0 +1,32 @@
+"""rename_code_only_sheets：只讀 B:C 兩欄，純代碼工作表改成「代碼＋名稱」（以 openpyxl 後端執行）。"""
+from openpyxl import Workbook, load_workbook
+
+from 股票.function import excel_utils
+from 股票.function.excel_utils import ExcelSession
+from 股票.function.rename_code_only_sheets import rename_code_only_sheets
+
+
+def test_renames_code_only_sheets(tmp_path, monkeypatch):
+    monkeypatch.setattr(excel_utils, "_backend", "openpyxl")
+    path = tmp_path / "rename.xlsx"
+    wb = Workbook()
+    src = wb.active
+    src.title = "new title"
+    for r, (code, name) in enumerate([("2308", "台達電"), ("0050", "元大台灣50"), ("1232", None)], start=2):
+        src.cell(r, 2, code)
+        src.cell(r, 3, name)
+        src.cell(r, 15, 123.4)                   # O 欄的即時資料不需讀取
+    for title in ("2308", "0050元大台灣50", "1232"):
+        wb.create_sheet(title)
+    wb.save(path)
+
+    mirrored = []
+    real_mirror = ExcelSession.mirror
+    monkeypatch.setattr(ExcelSession, "mirror",
+                        lambda self, addr=None: mirrored.append(addr) or real_mirror(self, addr))
+    with ExcelSession(str(path), "new title") as xls:
+        rename_code_only_sheets(xls)
+        xls.save()
+
+    assert mirrored == ["B2:C4"]
+    assert load_workbook(path).sheetnames == ["new title", "2308台達電", "0050元大台灣50", "1232"]
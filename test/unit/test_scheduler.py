@@ -0,0 +1,96 @@
+"""CrawlScheduler：同一頁只抓一次、依完成順序交回、單頁失敗不影響其他頁。"""
+import threading
+from collections import Counter
+
+from 股票.function.scheduler import CrawlScheduler
+
+
+class FakeStock:
+    def __init__(self, code: str, steps: list[tuple[str, str]]) -> None:
+        self.code = code
+        self.steps = steps
+        self.parsed: list[tuple[str, object]] = []
+        self.logs: list[str] = []
+        self.failed: set[str] = set()
+
+    def plan(self, is_etf):
+        return self.steps
+
+    def url(self, page: str) -> str:
+        return f"{self.code}/{page}"
+
+    def _log(self, msg: str) -> None:
+        self.logs.append(msg)
+
+    def _flush_log(self) -> None:
+        pass
+
+    def mark_failed(self, method: str) -> None:
+        self.failed.add(method)
+
+    def __getattr__(self, method: str):
+        if method.startswith("m_"):
+            return lambda soup: self.parsed.append((method, soup))
+        raise AttributeError(method)
+
+
+def test_page_fetched_once_for_all_methods():
+    fetched = Counter()
+    lock = threading.Lock()
+
+    def fetch(url, page):
+        with lock:
+            fetched[url] += 1
+        return f"soup:{url}"
+
+    stock = FakeStock("2330", [("profile", "m_navps"), ("quote", "m_close"), ("profile", "m_dividend")])
+    done = list(CrawlScheduler(fetch, max_workers=4).run([(stock, False)]))
+
+    assert done == [stock]
+    assert fetched == {"2330/profile": 1, "2330/quote": 1}
+    assert sorted(stock.parsed) == [("m_close", "soup:2330/quote"),
+                                    ("m_dividend", "soup:2330/profile"),
+                                    ("m_navps", "soup:2330/profile")]
+
+
+def test_stocks_yield_in_completion_order():
+    release = threading.Event()
+
+    def fetch(url, page):
+        if url.startswith("slow/"):
+            assert release.wait(5)
+        return url
+
+    slow = FakeStock("slow", [("cash-flow", "m_cash")])
+    fast = [FakeStock(f"f{i}", [("quote", "m_close")]) for i in range(3)]
+    order = []
+    for stock in CrawlScheduler(fetch, max_workers=2).run([(slow, False)] + [(s, False) for s in fast]):
+        order.append(stock.code)
+        if len(order) == len(fast):
+            release.set()                      # 其他股票都完成後才放行慢頁面
+    assert order[-1] == "slow"
+    assert set(order[:-1]) == {"f0", "f1", "f2"}
+
+
+def test_failed_page_still_completes_stock():
+    def fetch(url, page):
+        if page == "bad":
+            raise ConnectionError("boom")
+        return url
+
+    stock = FakeStock("2308", [("bad", "m_bad"), ("good", "m_good")])
+    empty = FakeStock("0050", [])                          # 沒有適用的頁面 → 直接完成
+    done = list(CrawlScheduler(fetch, max_workers=2).run([(stock, False), (empty, True)]))
+
+    assert {s.code for s in done} == {"2308", "0050"}
+    assert stock.parsed == [("m_good", "2308/good")]
+    assert any("bad 抓取失敗" in msg for msg in stock.logs)
+    assert stock.failed == {"m_bad"}
+
+
+def test_bounded_queue_handles_many_stocks():
+    stocks = [FakeStock(str(i), [("a", "m_a"), ("b", "m_b")]) for i in range(200)]
+    done = list(CrawlScheduler(lambda url, page: url, max_workers=3, queue_size=2).run(
+        (s, False) for s in stocks))
+    assert len(done) == 200
+    assert all(len(s.parsed) == 2 for s in stocks)
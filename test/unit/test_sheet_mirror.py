@@ -0,0 +1,83 @@
+"""SheetMirror：變動儲存格合併成矩形、只寫回有變動的範圍。"""
+from datetime import datetime
+
+import pytest
+
+from 股票.function.excel_utils import SheetMirror
+
+
+class FakeSheet:
+    """記錄每次 range(addr).value = ... 的寫入。"""
+
+    def __init__(self) -> None:
+        self.writes: list[tuple[str, list[list]]] = []
+
+    def range(self, addr: str):
+        sheet = self
+
+        class _Range:
+            @property
+            def value(self):
+                raise AssertionError("鏡像不應該再讀工作表")
+
+            @value.setter
+            def value(self, block):
+                sheet.writes.append((addr, block))
+
+        return _Range()
+
+
+def grid(rows: int, cols: int) -> list[list]:
+    return [[f"r{r}c{c}" for c in range(cols)] for r in range(rows)]
+
+
+def test_no_changes():
+    m = SheetMirror(FakeSheet(), 2, 16, grid(3, 4))
+    assert m.changes() == []
+    assert m.flush() == 0
+    assert m.com_calls == 1
+
+
+def test_same_columns_on_adjacent_rows_merge_into_one_rect():
+    m = SheetMirror(FakeSheet(), 2, 16, grid(4, 5))          # P2:T5
+    for row in (2, 3, 4):
+        m.set_row(row, "Q", [row, row])                       # Q:R 三列
+    assert m.changes() == [(2, 17, 4, 18)]
+
+
+def test_different_runs_stay_separate():
+    m = SheetMirror(FakeSheet(), 2, 1, grid(3, 6))
+    m.set(2, "A", "x")
+    m.set(2, "B", "x")
+    m.set(2, "E", "x")                                         # 同列兩段
+    m.set(3, "A", "x")                                         # 欄位範圍不同（A 而非 A:B）
+    m.set(4, "A", "x")
+    m.set(4, "B", "x")                                         # 與第 2 列不相鄰
+    assert m.changes() == [(2, 1, 2, 2), (2, 5, 2, 5), (3, 1, 3, 1), (4, 1, 4, 2)]
+
+
+def test_equivalent_values_are_not_changes():
+    values = [[2330.0, datetime(2024, 6, 14), None, "台積電"]]
+    m = SheetMirror(FakeSheet(), 2, 1, values)
+    m.set_row(2, 1, ["2,330", "2024/06/14", "", "'台積電"])
+    assert m.changes() == []
+
+
+def test_flush_writes_blocks_and_resets_base():
+    sheet = FakeSheet()
+    m = SheetMirror(sheet, 5, 2, grid(3, 3))                   # B5:D7
+    m.set(5, "C", 1)
+    m.set(6, "C", 2)
+    m.set(7, "D", 3)
+    assert m.flush() == 2
+    assert sheet.writes == [("C5", [[1], [2]]), ("D7", [[3]])]
+    assert m.com_calls == 3
+    assert m.changes() == []                                   # 已寫回，不再重寫
+
+
+def test_out_of_range_raises():
+    m = SheetMirror(FakeSheet(), 2, 16, grid(2, 2))
+    with pytest.raises(IndexError):
+        m.set(4, "P", 1)
+    with pytest.raises(IndexError):
+        m.set_row(2, "Q", [1, 2])
@@ -0,0 +1,56 @@
+"""SnapshotStore：同日合併欄位；只看適用欄位，失敗的欄位不算完成、本來就是 "-" 的算完成。"""
+from datetime import date
+
+from 股票.function import metric_registry
+from 股票.function.snapshot_store import SnapshotStore
+from 股票.function.stock_end import End
+
+DAY = date(2025, 6, 2)
+FIELDS = metric_registry.FIELDS
+
+
+def crawled(code, is_etf, fields=None, failed=(), **values):
+    """模擬抓完的一列：plan() 確定資產別，有值的欄位填入，其餘維持 "-"。"""
+    stock = End(code, 2, None, fields)
+    stock.plan(is_etf)
+    for field in metric_registry.applicable(fields or FIELDS, is_etf):
+        setattr(stock, field, values.get(field, "1.0"))
+    for method in failed:
+        stock.mark_failed(method)
+    return stock
+
+
+def test_complete_stock_row_is_done(tmp_path):
+    store = SnapshotStore(tmp_path / "s.sqlite")
+    # 管理費（ETF 專用）維持 "-"、沒有配股的 股票股利 也是 "-"，仍算完成
+    store.save(crawled("2308", False, 股票股利="-"), DAY)
+    store.save(crawled("0050", True), DAY)                     # 個股專用欄位全是 "-"
+    assert store.done(["2308", "0050", "2330"], FIELDS, DAY) == {"2308", "0050"}
+    assert store.done({"2308": False, "0050": True}, FIELDS, DAY) == {"2308", "0050"}
+    store.close()
+
+
+def test_failed_page_blocks_until_refetched(tmp_path):
+    store = SnapshotStore(tmp_path / "s.sqlite")
+    store.save(crawled("2330", False, failed=["get_PE"]), DAY)
+    assert store.done(["2330"], FIELDS, DAY) == set()
+
+    # 增量重抓 市盈率 成功後合併進當天的快照
+    store.save(crawled("2330", False, ["市盈率"], 市盈率="25.1"), DAY)
+    assert store.load(DAY)["2330"]["市盈率"] == "25.1"
+    assert store.done(["2330"], FIELDS, DAY) == {"2330"}
+    assert store.load(date(2025, 6, 3)) == {}
+    store.close()
+
+
+def test_partial_columns_and_unknown_asset(tmp_path):
+    store = SnapshotStore(tmp_path / "s.sqlite")
+    store.save(crawled("2317", False, ["昨收", "市盈率"]), DAY)
+    assert store.done(["2317"], ["昨收", "市盈率"], DAY) == {"2317"}
+    assert store.done(["2317"], ["昨收", "ROE"], DAY) == set()        # 沒存過的欄位
+
+    unknown = End("1232", 2)                                           # 沒有經過 plan()
+    store.save(unknown, DAY)
+    assert store.done(["1232"], ["昨收"], DAY) == set()
+    assert store.done({"1232": False}, ["昨收"], DAY) == {"1232"}
+    store.close()
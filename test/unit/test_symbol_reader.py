@@ -0,0 +1,63 @@
+"""symbol_reader：直接串流 xlsx 的 XML 讀 B 欄，並依 mtime / 大小快取。"""
+import os
+
+import pytest
+from openpyxl import Workbook
+
+from 股票.function import symbol_reader
+
+
+def make_book(path, codes, sheet="清單"):
+    wb = Workbook()
+    wb.active.title = "其他"
+    wb.active["B2"] = "1101"                    # 其他工作表的 B 欄
+    ws = wb.create_sheet(sheet)
+    ws["A1"], ws["B1"] = "名稱", "代碼"
+    for i, code in enumerate(codes, start=2):
+        ws.cell(i, 1, f"name{i}")
+        ws.cell(i, 2, code)
+    ws.cell(len(codes) + 3, 2, "9999")                     # 空白格之後的值不讀
+    wb.save(path)
+
+
+@pytest.fixture
+def no_fallback(monkeypatch):
+    """確保走 XML 串流路徑，不退回 openpyxl / pandas。"""
+    def fail(*args):
+        raise AssertionError("不應退回 openpyxl")
+    monkeypatch.setattr(symbol_reader, "_scan_openpyxl", fail)
+
+
+def test_stream_xlsx(tmp_path, no_fallback):
+    path = tmp_path / "read.xlsx"
+    make_book(path, [2330, "0050", 2308.0, "00679B"])
+    assert symbol_reader.scan_column(path, "清單") == ["2330", "0050", "2308", "00679B"]
+
+
+def test_missing_sheet(tmp_path, no_fallback):
+    path = tmp_path / "read.xlsx"
+    make_book(path, ["2330"])
+    with pytest.raises(KeyError):
+        symbol_reader.scan_column(path, "不存在")
+
+
+def test_cache_invalidated_by_file_change(tmp_path, monkeypatch):
+    path, cache = tmp_path / "read.xlsx", tmp_path / "symbols.json"
+    make_book(path, ["2330", "2317"])
+    scans = []
+    real_scan = symbol_reader.scan_column
+    monkeypatch.setattr(symbol_reader, "scan_column", lambda *a: scans.append(a) or real_scan(*a))
+
+    assert symbol_reader.read_symbols(path, "清單", cache) == ["2330", "2317"]
+    assert symbol_reader.read_symbols(path, "清單", cache) == ["2330", "2317"]
+    assert len(scans) == 1                                  # 第二次由快取回傳
+
+    make_book(path, ["2330", "2317", "2308"])
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert symbol_reader.read_symbols(path, "清單", cache) == ["2330", "2317", "2308"]
+    assert len(scans) == 2
+
+    # 不同工作表各自快取
+    assert symbol_reader.read_symbols(path, "其他", cache) == ["1101"]
+    assert len(scans) == 3
@@ -0,0 +1,230 @@
+# async_engine.py
+"""
+asyncio 版歷史資料抓取引擎：update_data_parallel 的替代方案。
+
+- 每個 (code, page) 抓取都是一個 coroutine，單一執行緒即可同時掛上數百個請求
+- 每個 host 一個 Semaphore 作為硬上限，實際速度再由 rate_limiter（令牌桶＋AIMD）調節
+- 與 fetch_html 共用 http_cache：未過期直接命中，過期則送條件式 GET；
+  快取、錄影帶、快照與新鮮度的 SQLite 讀寫都以 asyncio.to_thread 執行，不在事件迴圈上等磁碟
+- 解析沿用 End 的各個方法與 End.plan()（metric_registry），寫入同樣的 P:AN 欄
+
+需要 httpx（pip install httpx）；未安裝時 update_data_async 會退回 update_data_parallel。
+
+使用範例：
+    with ExcelSession("data.xlsx", "new title") as xls:
+        update_data_async(xls, {"0050": True, "2308": False}, per_host=64)
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+
+from . import http_cache, http_client, instrumentation, rate_limiter, vcr
+from .excel_utils import ExcelSession, SheetMirror
+from . import metric_registry
+from .freshness import FreshnessStore
+from .market_tables import MarketTables
+from .snapshot_store import SnapshotStore
+from .stock_end import (
+    FLUSH_ROWS, End, finish_stock, history_mirror, iter_stocks, parse_html,
+    resume_from_snapshots, update_data_parallel,
+)
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+logger = logging.getLogger("crawler")
+
+DEFAULT_PER_HOST = 32
+
+
+class AsyncFetcher:
+    """共用 httpx.AsyncClient ＋ 每 host 一個 Semaphore。"""
+
+    def __init__(self, client, per_host: int | dict[str, int] = DEFAULT_PER_HOST) -> None:
+        self._client = client
+        if isinstance(per_host, dict):
+            default = per_host.get("default", DEFAULT_PER_HOST)
+            limits = per_host
+        else:
+            default, limits = per_host, {}
+        self._sems: dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(default)
+        )
+        for host, n in limits.items():
+            if host != "default":
+                self._sems[host] = asyncio.Semaphore(n)
+        self.requests = 0
+
+    async def fetch_html(self, url: str, page: str | None = None) -> BeautifulSoup:
+        """與 stock_end.fetch_html 相同的重試語意：非 200 退避後重抓，最多 3 次。"""
+        host = urlsplit(url).hostname or ""
+        cache = http_cache.get_cache()
+        metrics = instrumentation.get_metrics()
+        for attempt in range(3):
+            if attempt:
+                metrics.retry(host, page)
+            t0 = time.perf_counter()
+            hit, headers, cached = await asyncio.to_thread(cache.begin, url)
+            if hit is not None:
+                metrics.request(host, page, time.perf_counter() - t0, len(hit.content), 200, True)
+                return parse_html(hit.content, page)
+            tape = vcr.active()
+            try:
+                if tape is not None and tape.replaying:
+                    resp = await asyncio.to_thread(tape.replay, url)   # 重播：不連網、不經限流
+                else:
+                    async with self._sems[host], rate_limiter.limit_async(host) as slot:
+                        self.requests += 1
+                        resp = await self._client.get(http_client.rewrite(url), headers=headers, timeout=5)
+                        slot.status = resp.status_code
+                        slot.retry_after = rate_limiter.parse_retry_after(resp.headers.get("Retry-After"))
+                    if tape is not None:
+                        await asyncio.to_thread(tape.record, url, resp)
+            except Exception:
+                metrics.fetch_error(host, page)
+                raise
+            resp = await asyncio.to_thread(cache.complete, url, resp, cached)
+            metrics.request(host, page, time.perf_counter() - t0, len(resp.content), resp.status_code,
+                            getattr(resp, "from_cache", False))
+            if resp.status_code == 200:
+                return parse_html(resp.content, page)
+            await asyncio.sleep(rate_limiter.retry_delay(host, attempt))
+        metrics.fetch_error(host, page)
+        raise RuntimeError(f"HTTP {resp.status_code}: {url}")
+
+
+async def fetch_one_async(fetcher: AsyncFetcher,
+                          stock: End,
+                          is_etf_flag: bool | None = None) -> End:
+    """單一股票：同時抓 plan 需要的所有頁面，再交給 End 的方法解析。"""
+    code = stock.code
+    if is_etf_flag is None:                      # 設定檔沒指定才查 API（阻塞呼叫丟到執行緒）
+        is_etf_flag = await asyncio.to_thread(stock._is_etf, code)
+
+    metrics = instrumentation.get_metrics()
+    started = time.perf_counter()
+    page_seconds: dict[str, float] = {}
+
+    async def timed(page: str) -> BeautifulSoup:
+        t0 = time.perf_counter()
+        try:
+            return await fetcher.fetch_html(stock.url(page), page)
+        finally:
+            page_seconds[page] = time.perf_counter() - t0
+
+    plan = stock.plan(is_etf_flag)
+    pages = list(dict.fromkeys(page for page, _ in plan))   # 去重且保留順序
+    results = await asyncio.gather(*(timed(page) for page in pages), return_exceptions=True)
+    soups = dict(zip(pages, results))
+
+    for page, method in plan:
+        soup = soups[page]
+        if isinstance(soup, BaseException):
+            stock._log(f"[警告] {code} {method} 抓取失敗：{soup}")
+            stock.mark_failed(method)
+            continue
+        t1 = time.perf_counter()
+        try:
+            getattr(stock, method)(soup)
+        except Exception as exc:  # noqa: BLE001 — 單一欄位失敗維持 "-"
+            stock._log(f"[警告] {code} {method} 解析失敗：{exc!r}")
+            stock.mark_failed(method)
+        metrics.extract(method, time.perf_counter() - t1, page_seconds[page])
+    metrics.stock("async", code, time.perf_counter() - started)
+    stock._flush_log()
+    return stock
+
+
+async def _crawl(mirror: SheetMirror,
+                 stocks: list[tuple[End, bool | None]],
+                 per_host: int | dict[str, int],
+                 http2: bool,
+                 freshness: FreshnessStore | None,
+                 snapshots: SnapshotStore | None) -> int:
+    import httpx
+
+    max_conn = per_host if isinstance(per_host, int) else sum(per_host.values())
+    limits = httpx.Limits(max_connections=max(max_conn * 2, 10),
+                          max_keepalive_connections=max(max_conn, 10))
+    async with httpx.AsyncClient(http2=http2, limits=limits) as client:
+        fetcher = AsyncFetcher(client, per_host)
+        tasks = [
+            asyncio.create_task(fetch_one_async(fetcher, stock, flag))
+            for stock, flag in stocks
+        ]
+        # 依完成順序寫進鏡像，定期合併寫回 Excel；
+        # finish_stock 每檔都要 commit 快照與新鮮度，丟到執行緒（一次一檔，鏡像不會同時被改）
+        try:
+            for n, task in enumerate(asyncio.as_completed(tasks), 1):
+                await asyncio.to_thread(finish_stock, mirror, await task, freshness, snapshots)
+                if n % FLUSH_ROWS == 0:
+                    mirror.flush()
+        finally:
+            mirror.flush()
+        return fetcher.requests
+
+
+def update_data_async(session: ExcelSession,
+                      codes: list[str] | dict[str, bool],
+                      per_host: int | dict[str, int] = DEFAULT_PER_HOST,
+                      http2: bool = False,
+                      columns: list[str] | None = None,
+                      freshness: FreshnessStore | None = None,
+                      snapshots: SnapshotStore | None = None,
+                      resume: bool = False,
+                      bulk: MarketTables | None = None,
+                      max_workers: int = 24) -> None:
+    """
+    asyncio 版 update_data_parallel。
+
+    Parameters
+    ----------
+    per_host : int | dict[str, int]
+        每個 host 同時進行的請求上限；dict 形式可個別指定，例如
+        {"histock.tw": 64, "tw.stock.yahoo.com": 32, "default": 16}。
+    http2 : bool
+        是否啟用 HTTP/2（需 httpx[http2]）。
+    columns : list[str] | None
+        只更新這些欄位（同 update_data_parallel）。
+    freshness : FreshnessStore | None
+        增量模式（同 update_data_parallel）。
+    snapshots, resume :
+        檢查點與續跑（同 update_data_parallel）。
+    bulk : MarketTables | None
+        整批填入 市盈率 / 市淨率 / 殖利率（同 update_data_parallel）。
+    max_workers : int
+        未安裝 httpx、退回 update_data_parallel 時的工作執行緒數。
+    """
+    fields = metric_registry.select(columns)
+    if importlib.util.find_spec("httpx") is None:
+        logger.warning("未安裝 httpx，engine=async 退回 update_data_parallel")
+        update_data_parallel(session, codes, max_workers=max_workers, columns=columns,
+                             freshness=freshness, snapshots=snapshots, resume=resume, bulk=bulk)
+        return
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("未安裝 httpx[http2]，改用 HTTP/1.1")
+        http2 = False
+
+    mirror = history_mirror(session, codes)
+    skip = resume_from_snapshots(mirror, codes, fields, snapshots) if snapshots and resume else None
+    stocks = list(iter_stocks(codes, fields, freshness, skip, bulk))
+
+    t0 = time.perf_counter()
+    n_requests = asyncio.run(_crawl(mirror, stocks, per_host, http2, freshness, snapshots))
+    logger.info(f"[async] {len(stocks)} 檔 / {n_requests} 次請求，耗時 {time.perf_counter() - t0:.1f}s")
+    logger.info(f"[excel] 歷史資料 COM 呼叫 {mirror.com_calls} 次")
+    if freshness is not None:
+        freshness.log_summary()
+    if bulk is not None:
+        bulk.log_summary()
+    rate_limiter.log_rates()
+
+    session.autofit()
+    session.save()
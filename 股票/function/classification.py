@@ -1,30 +1,137 @@
-from .excel_utils import ExcelSession
+# classification.py
+"""
+收盤後把即時工作表的每一列歸檔到各代碼自己的工作表（第 5 列為最新一筆）。
 
-def classification(codes: list[str], session: ExcelSession) -> None: 
+- 代碼 → 工作表索引只建一次；工作表名稱以已知代碼開頭、且代碼後面不是數字才算符合，
+  "2308" 只會對到 "2308"、"2308台達電"、"2308 (2)"，不會對到 "23081…"；
+  "3673TPK-KY" 對到 "3673"；多個代碼都符合時取最長者（"00632R…" 對到 "00632R"）
+- 來源 A:P 整塊讀一次，依目標工作表分組，以值陣列寫入（不經剪貼簿）
+- 同一張工作表的插入列一次完成；日期與第 5 列相同時覆寫當天那一列，不插入
+- classify_workbooks() 可用多執行緒 / 多行程同時處理多個活頁簿（各自開 Excel）
+
+使用範例：
+    classification(["2308", "0050"], xls)
+    classify_workbooks([("a.xlsx", "new title", codes_a), ("b.xlsx", "new title", codes_b)],
+                       workers=2, mode="process")
+"""
+from __future__ import annotations
+
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, Literal
+
+from .excel_utils import ExcelSession, as_text
+
+logger = logging.getLogger(__name__)
+
+_LEADING_CODE = re.compile(r"[0-9A-Za-z]+")     # 候選代碼的最長範圍；實際代碼以 codes 比對
+_FIRST_DATA_ROW = 5          # 代碼工作表的最新一筆在第 5 列
+_LAST_COL = "P"
+
+
+def build_index(sheet_names: Iterable[str], codes: Iterable[str]) -> dict[str, list[str]]:
+    """
+    工作表名稱 → {代碼: [工作表名稱, ...]}，只列入 codes 中的代碼。
+    名稱須以代碼開頭、且下一個字元不是數字；符合的代碼不只一個時取最長者。
+    """
+    known = {str(c).strip() for c in codes}
+    index: dict[str, list[str]] = {}
+    for name in sheet_names:
+        m = _LEADING_CODE.match(name)
+        if not m:
+            continue
+        for end in range(m.end(), 0, -1):
+            if name[:end] in known and not name[end:end + 1].isdigit():
+                index.setdefault(name[:end], []).append(name)
+                break
+    return index
+
+
+def _stack_rows(top_a, rows: list[list]) -> tuple[int, list[list]]:
+    """
+    依序把 rows 放到第 5 列（等同原本逐列「插入或覆寫」的結果），
+    回傳 (要插入的列數, 從第 5 列起要寫入的值陣列)。
+    """
+    inserts = 0
+    stack: list[list] = []
+    for row in rows:
+        if row[0] != top_a:
+            inserts += 1
+            stack.insert(0, row)
+        elif stack:
+            stack[0] = row
+        else:
+            stack.append(row)              # 覆寫既有的第 5 列
+        top_a = row[0]
+    return inserts, stack
+
+
+def classification(codes: list[str], session: ExcelSession, *, autofit: bool = True) -> None:
     """
     將來源工作表 (session.sh) 中第 2 列開始的資料，
-    依據股票代號複製到目標工作表（名稱含該代號者）。
+    依據股票代號寫入目標工作表（名稱以該代號開頭者）的第 5 列。
 
-    - symbols: 目標股票代號清單
+    - codes   : 目標股票代號清單，依序對應 A2, A3 ...
     - session : 以 ExcelSession 封裝的 workbook 與來源 sheet
+    - autofit : 寫入後是否對目標工作表自動欄寬
+    """
+    if not codes:
+        return
+    wb = session.wb
+    src_sheet = session.sh
+    index = build_index((s.name for s in wb.sheets if s.name != src_sheet.name), codes)
+
+    # 1. 來源整塊讀一次，依目標工作表分組
+    values = session.range(f"A2:{_LAST_COL}{len(codes) + 1}").options(ndim=2).value
+    groups: dict[str, list[list]] = {}
+    for code, row in zip(codes, values):
+        for name in index.get(str(code).strip(), []):
+            groups.setdefault(name, []).append(row)
+
+    # 2. 每張目標工作表：讀 A5 一次、插入列一次、寫入一次
+    for name, rows in groups.items():
+        dst = wb.sheets[name]
+        top_a = dst.range(f"A{_FIRST_DATA_ROW}").value
+        inserts, stack = _stack_rows(top_a, rows)
+        session.insert_rows(_FIRST_DATA_ROW, inserts, sheet=dst)
+        dst.range(f"A{_FIRST_DATA_ROW}").value = [[as_text(v) for v in r] for r in stack]
+        if autofit:
+            dst.autofit()
+    logger.info(f"[classification] {len(codes)} 檔 → {len(groups)} 張工作表")
+
+
+# ──────────────────────────────
+# 多個活頁簿同時分類
+# ──────────────────────────────
+def _classify_file(file: str, sheet_name: str, codes: list[str], autofit: bool = True) -> str:
+    """在目前執行緒 / 行程開啟 file 並分類；每個活頁簿使用自己的 Excel 連線。"""
+    try:
+        import pythoncom                     # Windows：每條執行緒都要初始化 COM
+        pythoncom.CoInitialize()
+    except ImportError:
+        pythoncom = None
+    try:
+        with ExcelSession(file, sheet_name, visible=False, auto_close=True) as xls:
+            classification(codes, xls, autofit=autofit)
+    finally:
+        if pythoncom is not None:
+            pythoncom.CoUninitialize()
+    return file
+
+
+def classify_workbooks(jobs: list[tuple[str, str, list[str]]],
+                       workers: int = 4,
+                       mode: Literal["thread", "process"] = "thread",
+                       autofit: bool = True) -> None:
+    """
+    jobs = [(活頁簿路徑, 來源工作表, 代碼清單), ...]，各活頁簿同時分類。
+    同一個 Excel 執行個體的 COM 呼叫會被序列化，因此只在「不同活頁簿」之間平行；
+    mode="process" 時每個行程各開一個 Excel，隔離最完整。
     """
-    wb          = session.wb      # xw.Book
-    src_sheet   = session.sh      # 來源 Sheet
-    all_sheets  = {s.name: s for s in wb.sheets}
-
-    for row_idx, code in enumerate(codes, start=2):   # 對應 A2, A3 ...
-        # 找出名稱包含 code 的工作表
-        targets = [s for name, s in all_sheets.items() if code in name]
-        for dst in targets:
-            # 若 A{row_idx} 已經複製過，就不插入空白列
-            if src_sheet.range(f"A{row_idx}").value != dst.range("A5").value:
-                dst.range("4:4").api.Insert()
-            # 複製來源 A{row}:P{row} 到目標 A5
-            src_sheet.range(f"A{row_idx}:P{row_idx}").api.Copy(dst.range("A5").api)
-            dst.autofit()    # 自動欄寬/高
-        
-
-    
-    
-    
-    
\ No newline at end of file
+    pool_cls = ProcessPoolExecutor if mode == "process" else ThreadPoolExecutor
+    with pool_cls(max_workers=max(1, min(workers, len(jobs)))) as pool:
+        futures = [pool.submit(_classify_file, file, sheet, codes, autofit)
+                   for file, sheet, codes in jobs]
+        for fut in futures:
+            logger.info(f"[classification] {fut.result()} 完成")
@@ -0,0 +1,316 @@
+# code_table.py
+"""
+本機上市櫃代碼表：取代每次清單變動就呼叫的 twstock.__update_codes()（重新下載並改寫整份 CSV）。
+
+- 代碼表存在 .cache/codes.json（含 schema 版本與抓取時間），載入後依代碼建 dict 索引，
+  name / market / kind 查詢都是 O(1)、不連網
+- 超過 max_age_days（預設 7 天）才視為過期；過期時 refresh_if_stale() 在背景執行緒重抓
+  證交所 ISIN 頁面，完成後整份替換索引，查詢端不需等待
+- 第一次使用還沒有本機檔時，直接讀 twstock 套件內附的 CSV 當作初始資料（不匯入 twstock、不連網）
+- 權證（認購 / 認售）數量約四萬筆、與本專案無關，不收錄
+- sync_twstock() 把新上市的代碼補進 twstock 的記憶體代碼表，
+  twstock.realtime 才能正確判斷 tse / otc
+
+使用範例：
+    code_table.configure(path=".cache/codes.json", max_age_days=7)
+    table = code_table.get_table()
+    table.refresh_if_stale()                 # 過期才在背景更新
+    table.name("2330"), table.market("2330"), table.kind("0050")   # → 台積電, 上市, ETF
+"""
+from __future__ import annotations
+
+import csv
+import importlib.util
+import json
+import logging
+import threading
+import time
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Iterator, NamedTuple
+
+from . import http_client
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+# 市場 → 證交所 ISIN 查詢頁（strMode=2 上市、4 上櫃）
+DEFAULT_SOURCES: dict[str, str] = {
+    "twse": "https://isin.twse.com.tw/isin/C_public.jsp?strMode=2",
+    "tpex": "https://isin.twse.com.tw/isin/C_public.jsp?strMode=4",
+}
+DEFAULT_MAX_AGE_DAYS = 7
+
+_SKIP_TYPES = ("權證",)          # 上市 / 上櫃認購(售)權證
+
+
+class CodeInfo(NamedTuple):
+    code: str
+    name: str
+    kind: str          # 證券類別：股票、ETF、ETN、特別股、臺灣存託憑證(TDR) …
+    market: str        # 上市、上櫃
+    group: str         # 產業別（ETF 為空字串）
+    source: str        # twse / tpex（twstock.realtime 依此決定 tse_ / otc_）
+
+
+def _keep(kind: str) -> bool:
+    return not any(s in kind for s in _SKIP_TYPES)
+
+
+# ---------- ISIN 頁面解析 ----------
+class _IsinParser(HTMLParser):
+    """
+    只收集 <tr> 內各 <td> 的文字。
+    單一儲存格的列是類別標題（"股票"、"ETF" …），其後的列屬於該類別；
+    資料列第一格為「代碼　名稱」（全形空白分隔）。
+    """
+
+    def __init__(self, source: str) -> None:
+        super().__init__()
+        self.source = source
+        self.rows: list[CodeInfo] = []
+        self._kind = ""
+        self._cells: list[str] | None = None
+        self._cell: list[str] | None = None
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag == "tr":
+            self.handle_endtag("tr")                 # 上一列沒有 </tr> 時先結束
+            self._cells = []
+        elif tag == "td" and self._cells is not None:
+            self.handle_endtag("td")
+            self._cell = []
+
+    def handle_data(self, data: str) -> None:
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "td" and self._cell is not None and self._cells is not None:
+            self._cells.append("".join(self._cell).strip())
+            self._cell = None
+        elif tag == "tr" and self._cells is not None:
+            self._row(self._cells)
+            self._cells = None
+
+    def _row(self, cells: list[str]) -> None:
+        if len(cells) == 1:
+            self._kind = cells[0].strip()
+        elif len(cells) >= 5 and "　" in cells[0] and _keep(self._kind):
+            code, _, name = cells[0].partition("　")
+            self.rows.append(CodeInfo(code.strip(), name.strip(), self._kind,
+                                      cells[3], cells[4], self.source))
+
+
+def parse_isin(content: bytes, source: str) -> list[CodeInfo]:
+    """證交所 ISIN 頁面（MS950 編碼）→ CodeInfo 清單。"""
+    parser = _IsinParser(source)
+    parser.feed(content.decode("cp950", errors="replace"))
+    parser.close()
+    return parser.rows
+
+
+def _read(source: str) -> bytes:
+    """http(s) URL 經共用 http_client 下載，否則視為本機檔案路徑（測試 / 離線匯入）。"""
+    if source.startswith(("http://", "https://")):
+        resp = http_client.get(source, timeout=30)
+        if resp.status_code != 200:
+            raise RuntimeError(f"HTTP {resp.status_code}: {source}")
+        return resp.content
+    return Path(source).read_bytes()
+
+
+def _bundled_rows() -> list[CodeInfo]:
+    """twstock 套件內附的 CSV（type,code,name,ISIN,start,market,group,CFI）；未安裝時回傳空清單。"""
+    spec = importlib.util.find_spec("twstock")
+    if spec is None or not spec.submodule_search_locations:
+        return []
+    base = Path(next(iter(spec.submodule_search_locations))) / "codes"
+    rows: list[CodeInfo] = []
+    for source, name in (("tpex", "tpex_equities.csv"), ("twse", "twse_equities.csv")):
+        path = base / name
+        if not path.exists():
+            continue
+        with path.open(newline="", encoding="utf-8") as fp:
+            for r in csv.DictReader(fp):
+                if _keep(r["type"]):
+                    rows.append(CodeInfo(r["code"].strip(), r["name"].strip(), r["type"].strip(),
+                                         r["market"].strip(), r["group"].strip(), source))
+    return rows
+
+
+class CodeTable:
+    """
+    Parameters
+    ----------
+    path : str | Path
+        本機代碼表（JSON）。
+    max_age_days : float
+        超過幾天視為過期，refresh_if_stale() 才會重抓。
+    sources : dict[str, str] | None
+        twse / tpex → ISIN 頁面 URL 或本機檔案路徑，覆寫 DEFAULT_SOURCES。
+    """
+
+    def __init__(self,
+                 path: str | Path = ".cache/codes.json",
+                 max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+                 sources: dict[str, str] | None = None) -> None:
+        self.path = Path(path)
+        self.max_age = max_age_days * 86400
+        self.sources = {**DEFAULT_SOURCES, **(sources or {})}
+        self.fetched_at = 0.0
+        self._index: dict[str, CodeInfo] = {}
+        self._refreshing: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._load()
+
+    # ---------- 載入 / 儲存 ----------
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") != SCHEMA_VERSION:
+                raise ValueError(f"schema 版本 {data.get('version')} ≠ {SCHEMA_VERSION}")
+            self._swap([CodeInfo(*r) for r in data["rows"]], data["fetched_at"])
+            return
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as exc:
+            logger.warning(f"[codes] {self.path} 無法使用（{exc}），改用 twstock 內附代碼表")
+        rows = _bundled_rows()
+        if rows:
+            # 內附 CSV 的日期未知 → fetched_at=0，第一次 refresh_if_stale() 就會更新
+            self._swap(rows, 0.0)
+            logger.info(f"[codes] 使用 twstock 內附代碼表 {len(rows)} 檔")
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "version": SCHEMA_VERSION,
+            "fetched_at": self.fetched_at,
+            "rows": [list(r) for r in self._index.values()],
+        }, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.path)                       # 中途中斷不會留下半個檔案
+
+    def _swap(self, rows: list[CodeInfo], fetched_at: float) -> None:
+        """整份替換索引（單一參照賦值，查詢端不用加鎖）。"""
+        self._index = {r.code: r for r in rows}
+        self.fetched_at = fetched_at
+
+    # ---------- 更新 ----------
+    @property
+    def stale(self) -> bool:
+        return time.time() - self.fetched_at > self.max_age
+
+    def refresh(self) -> int:
+        """下載所有市場並替換索引，回傳代碼數；任一市場失敗就保留舊表並拋出例外。"""
+        rows: list[CodeInfo] = []
+        for source, url in self.sources.items():
+            parsed = parse_isin(_read(url), source)
+            if not parsed:
+                raise RuntimeError(f"{source} 頁面沒有任何代碼（版面變動？）")
+            rows.extend(parsed)
+        with self._lock:
+            self._swap(rows, time.time())
+            self._save()
+        self.sync_twstock()
+        logger.info(f"[codes] 代碼表已更新：{len(rows)} 檔")
+        return len(rows)
+
+    def refresh_if_stale(self, background: bool = True) -> threading.Thread | None:
+        """
+        過期才更新；background=True 時在 daemon 執行緒更新並回傳該執行緒（已在更新中則回傳同一個）。
+        失敗只記警告，繼續使用舊表。
+        """
+        if not self.stale:
+            return None
+
+        def run() -> None:
+            try:
+                self.refresh()
+            except Exception as exc:  # noqa: BLE001 — 更新失敗不影響查詢
+                logger.warning(f"[codes] 代碼表更新失敗，沿用舊表：{exc}")
+
+        if not background:
+            run()
+            return None
+        with self._lock:
+            if self._refreshing is None or not self._refreshing.is_alive():
+                self._refreshing = threading.Thread(target=run, name="code-table-refresh", daemon=True)
+                self._refreshing.start()
+            return self._refreshing
+
+    # ---------- 查詢 ----------
+    def __contains__(self, code: str) -> bool:
+        return code in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def get(self, code: str) -> CodeInfo | None:
+        return self._index.get(code)
+
+    def name(self, code: str) -> str | None:
+        info = self._index.get(code)
+        return info.name if info else None
+
+    def market(self, code: str) -> str | None:
+        info = self._index.get(code)
+        return info.market if info else None
+
+    def kind(self, code: str) -> str | None:
+        info = self._index.get(code)
+        return info.kind if info else None
+
+    def sync_twstock(self, twstock: Any = None) -> int:
+        """
+        把本表有、twstock 記憶體代碼表沒有的代碼補進 twstock.codes / twse / tpex，回傳補入數。
+        twstock 尚未匯入時不做事（之後匯入時由呼叫端再同步）。
+        """
+        import sys
+
+        codes_mod = sys.modules.get("twstock.codes") if twstock is None else twstock.codes
+        if codes_mod is None:
+            return 0
+        from twstock.codes.codes import ROW
+
+        added = 0
+        for info in list(self._index.values()):
+            if info.code in codes_mod.codes:
+                continue
+            row = ROW(info.kind, info.code, info.name, "", "", info.market, info.group, "", info.source)
+            codes_mod.codes[info.code] = row
+            (codes_mod.tpex if info.source == "tpex" else codes_mod.twse)[info.code] = row
+            added += 1
+        if added:
+            logger.info(f"[codes] 補入 twstock 代碼表 {added} 檔")
+        return added
+
+
+# ──────────────────────────────
+# 模組層級共用實例
+# ──────────────────────────────
+_table: CodeTable | None = None
+_table_lock = threading.Lock()
+_config: dict[str, Any] = {}
+
+
+def configure(**kwargs) -> None:
+    """依 setting.json 的 "code_table" 區塊設定；下一次 get_table() 以新參數重新載入。"""
+    global _table, _config
+    with _table_lock:
+        _config = kwargs
+        _table = None
+
+
+def get_table() -> CodeTable:
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = CodeTable(**_config)
+    return _table
@@ -0,0 +1,198 @@
+# etf_classifier.py
+"""
+判斷代碼是否為 ETF（取代 End._is_etf 與 stock_cache.is_etf 兩份相同的 Yahoo 查詢）。
+
+依序：
+    1. 本機代碼表（code_table）的證券類別：ETF → True；股票、特別股、TDR … → False，不連網
+    2. 已存下的判斷結果（.cache/etf.sqlite）：確定的結果保留 max_age_days，
+       查詢失敗（None）也會存下，unknown_ttl_hours 內不再重查
+    3. 以上都沒有的代碼才查 Yahoo Finance Search API，多檔時以執行緒池同時查詢
+
+使用範例：
+    etf_classifier.configure(path=".cache/etf.sqlite", max_workers=8)
+    etf_classifier.classify("0050")                    # → True
+    etf_classifier.classify_many(["2330", "00679B"])   # → {"2330": False, "00679B": True}
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable
+
+from . import code_table, http_client
+
+logger = logging.getLogger(__name__)
+
+SEARCH_URL = "https://query2.finance.yahoo.com/v1/finance/search?q={symbol}.tw"
+HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; StockScraper/1.0)"}
+
+DEFAULT_MAX_AGE_DAYS = 30          # 確定結果（True / False）的保留天數
+DEFAULT_UNKNOWN_TTL_HOURS = 24     # 查詢失敗（None）多久後才重查
+DEFAULT_MAX_WORKERS = 8
+
+
+def query_yahoo(symbol: str) -> bool | None:
+    """Yahoo Finance Search API：找到 ETF 類別的報價 → True，有結果但不是 ETF → False，查詢失敗 → None。"""
+    try:
+        resp = http_client.get(SEARCH_URL.format(symbol=symbol), headers=HEADERS, timeout=5)
+        if resp.status_code != 200:
+            raise RuntimeError(f"HTTP {resp.status_code}")
+        for quote in resp.json().get("quotes", []):
+            # 台股符號通常返回形如 "0050.TW"，先取前段比對
+            if quote.get("typeDisp", "").split(".")[0] == "ETF":
+                return quote.get("quoteType") == "ETF"
+    except Exception as exc:  # noqa: BLE001
+        logger.warning(f"[etf] is_etf({symbol}) API error: {exc}")
+        return None
+    return False
+
+
+def from_code_table(code: str) -> bool | None:
+    """本機代碼表有這檔時依證券類別判斷，沒有時回傳 None。"""
+    kind = code_table.get_table().kind(code)
+    if kind is None:
+        return None
+    return kind == "ETF"
+
+
+class EtfClassifier:
+    """
+    Parameters
+    ----------
+    path : str | Path
+        判斷結果的 SQLite 檔路徑。
+    max_age_days : float
+        API 查到的確定結果保留天數。
+    unknown_ttl_hours : float
+        API 查詢失敗的結果保留時數，期間內不重查。
+    max_workers : int
+        同時查詢 API 的執行緒數（實際併發仍受 rate_limiter 限制）。
+    """
+
+    def __init__(self,
+                 path: str | Path = ".cache/etf.sqlite",
+                 max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+                 unknown_ttl_hours: float = DEFAULT_UNKNOWN_TTL_HOURS,
+                 max_workers: int = DEFAULT_MAX_WORKERS) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age_days * 86400
+        self.unknown_ttl = unknown_ttl_hours * 3600
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS etf (
+                code       TEXT PRIMARY KEY,
+                is_etf     INTEGER,             -- 1 / 0；NULL = 查詢失敗
+                checked_at REAL NOT NULL
+            )"""
+        )
+        self._db.commit()
+        self.stats = {"table": 0, "stored": 0, "api": 0}
+
+    # ---------- 儲存的結果 ----------
+    def _stored(self, codes: list[str]) -> dict[str, bool | None]:
+        """仍在有效期內的判斷結果。"""
+        if not codes:
+            return {}
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT code, is_etf, checked_at FROM etf WHERE code IN ({', '.join('?' * len(codes))})",
+                codes,
+            ).fetchall()
+        out: dict[str, bool | None] = {}
+        for code, flag, checked_at in rows:
+            ttl = self.unknown_ttl if flag is None else self.max_age
+            if now - checked_at <= ttl:
+                out[code] = None if flag is None else bool(flag)
+        return out
+
+    def _store(self, results: dict[str, bool | None]) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO etf VALUES (?, ?, ?)",
+                [(code, None if flag is None else int(flag), now) for code, flag in results.items()],
+            )
+            self._db.commit()
+
+    # ---------- 判斷 ----------
+    def classify_many(self, codes: Iterable[str]) -> dict[str, bool | None]:
+        """依序用代碼表 → 已存結果 → API（同時查詢）判斷；None 表示目前無法判斷。"""
+        out: dict[str, bool | None] = {}
+        unknown: list[str] = []
+        for code in dict.fromkeys(codes):
+            flag = from_code_table(code)
+            if flag is None:
+                unknown.append(code)
+            else:
+                out[code] = flag
+        self.stats["table"] += len(out)
+
+        stored = self._stored(unknown)
+        out.update(stored)
+        self.stats["stored"] += len(stored)
+
+        missing = [c for c in unknown if c not in stored]
+        if missing:
+            self.stats["api"] += len(missing)
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as pool:
+                fetched = dict(zip(missing, pool.map(query_yahoo, missing)))
+            self._store(fetched)
+            out.update(fetched)
+        return out
+
+    def classify(self, code: str) -> bool | None:
+        return self.classify_many([code])[code]
+
+    def log_summary(self) -> None:
+        s = self.stats
+        if any(s.values()):
+            logger.info(f"[etf] 代碼表 {s['table']} / 已存結果 {s['stored']} / API 查詢 {s['api']}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+# ──────────────────────────────
+# 模組層級共用實例
+# ──────────────────────────────
+_classifier: EtfClassifier | None = None
+_classifier_lock = threading.Lock()
+_config: dict[str, Any] = {}
+
+
+def configure(**kwargs) -> None:
+    """依 setting.json 的 "etf" 區塊設定；下一次 get_classifier() 以新參數建立。"""
+    global _classifier, _config
+    with _classifier_lock:
+        if _classifier is not None:
+            _classifier.close()
+        _config = kwargs
+        _classifier = None
+
+
+def get_classifier() -> EtfClassifier:
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = EtfClassifier(**_config)
+    return _classifier
+
+
+def classify(code: str) -> bool | None:
+    """等同 get_classifier().classify(code)。"""
+    return get_classifier().classify(code)
+
+
+def classify_many(codes: Iterable[str]) -> dict[str, bool | None]:
+    """等同 get_classifier().classify_many(codes)。"""
+    return get_classifier().classify_many(codes)
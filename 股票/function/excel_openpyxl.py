@@ -0,0 +1,402 @@
+# excel_openpyxl.py
+"""
+ExcelSession 的無頭（headless）後端：直接以 openpyxl 讀寫 .xlsx，不需要桌面版 Excel。
+
+- 介面與 xlwings 版相同：range / add_sheet / rename_sheet / autofit / save / mirror / insert_rows，
+  range 的 .value、.options(ndim=…)、.api.NumberFormat、.api.Insert 也照 xlwings 的行為模擬
+- 寫入字串時比照 Excel 的輸入轉換：數字字串 → 數字、"2023-06-14" → 日期、"3.5%" → 百分比，
+  開頭 "'" 視為文字前綴
+- 所有修改都在記憶體中，離開 with（或 close）時只存檔一次；中途的 save() 只做標記
+- edit 模式保留公式（存檔後公式不變），讀值時公式儲存格與 xlwings 一樣回傳計算結果：
+  取自檔案裡上次由 Excel 存檔時的快取值；沒有快取值（例如由 openpyxl 寫入的公式）時為 None
+- mode="read"  以 read_only 串流讀取（大型活頁簿只讀時最省記憶體）
+  mode="write" 以 write_only 串流寫出新檔，只能用 append_rows() 逐列附加
+
+使用範例：
+    from 股票.function import excel_utils
+    excel_utils.configure(backend="openpyxl")        # 之後 ExcelSession(...) 都走本模組
+
+    with ExcelSession("data.xlsx", "new title") as xls:
+        xls.range("A2").value = [["2025-01-02", "'0050", "元大台灣50"]]
+"""
+from __future__ import annotations
+
+import logging
+import re
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, Literal
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils import get_column_letter
+
+from .excel_utils import ExcelSession, _CELL, column_index
+
+logger = logging.getLogger(__name__)
+
+Mode = Literal["edit", "read", "write"]
+
+_NUMBER = re.compile(r"^[+-]?(\d[\d,]*)(\.\d+)?$")
+_PERCENT = re.compile(r"^[+-]?\d[\d,]*(\.\d+)?%$")
+_DATE = re.compile(r"^(\d{4})[-/](\d{1,2})[-/](\d{1,2})$")
+_ROWS = re.compile(r"^\$?(\d+):\$?(\d+)$")
+
+_MAX_WIDTH = 60
+
+
+def _coerce(value: Any) -> tuple[Any, str | None]:
+    """比照在 Excel 儲存格輸入字串的轉換，回傳 (值, 需要套用的數字格式)。"""
+    if not isinstance(value, str):
+        return value, None
+    if value.startswith("'"):
+        return value[1:], "@"
+    text = value.strip()
+    if _NUMBER.match(text):
+        number = float(text.replace(",", ""))
+        return (int(number) if "." not in text and abs(number) < 1e15 else number), None
+    if _PERCENT.match(text):
+        return float(text[:-1].replace(",", "")) / 100, "0.00%"
+    m = _DATE.match(text)
+    if m:
+        try:
+            return datetime(*map(int, m.groups())), "yyyy/mm/dd"
+        except ValueError:
+            return value, None
+    return value, None
+
+
+def _display_width(value: Any) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, datetime):
+        return 10
+    text = str(value)
+    return sum(2 if unicodedata.east_asian_width(ch) in "WF" else 1 for ch in text)
+
+
+# ──────────────────────────────
+# xlwings 物件的最小替身
+# ──────────────────────────────
+class _Api:
+    """range.api 的替身：只支援專案用到的 NumberFormat 與 Insert。"""
+
+    def __init__(self, rng: "_Range") -> None:
+        self._rng = rng
+
+    @property
+    def NumberFormat(self) -> str:  # noqa: N802 — 與 COM 屬性同名
+        r0, c0, _, _ = self._rng.bounds()
+        return self._rng.sheet.ws.cell(r0, c0).number_format
+
+    @NumberFormat.setter
+    def NumberFormat(self, fmt: str) -> None:  # noqa: N802
+        r0, c0, r1, c1 = self._rng.bounds()
+        ws = self._rng.sheet.ws
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                ws.cell(r, c).number_format = fmt
+        self._rng.sheet.book.touch()
+
+    def Insert(self, Shift: int = -4121, CopyOrigin: int = 0) -> None:  # noqa: N802
+        """整列插入；CopyOrigin=1 沿用下方（原本那一列）格式，0 沿用上方。"""
+        r0, _, r1, _ = self._rng.bounds()
+        ws = self._rng.sheet.ws
+        count = r1 - r0 + 1
+        ws.insert_rows(r0, count)
+        src_row = r0 + count if CopyOrigin == 1 else r0 - 1
+        if src_row >= 1:
+            for c in range(1, ws.max_column + 1):
+                style = ws.cell(src_row, c)._style
+                for r in range(r0, r0 + count):
+                    ws.cell(r, c)._style = style
+        self._rng.sheet.book.touch()
+
+
+class _Range:
+    """xlwings.Range 的替身：.value 讀寫規則與 xlwings 相同（純量 / 1D / 2D）。"""
+
+    def __init__(self, sheet: "_Sheet", address: str, ndim: int | None = None) -> None:
+        self.sheet = sheet
+        self._address = address.replace("$", "")
+        self._ndim = ndim
+
+    def bounds(self) -> tuple[int, int, int, int]:
+        m = _ROWS.match(self._address)
+        if m:                                          # "4:4" 整列
+            return int(m.group(1)), 1, int(m.group(2)), max(self.sheet.ws.max_column, 1)
+        parts = self._address.split(":")
+        first = _CELL.match(parts[0])
+        last = _CELL.match(parts[-1])
+        if first is None or last is None:
+            raise ValueError(f"無法解析儲存格位址：{self._address}")
+        return (int(first.group(2)), column_index(first.group(1)),
+                int(last.group(2)), column_index(last.group(1)))
+
+    @property
+    def address(self) -> str:
+        r0, c0, r1, c1 = self.bounds()
+        return f"${get_column_letter(c0)}${r0}:${get_column_letter(c1)}${r1}"
+
+    @property
+    def api(self) -> _Api:
+        return _Api(self)
+
+    def options(self, ndim: int | None = None, **_ignored) -> "_Range":
+        return _Range(self.sheet, self._address, ndim)
+
+    @property
+    def value(self) -> Any:
+        r0, c0, r1, c1 = self.bounds()
+        book = self.sheet.book
+        if book.mode == "edit":                        # 公式儲存格改回傳計算結果
+            rows = [[book.value_of(c) for c in r]
+                    for r in self.sheet.ws.iter_rows(min_row=r0, max_row=r1, min_col=c0, max_col=c1)]
+        else:
+            rows = [list(r) for r in self.sheet.ws.iter_rows(min_row=r0, max_row=r1, min_col=c0,
+                                                             max_col=c1, values_only=True)]
+        rows += [[None] * (c1 - c0 + 1) for _ in range(r1 - r0 + 1 - len(rows))]  # read_only 超出資料範圍
+        rows = [r + [None] * (c1 - c0 + 1 - len(r)) for r in rows]
+        if self._ndim == 2:
+            return rows
+        if self._ndim == 1 or r0 == r1 or c0 == c1:
+            flat = [v for r in rows for v in r]
+            return flat[0] if len(flat) == 1 and self._ndim is None else flat
+        return rows
+
+    @value.setter
+    def value(self, data: Any) -> None:
+        self.sheet.book.check_writable()
+        r0, c0, _, _ = self.bounds()
+        if not isinstance(data, (list, tuple)):
+            block = [[data]]
+        elif data and isinstance(data[0], (list, tuple)):
+            block = data
+        else:
+            block = [data]                             # 1D → 橫向一列
+        ws = self.sheet.ws
+        for i, row in enumerate(block):
+            for j, raw in enumerate(row):
+                value, fmt = _coerce(raw)
+                cell = ws.cell(r0 + i, c0 + j)
+                cell.value = value
+                if fmt and (fmt == "@" or cell.number_format == "General"):
+                    cell.number_format = fmt
+        self.sheet.book.touch()
+
+
+class _Sheet:
+    def __init__(self, book: "_Book", ws) -> None:
+        self.book = book
+        self.ws = ws
+
+    @property
+    def name(self) -> str:
+        return self.ws.title
+
+    @name.setter
+    def name(self, value: str) -> None:
+        self.book.check_writable()
+        self.ws.title = value
+        self.book.touch()
+
+    def range(self, addr: str) -> _Range:
+        return _Range(self, addr)
+
+    @property
+    def used_range(self) -> _Range:
+        return _Range(self, self.ws.calculate_dimension() if self.book.mode != "read"
+                      else self.ws.calculate_dimension(force=True))
+
+    def autofit(self, axis: str | None = None) -> None:
+        """依內容估算欄寬（全形字算 2）；openpyxl 沒有列高自動調整，開檔時由 Excel 處理。"""
+        if self.book.mode == "read" or axis in ("r", "rows"):
+            return
+        widths: dict[int, int] = {}
+        for row in self.ws.iter_rows():
+            for cell in row:
+                w = _display_width(cell.value)
+                if w > widths.get(cell.column, 0):
+                    widths[cell.column] = w
+        for col, w in widths.items():
+            self.ws.column_dimensions[get_column_letter(col)].width = min(w + 2, _MAX_WIDTH)
+        self.book.touch()
+
+    def activate(self) -> None:
+        self.book.wb.active = self.book.wb.worksheets.index(self.ws)
+
+
+class _Sheets:
+    """wb.sheets 的替身：可迭代、可用名稱 / 索引 / 工作表物件取值、add()。"""
+
+    def __init__(self, book: "_Book") -> None:
+        self._book = book
+
+    def _wrap(self, ws) -> _Sheet:
+        return self._book.wrap(ws)
+
+    def __iter__(self):
+        return (self._wrap(ws) for ws in self._book.wb.worksheets)
+
+    def __len__(self) -> int:
+        return len(self._book.wb.worksheets)
+
+    def __getitem__(self, key: str | int | _Sheet) -> _Sheet:
+        if isinstance(key, _Sheet):
+            return key
+        if isinstance(key, int):
+            return self._wrap(self._book.wb.worksheets[key])
+        return self._wrap(self._book.wb[key])
+
+    @property
+    def active(self) -> _Sheet:
+        return self._wrap(self._book.wb.active)
+
+    def add(self, name: str | None = None, before: _Sheet | None = None,
+            after: _Sheet | None = None) -> _Sheet:
+        self._book.check_writable()
+        sheets = self._book.wb.worksheets
+        if before is not None:
+            index = sheets.index(before.ws)
+        elif after is not None:
+            index = sheets.index(after.ws) + 1
+        else:
+            index = sheets.index(self._book.wb.active)  # 與 Excel 相同：插在使用中工作表之前
+        ws = self._book.wb.create_sheet(title=name, index=index)
+        self._book.touch()
+        return self._wrap(ws)
+
+
+class _Book:
+    def __init__(self, path: Path, mode: Mode) -> None:
+        self.path = path
+        self.mode = mode
+        self.dirty = False
+        if mode == "write":
+            self.wb = Workbook(write_only=True)
+        elif path.exists():
+            self.wb = load_workbook(path, read_only=(mode == "read"), data_only=(mode == "read"),
+                                    keep_vba=path.suffix.lower() == ".xlsm")
+        else:
+            if mode == "read":
+                raise FileNotFoundError(path)
+            self.wb = Workbook()
+        self._cached: dict[int, tuple[Any, Any]] = {}   # 公式儲存格 id → (儲存格, 計算結果)
+        if mode == "edit" and path.exists():
+            self._load_cached_values()
+        self._wrappers: dict[int, _Sheet] = {}
+        self.sheets = _Sheets(self)
+
+    def _load_cached_values(self) -> None:
+        """有公式時另以 data_only 讀一次，記下每個公式儲存格的計算結果（插入列後儲存格物件不變）。"""
+        formulas = [(ws.title, cell) for ws in self.wb.worksheets
+                    for cell in ws._cells.values() if cell.data_type == "f"]
+        if not formulas:
+            return
+        values = load_workbook(self.path, data_only=True)
+        for title, cell in formulas:
+            self._cached[id(cell)] = (cell, values[title].cell(cell.row, cell.column).value)
+        values.close()
+
+    def value_of(self, cell) -> Any:
+        """儲存格的值；公式回傳計算結果而不是 "=..." 字串（同 xlwings 的 .value）。"""
+        if cell.data_type != "f":
+            return cell.value
+        entry = self._cached.get(id(cell))
+        return entry[1] if entry is not None and entry[0] is cell else None
+
+    def wrap(self, ws) -> _Sheet:
+        sheet = self._wrappers.get(id(ws))
+        if sheet is None or sheet.ws is not ws:
+            sheet = self._wrappers[id(ws)] = _Sheet(self, ws)
+        return sheet
+
+    def check_writable(self) -> None:
+        if self.mode == "read":
+            raise PermissionError(f"{self.path} 以 read 模式開啟，不能寫入")
+        if self.mode == "write":
+            raise PermissionError(f"{self.path} 以 write 模式開啟，只能用 append_rows() 附加")
+
+    def touch(self) -> None:
+        self.dirty = True
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    def save(self) -> None:
+        if self.mode == "read":
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.wb.save(self.path)
+        self.dirty = False
+
+    def close(self) -> None:
+        if self.mode == "read":
+            self.wb.close()
+
+
+# ──────────────────────────────
+# ExcelSession 無頭實作
+# ──────────────────────────────
+class OpenpyxlSession(ExcelSession):
+    """
+    Parameters
+    ----------
+    file : str
+        .xlsx / .xlsm 路徑；edit 模式下不存在會建立新檔。
+    sheet_name : str | None
+        目前工作表；None 為使用中工作表，不存在時（edit 模式）自動建立。
+    visible, auto_close :
+        與 xlwings 版相容，無頭模式下沒有作用；離開 with 時一律存檔（有修改時）。
+    mode : {"edit", "read", "write"}
+        edit 一般讀寫；read 以 read_only 串流讀取；write 以 write_only 串流寫出新檔。
+    """
+
+    def __init__(self,
+                 file: str,
+                 sheet_name: str | None = None,
+                 visible: bool = True,
+                 auto_close: bool = True,
+                 *,
+                 mode: Mode = "edit") -> None:
+        self._auto_close = True
+        self._app = None
+        self._save_requested = False
+        self.wb = _Book(Path(file), mode)
+        if mode == "write":
+            self._stream = self.wb.wb.create_sheet(title=sheet_name)
+            self.sh = None
+            return
+        if sheet_name and sheet_name not in self.wb.wb.sheetnames:
+            if mode == "read":
+                raise KeyError(f"找不到工作表 {sheet_name}")
+            self.wb.wb.create_sheet(sheet_name)
+            self.wb.touch()
+        self.sh = self.wb.sheets[sheet_name] if sheet_name else self.wb.sheets.active
+
+    # ---------- 快捷封裝 ----------
+    def save(self):
+        """只標記需要存檔；實際寫檔在 close() 一次完成。"""
+        self._save_requested = True
+
+    def flush(self) -> None:
+        """立即寫檔（一般不需要呼叫）。"""
+        self.wb.save()
+        self._save_requested = False
+
+    def close(self):
+        if self.wb.mode == "write" or (self.wb.mode == "edit" and (self.wb.dirty or self._save_requested)):
+            self.wb.save()
+        self.wb.close()
+
+    def append_rows(self, rows: Iterable[list]) -> None:
+        """write 模式：依序附加整列（串流寫出，不佔記憶體）。"""
+        if self.wb.mode != "write":
+            raise PermissionError("append_rows() 只能在 write 模式使用")
+        for row in rows:
+            self._stream.append([_coerce(v)[0] for v in row])
+
+    # ---------- with 支援 ----------
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
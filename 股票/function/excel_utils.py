@@ -1,6 +1,192 @@
 # excel_utils.py
-import xlwings as xw
-from typing import Literal
+from __future__ import annotations
+
+import importlib.util
+import re
+import sys
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Literal
+
+if TYPE_CHECKING:
+    import xlwings as xw
+
+# "xlwings"：透過 COM 操作桌面版 Excel；"openpyxl"：直接讀寫 .xlsx（見 excel_openpyxl.py）
+_backend = "xlwings"
+
+
+def configure(backend: str = "xlwings") -> None:
+    """依 setting.json 的 "excel_backend" 選擇 ExcelSession 的實作。"""
+    global _backend
+    if backend not in ("xlwings", "openpyxl"):
+        raise ValueError(f"未知的 excel_backend：{backend}（可用：xlwings、openpyxl）")
+    _backend = backend
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def _xlwings():
+    """第一次開啟 xlwings 工作階段時才匯入（連帶載入 pandas，約半秒）；未安裝時回傳 None。"""
+    if importlib.util.find_spec("xlwings") is None:   # 無頭環境（Linux 伺服器）只用 openpyxl 後端
+        return None
+    import xlwings
+    return xlwings
+
+_CELL = re.compile(r"\$?([A-Za-z]+)\$?(\d+)")
+
+
+def column_index(letters: str) -> int:
+    """A → 1、P → 16、AN → 40。"""
+    n = 0
+    for ch in letters.upper():
+        n = n * 26 + ord(ch) - 64
+    return n
+
+
+def column_letter(n: int) -> str:
+    """1 → A、16 → P、40 → AN。"""
+    letters = ""
+    while n:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _top_left(address: str) -> tuple[int, int]:
+    """"$P$2:$AN$301" / "P2" → (2, 16)。"""
+    m = _CELL.match(address)
+    if m is None:
+        raise ValueError(f"無法解析儲存格位址：{address}")
+    return int(m.group(2)), column_index(m.group(1))
+
+
+def as_text(value: Any) -> Any:
+    """把從工作表讀到的文字寫回時保留為文字（例：代碼 0050 不會被 Excel 轉成數字 50）。"""
+    return f"'{value}" if isinstance(value, str) and value else value
+
+
+def _is_xw_sheet(obj: Any) -> bool:
+    xw = sys.modules.get("xlwings")                    # 還沒匯入 → 不可能是 xlwings 物件
+    return xw is not None and isinstance(obj, xw.main.Sheet)
+
+
+def _same(old: Any, new: Any) -> bool:
+    """讀回值與新值是否視為相同（Excel 會把數字字串轉數字、日期字串轉 datetime）。"""
+    if isinstance(new, str) and new.startswith("'"):     # 文字前綴不算變動
+        new = new[1:]
+    if old == new or (old in (None, "") and new in (None, "")):
+        return True
+    if isinstance(old, datetime) and isinstance(new, str):
+        return old.strftime("%Y-%m-%d") == new.replace("/", "-")[:10]
+    if isinstance(old, (int, float)) and not isinstance(old, bool) and isinstance(new, str):
+        try:
+            return float(new.replace(",", "")) == old
+        except ValueError:
+            return False
+    return False
+
+
+class SheetMirror:
+    """
+    工作表某個範圍的記憶體鏡像：讀一次成 2D 陣列，呼叫端直接改 values，
+    flush() 時只把變動的儲存格合併成最少的矩形範圍寫回；沒變的儲存格不會重寫。
+
+    座標一律用工作表的列號 / 欄號（1 起算，欄也可用字母），不是陣列索引。
+
+    使用範例：
+        with ExcelSession("data.xlsx", "new title") as xls:
+            m = xls.mirror("A2:P301")
+            m.set(5, "F", 123.5)
+            m.set_row(6, "C", ["台達電", 1, 2])
+            m.flush()                      # → 寫入次數
+            m.com_calls                    # 讀 + 寫的 COM 呼叫總數
+    """
+
+    def __init__(self, sheet: xw.Sheet, top: int, left: int, values: list[list],
+                 com_calls: int = 1) -> None:
+        self.sheet = sheet
+        self.top = top
+        self.left = left
+        self.values: list[list] = [list(r) for r in values]
+        self._base: list[list] = [list(r) for r in values]
+        self.com_calls = com_calls         # 建立時的讀取次數，flush 時累加寫入次數
+
+    @property
+    def bottom(self) -> int:
+        return self.top + len(self.values) - 1
+
+    @property
+    def right(self) -> int:
+        return self.left + (len(self.values[0]) if self.values else 0) - 1
+
+    def _rc(self, row: int, col: int | str) -> tuple[int, int]:
+        c = column_index(col) if isinstance(col, str) else col
+        if not (self.top <= row <= self.bottom and self.left <= c <= self.right):
+            raise IndexError(f"{column_letter(c)}{row} 不在鏡像範圍內")
+        return row - self.top, c - self.left
+
+    # ---------- 讀寫陣列 ----------
+    def get(self, row: int, col: int | str) -> Any:
+        r, c = self._rc(row, col)
+        return self.values[r][c]
+
+    def set(self, row: int, col: int | str, value: Any) -> None:
+        r, c = self._rc(row, col)
+        self.values[r][c] = value
+
+    def row(self, row: int) -> list:
+        """該列的 list（可直接修改）。"""
+        return self.values[self._rc(row, self.left)[0]]
+
+    def set_row(self, row: int, col: int | str, values: list) -> None:
+        r, c = self._rc(row, col)
+        self._rc(row, c + self.left + len(values) - 1)      # 檢查右界
+        self.values[r][c:c + len(values)] = values
+
+    # ---------- 差異與寫回 ----------
+    def changes(self) -> list[tuple[int, int, int, int]]:
+        """
+        變動儲存格合併成的矩形 [(上, 左, 下, 右)]（工作表座標）：
+        先把每列連續的變動欄合併成一段，再把上下相鄰、欄位範圍相同的段合併。
+        """
+        rects: list[list[int]] = []
+        open_runs: dict[tuple[int, int], list[int]] = {}   # (左, 右) → 上一列延伸中的矩形
+        for r, (new, old) in enumerate(zip(self.values, self._base)):
+            runs = []
+            c = 0
+            while c < len(new):
+                if _same(old[c], new[c]):
+                    c += 1
+                    continue
+                start = c
+                while c < len(new) and not _same(old[c], new[c]):
+                    c += 1
+                runs.append((start, c - 1))
+            next_open: dict[tuple[int, int], list[int]] = {}
+            for run in runs:
+                rect = open_runs.get(run)
+                if rect is not None and rect[2] == r - 1:
+                    rect[2] = r
+                else:
+                    rect = [r, run[0], r, run[1]]
+                    rects.append(rect)
+                next_open[run] = rect
+            open_runs = next_open
+        return [(t + self.top, l + self.left, b + self.top, rr + self.left) for t, l, b, rr in rects]
+
+    def flush(self) -> int:
+        """寫回所有變動的矩形，回傳寫入次數。"""
+        rects = self.changes()
+        for top, left, bottom, right in rects:
+            block = [row[left - self.left:right - self.left + 1]
+                     for row in self.values[top - self.top:bottom - self.top + 1]]
+            self.sheet.range(f"{column_letter(left)}{top}").value = block
+            for r in range(top - self.top, bottom - self.top + 1):
+                self._base[r][left - self.left:right - self.left + 1] = \
+                    self.values[r][left - self.left:right - self.left + 1]
+        self.com_calls += len(rects)
+        return len(rects)
 
 class ExcelSession:
     """
@@ -8,8 +194,18 @@ class ExcelSession:
     - 進入 with：開檔
     - auto_close=True  → 離開 with 時 save + close
     - auto_close=False → 只 save，不關閉，保留 Excel 供後續檢視
+    configure(backend="openpyxl") 後，ExcelSession(...) 改建立無頭的 OpenpyxlSession（介面相同）；
+    使用 xlwings 後端但未安裝 xlwings 時擲出 ImportError，不會自動換後端。
     """
 
+    def __new__(cls, *args, **kwargs):
+        if cls is ExcelSession and _backend == "openpyxl":
+            from .excel_openpyxl import OpenpyxlSession   # 延遲匯入，避免循環
+            cls = OpenpyxlSession
+        elif cls is ExcelSession and _xlwings() is None:
+            raise ImportError('未安裝 xlwings；不使用 Excel 時請在 setting.json 設定 "excel_backend": "openpyxl"')
+        return super().__new__(cls)
+
     def __init__(self,
                 file: str,
                 sheet_name: str | None = None,
@@ -23,6 +219,7 @@ class ExcelSession:
             self._auto_close = auto_close
 
         self._app: xw.App | None = None
+        xw = _xlwings()
 
         try:
             self.wb = xw.Book(file)
@@ -41,6 +238,43 @@ class ExcelSession:
         """column + row 一次自動寬高。"""
         self.sh.autofit()
 
+    def mirror(self, addr: str | None = None) -> SheetMirror:
+        """
+        把 addr（預設為已使用範圍）一次讀成 SheetMirror；
+        呼叫端修改陣列後 flush()，只寫回有變動的儲存格。
+        """
+        if addr is None:
+            used = self.sh.used_range
+            addr = used.address
+            values = used.options(ndim=2).value
+            return SheetMirror(self.sh, *_top_left(addr), values, com_calls=3)
+        values = self.sh.range(addr).options(ndim=2).value
+        return SheetMirror(self.sh, *_top_left(addr), values)
+
+    def insert_rows(
+        self,
+        row: int,
+        count: int = 1,
+        *,
+        sheet: str | int | xw.Sheet | None = None,
+        format_from: Literal["above", "below"] = "below",
+    ) -> None:
+        """
+        在 row 之前插入 count 列（一次 COM 呼叫），原本的列往下移。
+
+        format_from : {"above", "below"}
+            新列沿用上方或下方（即原本第 row 列）的格式。
+        """
+        if count <= 0:
+            return
+        target_sh = self.sh if sheet is None else (
+            sheet if _is_xw_sheet(sheet) else self.wb.sheets[sheet]
+        )
+        # Shift=xlShiftDown(-4121)；CopyOrigin：0=xlFormatFromLeftOrAbove、1=xlFormatFromRightOrBelow
+        target_sh.range(f"{row}:{row + count - 1}").api.Insert(
+            Shift=-4121, CopyOrigin=1 if format_from == "below" else 0
+        )
+
     def save(self):
         self.wb.save()
 
@@ -175,7 +409,7 @@ class ExcelSession:
         """
         # --- 1. 解析 sheet 參數為 Sheet 物件 ---
         target_sh: xw.Sheet = (
-            sheet if isinstance(sheet, xw.main.Sheet) else self.wb.sheets[sheet]
+            sheet if _is_xw_sheet(sheet) else self.wb.sheets[sheet]
         )
         # --- 2. 衝突處理 ---
         existing_names = [s.name for s in self.wb.sheets]
@@ -0,0 +1,137 @@
+# freshness.py
+"""
+增量更新：記錄每個 (code, 欄位) 最後一次成功抓取的時間與值，只重抓「到期」的欄位。
+
+到期規則依 metric_registry 的 refresh 分類：
+    daily      距上次抓取超過 max_age_hours["daily"]（預設 20 小時 → 每個交易日一次）
+    quarterly  已過最近一次季報公告期限（quarterly_deadlines）且在那之前抓的，
+               或距上次抓取超過 max_age_hours["quarterly"]
+    event      距上次抓取超過 max_age_hours["event"]（預設 7 天）
+頁面抓取或解析失敗的欄位（stock.failed）不記錄，下次仍會重抓；
+值本來就是 "-"（例如沒有配股）的欄位照樣記錄，不會每次都到期。
+呼叫端只傳入對該資產別適用的欄位（見 stock_end.iter_stocks）。
+
+使用範例：
+    store = FreshnessStore(".cache/freshness.sqlite")
+    update_data_parallel(xls, codes, freshness=store)
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterable
+
+from . import metric_registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE_HOURS: dict[str, float] = {
+    "daily": 20,
+    "quarterly": 24 * 30,
+    "event": 24 * 7,
+}
+# 台股季報 / 年報法定公告期限（月-日）
+DEFAULT_QUARTERLY_DEADLINES = ["03-31", "05-15", "08-14", "11-14"]
+
+
+class FreshnessStore:
+    """
+    Parameters
+    ----------
+    path : str | Path
+        SQLite 檔路徑。
+    max_age_hours : dict[str, float] | None
+        refresh 分類 → 最長保留時數，覆寫 DEFAULT_MAX_AGE_HOURS。
+    quarterly_deadlines : list[str] | None
+        季報公告期限（"MM-DD"），過了期限就視為 quarterly 欄位需要重抓。
+    """
+
+    def __init__(self,
+                 path: str | Path = ".cache/freshness.sqlite",
+                 max_age_hours: dict[str, float] | None = None,
+                 quarterly_deadlines: list[str] | None = None) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_age = {**DEFAULT_MAX_AGE_HOURS, **(max_age_hours or {})}
+        self.deadlines = quarterly_deadlines or DEFAULT_QUARTERLY_DEADLINES
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS metric_state (
+                code       TEXT NOT NULL,
+                field      TEXT NOT NULL,
+                value      TEXT,
+                fetched_at TEXT NOT NULL,
+                PRIMARY KEY (code, field)
+            )"""
+        )
+        self._db.commit()
+        self.skipped = 0          # 本次略過的 (code, 欄位) 數
+        self.refreshed = 0        # 本次排入重抓的 (code, 欄位) 數
+
+    # ---------- 規則 ----------
+    def _last_deadline(self, now: datetime) -> datetime:
+        """now 之前（含）最近的一個季報公告期限。"""
+        candidates = []
+        for year in (now.year, now.year - 1):
+            for md in self.deadlines:
+                month, day = map(int, md.split("-"))
+                candidates.append(datetime(year, month, day))
+        return max(d for d in candidates if d <= now)
+
+    def is_due(self, field: str, fetched_at: datetime | None, now: datetime) -> bool:
+        if fetched_at is None:
+            return True
+        refresh = metric_registry.refresh_of(field)
+        if now - fetched_at >= timedelta(hours=self.max_age[refresh]):
+            return True
+        if refresh == "quarterly":
+            return fetched_at < self._last_deadline(now) <= now
+        return False
+
+    # ---------- 查詢 / 記錄 ----------
+    def due(self, code: str, fields: Iterable[str], now: datetime | None = None) -> list[str]:
+        """fields 中對 code 而言已到期、需要重抓的欄位（維持原順序）。"""
+        now = now or datetime.now()
+        fields = list(fields)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT field, fetched_at FROM metric_state WHERE code = ?", (code,)
+            ).fetchall()
+        fetched = {f: datetime.fromisoformat(t) for f, t in rows}
+        due = [f for f in fields if self.is_due(f, fetched.get(f), now)]
+        self.skipped += len(fields) - len(due)
+        self.refreshed += len(due)
+        return due
+
+    def record(self, stock: Any, now: datetime | None = None) -> None:
+        """記錄 stock.fields 中沒有失敗（不在 stock.failed）的值，含本來就是 "-" 的值。"""
+        stamp = (now or datetime.now()).isoformat(timespec="seconds")
+        rows = [
+            (stock.code, f, str(getattr(stock, f)), stamp)
+            for f in stock.fields or metric_registry.FIELDS
+            if f not in stock.failed
+        ]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO metric_state VALUES (?, ?, ?, ?)", rows)
+            self._db.commit()
+
+    def last_values(self, code: str) -> dict[str, str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT field, value FROM metric_state WHERE code = ?", (code,)
+            ).fetchall()
+        return dict(rows)
+
+    def log_summary(self) -> None:
+        total = self.skipped + self.refreshed
+        if total:
+            logger.info(f"[incremental] 重抓 {self.refreshed} / 略過 {self.skipped} 個 (股票, 欄位)"
+                        f"（略過 {self.skipped / total:.0%}）")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -1,11 +1,12 @@
-import twstock
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List
+from typing import Dict, List
 
 
-from .excel_utils import ExcelSession
+from .excel_utils import ExcelSession, as_text
+from . import code_table, http_client, rate_limiter, vcr
 
 _BLANK = "-"                     # 全程使用同一個佔位符，方便改動
 
@@ -15,14 +16,50 @@ _REALTIME_KEYS = [               # 可能用到的即時欄位 (可依實際需
     "high", "low", "open"
 ]
 
-# 設定日誌
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[logging.StreamHandler()],
-    )
+_MIS_HOST = "mis.twse.com.tw"     # twstock.realtime 實際連線的 host，與其他抓取共用限流器
+_MIS_SESSION_URL = "http://mis.twse.com.tw/stock/index.jsp"
+_MIS_STOCKINFO_URL = "http://mis.twse.com.tw/stock/api/getStockInfo.jsp?ex_ch={stock_id}&_={time}"
+CHUNK_SIZE = 100                  # MIS getStockInfo 一次查詢的代碼數（ex_ch 以 | 串接，受 URL 長度限制）
+MAX_WORKERS = 4                   # 同時送出的批次數（實際併發仍受 rate_limiter 的 MIS 設定限制）
+
+# 即時工作表欄位：寫入 A:O，另外讀 F（成交價）、I（成交量）、P（昨收）作為備援／計算用
+_READ_LAST = "P"
+_WRITE_WIDTH = 15                 # A:O
+_COL_F, _COL_I, _COL_P = 5, 8, 15
+
 logger = logging.getLogger(__name__)
 
+
+def _twstock():
+    """
+    匯入 twstock 會同步載入整份上市櫃代碼表（約 0.3 秒），延到第一次抓報價才匯入；
+    第一次匯入時把本機代碼表（code_table）中新上市的代碼補進去，realtime 才判斷得出 tse / otc。
+    twstock 自己送請求，http_client 設了 hosts 時把它的 MIS 網址一併換掉。
+    """
+    import twstock
+    global _synced
+    if not _synced:
+        _synced = True
+        code_table.get_table().sync_twstock(twstock)
+    twstock.realtime.SESSION_URL = http_client.rewrite(_MIS_SESSION_URL)
+    twstock.realtime.STOCKINFO_URL = http_client.rewrite(_MIS_STOCKINFO_URL)
+    return twstock
+
+
+_synced = False
+
+
+def _realtime_get(stocks):
+    """
+    twstock.realtime.get 經限流器送出；vcr 錄製時存下結果，重播時直接回傳錄下的結果
+    （不匯入 twstock、不連網、不經限流）。
+    """
+    def fetch():
+        with rate_limiter.limit(_MIS_HOST):
+            return _twstock().realtime.get(stocks)
+    return vcr.call("twstock.realtime.get", stocks, fetch)
+
+
 class RealtimeStockData:
     
     """單檔個股即時資料處理 (Null-Object Pattern)."""
@@ -34,7 +71,7 @@ class RealtimeStockData:
         無論成功與否都回傳物件；失敗時 data 會是「全欄位 _BLANK」，屬性 blank=True。
         """
         try:
-            data = twstock.realtime.get(code)
+            data = _realtime_get(code)
             if not data.get("success"):            # API 回傳 success=False
                 raise ValueError("success=False")  # 統一丟進 except 區
 
@@ -49,10 +86,29 @@ class RealtimeStockData:
         obj.blank = blank                          # 標註是否為空白資料
         return obj
 
+    @classmethod
+    def from_codes(cls, codes: List[str], first_row: int = 2, *,
+                   chunk_size: int = CHUNK_SIZE,
+                   max_workers: int = MAX_WORKERS) -> List["RealtimeStockData"]:
+        """
+        批次版 from_code：codes 依序對應 first_row 起的每一列。
+        回應中沒有的代碼同樣回傳空白物件（blank=True）。
+        """
+        quotes = fetch_realtime(codes, chunk_size=chunk_size, max_workers=max_workers)
+        stocks = []
+        for row, code in enumerate(codes, start=first_row):
+            data = quotes.get(code)
+            if data is None:
+                logger.warning(f"{code}: 批次回應中沒有資料 → 以空白資料填入")
+                stocks.append(cls(cls._make_blank_payload(code), row, blank=True))
+            else:
+                stocks.append(cls(data, row))
+        return stocks
+
     # ========== 2. 產生空白 payload ==========
     @staticmethod
     def _make_blank_payload(code: str) -> dict:
-        today = datetime.date.today().isoformat()
+        today = datetime.now().date().isoformat()
         return {
             "success": False,
             "info":  {"code": code, "name": _BLANK, "time": f"{today} 00:00:00"},
@@ -60,25 +116,51 @@ class RealtimeStockData:
         }
     # ========= 盤中批次工具 ========= #
     @staticmethod
-    def update_realtime_data(codes: List[str], session: ExcelSession) -> List[str]:
+    def update_realtime_data(codes: List[str], session: ExcelSession, *,
+                             chunk_size: int = CHUNK_SIZE,
+                             max_workers: int = MAX_WORKERS,
+                             results=None) -> List[str]:
         """
-        盤中批次抓即時資料並寫入 Excel。
+        盤中批次抓即時資料並寫入 Excel（Excel 從第 2 列開始寫）。
+        報價以 chunk_size 檔為一批、多批同時抓取，再依代碼對回各列。
+        A:P 以 SheetMirror 讀一次，只把有變動的儲存格合併成矩形寫回；
+        格式與 autofit 每輪各一次。
+        results（ResultsStore）指定時，成功的報價同時存入 realtime 表。
         失敗的股票代碼會被收集後回傳，方便呼叫端做告警或重試。
         """
-        row = 2                     # Excel 從第 2 列開始寫
         failed: List[str] = []
+        if not codes:
+            return failed
+        stocks = RealtimeStockData.from_codes(codes, 2, chunk_size=chunk_size,
+                                              max_workers=max_workers)
+        last = len(codes) + 1
+
+        # 1. 讀一次：A:P 現值（成交價 F、成交量 I 的備援與昨收 P）
+        mirror = session.mirror(f"A2:{_READ_LAST}{last}")
 
-        for code in codes:
+        # 2. 在記憶體更新 A:O；某列出錯只保留該列原值
+        for stock in stocks:
+            code = stock.code()
+            cur = mirror.row(stock.row)
             try:
-                stock = RealtimeStockData.from_code(code, row)
-                stock.input_data(session.sh)
+                cur[:_WRITE_WIDTH] = stock.row_values(cur)
                 if stock.blank:     # API 失敗但已以「-」填入
                     failed.append(code)
             except Exception as exc:
                 logger.warning("處理 %s 發生錯誤：%s", code, exc,exc_info=True)
                 failed.append(code)
-            row += 1
 
+        # 3. 格式一次、只寫變動的矩形、autofit 一次
+        session.range(f"A2:A{last}").api.NumberFormat = "yyyy/mm/dd"
+        writes = mirror.flush()
+        session.autofit()
+        com_calls = mirror.com_calls + 2
+
+        if results is not None:
+            results.save_realtime((s.code(), s.date(), mirror.row(s.row)[2:_WRITE_WIDTH])
+                                  for s in stocks if not s.blank)
+
+        logger.info("[realtime] %d 列、寫入 %d 個範圍，COM 呼叫 %d 次", len(stocks), writes, com_calls)
         return failed
 
     """單檔個股即時資料處理。"""
@@ -105,46 +187,46 @@ class RealtimeStockData:
     def name(self) -> str:       return self._info()["name"]
     
     # ---------- 即時欄位 ---------- #
-    
+    # cur = 本列 A:P 現值（0-based：A=0、F=5、I=8、P=15）
+
     #成交價
     #if get_realtime()["latest_trade_price"] != "-" -> 正常資料 else ->儲存格資料
-    def _latest_trade_price(self, sheet):
+    def _latest_trade_price(self, cur: list):
         price = self._rt()["latest_trade_price"]
-        return price if price != "-" else sheet.range(f"F{self.row}").value
+        return price if price != "-" else cur[_COL_F]
     
     #昨收
-    def _close_price(self, sheet):
-        return sheet.range(f"P{self.row}").value
+    def _close_price(self, cur: list):
+        return cur[_COL_P]
     
     #漲跌
-    def _amplitude(self, sheet):
-        return float(self._latest_trade_price(sheet)) - float(self._close_price(sheet))
+    def _amplitude(self, cur: list):
+        return float(self._latest_trade_price(cur)) - float(self._close_price(cur))
     
     # 漲跌%
-    def _amplitude_pct(self, sheet):
-        pct = self._amplitude(sheet) / float(self._close_price(sheet)) * 100
+    def _amplitude_pct(self, cur: list):
+        pct = self._amplitude(cur) / float(self._close_price(cur)) * 100
         return round(pct, 2)
     
     #成交量
-    def _trade_volume(self, sheet):
+    def _trade_volume(self, cur: list):
         vol = self._rt()["trade_volume"]
-        return vol if vol != "-" else sheet.range(f"I{self.row}").value
+        return vol if vol != "-" else cur[_COL_I]
         
     # ---------- Excel 操作 ---------- #
 
-    def input_data(self, sheet):
-        # 修改数据
-        sheet.range(f"A{self.row}").api.NumberFormat = "yyyy/mm/dd" 
-        sheet.range(f"A{self.row}").value = self.date()
-
-        data = [
+    def row_values(self, cur: list) -> list:
+        """本列新的 A:O 值；B（代碼）沿用 cur 原值。"""
+        return [
+            self.date(),
+            as_text(cur[1]),
             self.name(),
             self._rt()["best_bid_price"][0],
             self._rt()["best_ask_price"][0],
-            self._latest_trade_price(sheet),
-            self._amplitude(sheet),
-            self._amplitude_pct(sheet),
-            self._trade_volume(sheet),
+            self._latest_trade_price(cur),
+            self._amplitude(cur),
+            self._amplitude_pct(cur),
+            self._trade_volume(cur),
             self._rt()["best_bid_volume"][0],
             self._rt()["best_ask_volume"][0],
             self._rt()["accumulate_trade_volume"],
@@ -152,13 +234,60 @@ class RealtimeStockData:
             self._rt()["low"],
             self._rt()["open"],
         ]
-        #設置c到o
-        sheet.range(f"C{self.row}:O{self.row}").value = data
-        sheet.autofit()
+
+    def input_data(self, sheet):
+        """單列寫入（讀 A:P 一次、寫 A:O 一次）；批次請用 update_realtime_data。"""
+        cur = sheet.range(f"A{self.row}:{_READ_LAST}{self.row}").options(ndim=1).value
+        sheet.range(f"A{self.row}").api.NumberFormat = "yyyy/mm/dd"
+        sheet.range(f"A{self.row}").value = self.row_values(cur)
         
 
     
 # --------------------------------------------------
+# 批次即時報價
+# --------------------------------------------------
+def _fetch_chunk(chunk: List[str]) -> Dict[str, dict]:
+    """
+    一次請求抓 chunk 內所有代碼，回傳 {code: twstock 格式資料}。
+    twstock 只要批次中有一檔無效就整批失敗，此時對半拆開重試，把壞代碼隔離出來。
+    """
+    try:
+        try:
+            data = _realtime_get(list(chunk))
+        except KeyError as err:                    # 無效代碼造成的 KeyError('tlong')，不算連線錯誤
+            data = {"success": False, "rtmessage": repr(err)}
+    except Exception as err:                       # timeout、連線錯誤…
+        data = {"success": False, "rtmessage": repr(err)}
+
+    if data.get("success"):
+        return {code: d for code, d in data.items() if code != "success"}
+    if len(chunk) == 1:
+        logger.warning("%s: %s", chunk[0], data.get("rtmessage", "success=False"))
+        return {}
+    mid = len(chunk) // 2
+    return {**_fetch_chunk(chunk[:mid]), **_fetch_chunk(chunk[mid:])}
+
+
+def fetch_realtime(codes: List[str], *,
+                   chunk_size: int = CHUNK_SIZE,
+                   max_workers: int = MAX_WORKERS) -> Dict[str, dict]:
+    """
+    把 codes 切成最多 chunk_size 檔一批、多批同時送出，合併成 {code: 資料}。
+    抓不到的代碼不會出現在結果中（由呼叫端補空白列）。
+    """
+    unique = list(dict.fromkeys(codes))
+    chunks = [unique[i:i + chunk_size] for i in range(0, len(unique), chunk_size)]
+    if not chunks:
+        return {}
+    quotes: Dict[str, dict] = {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks)),
+                            thread_name_prefix="realtime") as pool:
+        for part in pool.map(_fetch_chunk, chunks):
+            quotes.update(part)
+    logger.info("[realtime] %d 檔 / %d 批，取得 %d 檔", len(unique), len(chunks), len(quotes))
+    return quotes
+
+
 """ 
 #盤中抓即時資料
 def update_realtime_data(codes: list[str], session:ExcelSession) -> None:
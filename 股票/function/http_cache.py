@@ -0,0 +1,288 @@
+# http_cache.py
+"""
+fetch_html 底下的持久化 HTTP 回應快取（SQLite 單檔，不需額外套件）。
+
+- 以 URL 為 key；依 URL 樣式設定 TTL（季報類頁面一週、昨收數小時 …）
+- 未過期 → 直接回傳，不連網
+- 已過期但有 ETag / Last-Modified → 送條件式 GET，304 時沿用舊內容並重設時間
+- 總大小超過 max_mb 時，依最後存取時間（LRU）淘汰
+- report() / log_report() 回報 hit / revalidated / miss，read.run 結束時印出
+- configure() 之前 get_cache() 是不快取的替身，單獨 import 使用的模組不會在工作目錄建 .cache/
+
+使用範例：
+    from 股票.function import http_cache
+
+    http_cache.configure(path=".cache/http.sqlite", max_mb=200)
+    resp = http_cache.get("https://histock.tw/stock/2308/...")   # 介面同 http_client.get
+    http_cache.log_report()
+"""
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from . import http_client
+
+logger = logging.getLogger(__name__)
+
+_HOUR = 3600
+_DAY = 24 * _HOUR
+
+# URL 正則 → TTL 秒數；由上往下第一個符合者生效（setting.json 的 ttl 會排在最前面）
+DEFAULT_TTL: dict[str, int] = {
+    # 季報才會變動的 histock 頁面：三率、負債比、流速動比率、營運週轉天數、利息保障倍數、盈餘再投資比、ROE
+    r"histock\.tw/stock/[^/]+/(%E5%88%A9%E6%BD%A4%E6%AF%94%E7%8E%87"
+    r"|%E8%B2%A0%E5%82%B5%E4%BD%94%E8%B3%87%E7%94%A2%E6%AF%94"
+    r"|%E6%B5%81%E9%80%9F%E5%8B%95%E6%AF%94%E7%8E%87"
+    r"|%E7%87%9F%E9%81%8B%E9%80%B1%E8%BD%89%E5%A4%A9%E6%95%B8"
+    r"|%E5%88%A9%E6%81%AF%E4%BF%9D%E9%9A%9C%E5%80%8D%E6%95%B8"
+    r"|%E7%9B%88%E9%A4%98%E5%86%8D%E6%8A%95%E8%B3%87%E6%AF%94%E7%8E%87"
+    r"|%E5%A0%B1%E9%85%AC%E7%8E%87)$": 7 * _DAY,
+    r"tw\.stock\.yahoo\.com/quote/[^/]+/cash-flow-statement$": 7 * _DAY,
+    r"tw\.stock\.yahoo\.com/quote/[^/]+/profile$": _DAY,
+    # 證交所 / 櫃買每日全市場本益比表（market_tables），收盤後更新一次
+    r"openapi\.twse\.com\.tw/|tpex\.org\.tw/openapi/": 6 * _HOUR,
+    r"histock\.tw/stock/": 12 * _HOUR,            # 本益比、股價淨值比、除權除息
+    r"tw\.stock\.yahoo\.com/quote/[^/]+$": 6 * _HOUR,   # 昨收
+}
+
+
+@dataclass
+class CachedResponse:
+    """與 requests.Response 相容的最小介面；內容以原始 bytes 保存。"""
+    url: str
+    status_code: int
+    content: bytes
+    headers: dict[str, str] = field(default_factory=dict)
+    from_cache: bool = True
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+
+class HttpCache:
+    """
+    Parameters
+    ----------
+    path : str | Path
+        SQLite 檔路徑；資料夾不存在會自動建立。
+    max_mb : float
+        快取內容（壓縮後）總上限，超過時依 LRU 淘汰到 90%。
+    ttl : dict[str, int] | None
+        額外的 URL 正則 → TTL 秒數，優先於 DEFAULT_TTL。
+    default_ttl : int
+        沒有任何規則符合時的 TTL；0 表示不快取。
+    """
+
+    def __init__(self,
+                 path: str | Path = ".cache/http.sqlite",
+                 max_mb: float = 200,
+                 ttl: dict[str, int] | None = None,
+                 default_ttl: int = 0) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.default_ttl = default_ttl
+        ttl = ttl or {}
+        rules = {**ttl, **{p: s for p, s in DEFAULT_TTL.items() if p not in ttl}}   # 使用者的規則在前且優先
+        self._rules = [(re.compile(p), int(s)) for p, s in rules.items()]
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                url           TEXT PRIMARY KEY,
+                body          BLOB NOT NULL,
+                etag          TEXT,
+                last_modified TEXT,
+                fetched_at    REAL NOT NULL,
+                accessed_at   REAL NOT NULL,
+                size          INTEGER NOT NULL
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses(accessed_at)")
+        self._db.commit()
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.counts = {"hit": 0, "revalidated": 0, "miss": 0, "evicted": 0}
+
+    # ---------- 規則 ----------
+    def ttl_for(self, url: str) -> int:
+        for rule, seconds in self._rules:
+            if rule.search(url):
+                return seconds
+        return self.default_ttl
+
+    # ---------- 底層存取 ----------
+    def lookup(self, url: str) -> tuple[bytes, str | None, str | None, float] | None:
+        """回傳 (content, etag, last_modified, fetched_at)；沒有則 None。"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+        body, etag, last_modified, fetched_at = row
+        return zlib.decompress(body), etag, last_modified, fetched_at
+
+    def store(self, url: str, content: bytes, headers: Any) -> None:
+        body = zlib.compress(content, 6)
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, body, headers.get("ETag"), headers.get("Last-Modified"), now, now, len(body)),
+            )
+            self._total += len(body) - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def touch(self, url: str) -> None:
+        """304 Not Modified：內容沿用，重新計算 TTL。"""
+        with self._lock:
+            self._db.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+
+    def _evict(self) -> None:
+        """已持有鎖時呼叫：依 accessed_at 由舊到新刪到 90% 容量。"""
+        target = int(self.max_bytes * 0.9)
+        rows = self._db.execute("SELECT url, size FROM responses ORDER BY accessed_at").fetchall()
+        doomed = []
+        for url, size in rows:
+            if self._total <= target:
+                break
+            doomed.append((url,))
+            self._total -= size
+        self._db.executemany("DELETE FROM responses WHERE url = ?", doomed)
+        self.counts["evicted"] += len(doomed)
+
+    # ---------- 對外 ----------
+    def begin(self, url: str) -> tuple[CachedResponse | None, dict[str, str], bytes | None]:
+        """
+        請求前查快取，回傳 (命中的回應, 條件式 GET 標頭, 舊內容)。
+        命中時呼叫端直接使用第一個值；否則帶著標頭送出請求後交給 complete()。
+        """
+        ttl = self.ttl_for(url)
+        cached = self.lookup(url) if ttl > 0 else None
+        if cached is None:
+            return None, {}, None
+
+        content, etag, last_modified, fetched_at = cached
+        if time.time() - fetched_at < ttl:
+            self._count("hit")
+            return CachedResponse(url, 200, content), {}, content
+
+        headers: dict[str, str] = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return None, headers, content
+
+    def complete(self, url: str, resp: Any, cached: bytes | None) -> Any:
+        """請求後：304 → 沿用舊內容；200 → 寫入快取；其他狀態原樣回傳、不快取。"""
+        if resp.status_code == 304 and cached is not None:
+            self.touch(url)
+            self._count("revalidated")
+            return CachedResponse(url, 200, cached)
+
+        self._count("miss")
+        if resp.status_code == 200 and self.ttl_for(url) > 0:
+            self.store(url, resp.content, resp.headers)
+        return resp
+
+    def get(self, url: str, *, timeout: float | None = None) -> Any:
+        """介面同 http_client.get。"""
+        hit, headers, cached = self.begin(url)
+        if hit is not None:
+            return hit
+        resp = http_client.get(url, headers=headers or None, timeout=timeout)
+        return self.complete(url, resp, cached)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] += 1
+
+    def report(self) -> dict[str, float]:
+        with self._lock:
+            counts = dict(self.counts)
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        total = counts["hit"] + counts["revalidated"] + counts["miss"]
+        return {
+            **counts,
+            "hit_ratio": round((counts["hit"] + counts["revalidated"]) / total, 3) if total else 0.0,
+            "entries": entries,
+            "size_mb": round(self._total / 1024 / 1024, 2),
+        }
+
+    def log_report(self) -> None:
+        r = self.report()
+        logger.info(
+            f"[cache] hit {r['hit']} / 304 {r['revalidated']} / miss {r['miss']}"
+            f"（命中率 {r['hit_ratio']:.0%}），{r['entries']} 筆 {r['size_mb']} MB，淘汰 {r['evicted']} 筆"
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+
+class _NoCache:
+    """enabled=False 時的替身：直接轉呼叫 http_client.get。"""
+
+    def get(self, url: str, *, timeout: float | None = None) -> Any:
+        return http_client.get(url, timeout=timeout)
+
+    def begin(self, url: str) -> tuple[None, dict[str, str], None]:
+        return None, {}, None
+
+    def complete(self, url: str, resp: Any, cached: bytes | None) -> Any:
+        return resp
+
+    def report(self) -> dict[str, float]:
+        return {}
+
+    def log_report(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+# ──────────────────────────────
+# 模組層級共用實例
+# ──────────────────────────────
+_cache: HttpCache | _NoCache = _NoCache()      # configure() 之前不碰磁碟，直接轉呼叫 http_client.get
+_cache_lock = threading.Lock()
+
+
+def configure(enabled: bool = True, **kwargs) -> HttpCache | _NoCache:
+    """依 setting.json 的 "cache" 區塊建立共用快取。"""
+    global _cache
+    with _cache_lock:
+        _cache.close()
+        _cache = HttpCache(**kwargs) if enabled else _NoCache()
+        return _cache
+
+
+def get_cache() -> HttpCache | _NoCache:
+    return _cache
+
+
+def get(url: str, *, timeout: float | None = None) -> Any:
+    return get_cache().get(url, timeout=timeout)
+
+
+def log_report() -> None:
+    _cache.log_report()
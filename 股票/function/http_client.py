@@ -0,0 +1,241 @@
+# http_client.py
+"""
+共用 HTTP 用戶端：所有抓取路徑（fetch_html、etf_classifier、code_table）都走這裡。
+
+- 全程共用一個 Session → 每個 host 一組 keep-alive 連線池，不再每頁重新 TCP+TLS 握手
+- 自動協商壓縮：gzip / deflate，有安裝 brotli 時再加上 br
+- http2=True 且已安裝 httpx[http2] 時改用 HTTP/2 多工；未安裝則自動退回 requests
+- stats() / log_stats() 回報每個 host 的請求數與實際開啟的連線數（= 省下的握手次數）
+- 每個請求都先經過 rate_limiter（每 host 令牌桶＋AIMD 併發），並回報狀態碼供其調速
+- hosts 可把指定 host 改送到其他位址（例如本機 mock server 做壓力測試）；
+  限流與統計仍以原本的 host 計算
+- vcr 啟用時每個回應都錄進錄影帶；重播模式直接由錄影帶回傳，不連網也不經限流
+
+使用範例：
+    from 股票.function import http_client
+
+    http_client.configure(http2=False, pool_maxsize=32)   # 可省略，皆有預設值
+    resp = http_client.get("https://histock.tw/stock/2308/...")
+    http_client.log_stats()
+"""
+from __future__ import annotations
+
+import importlib.util
+import logging
+import threading
+from collections import defaultdict
+from typing import Any
+from urllib.parse import urlsplit, urlunsplit
+
+from . import rate_limiter, vcr
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 5
+
+
+def _accept_encoding() -> str:
+    """有安裝 brotli / brotlicffi 才宣告 br，否則伺服器回 br 我們也解不開。"""
+    encodings = ["gzip", "deflate"]
+    if importlib.util.find_spec("brotli") or importlib.util.find_spec("brotlicffi"):
+        encodings.append("br")
+    return ", ".join(encodings)
+
+
+def _rewrite(url: str, hosts: dict[str, str]) -> str:
+    """hosts 有對應時把 scheme://host 換成指定的 base URL，path 與 query 不變。"""
+    parts = urlsplit(url)
+    base = hosts.get(parts.hostname or "")
+    if base is None:
+        return url
+    target = urlsplit(base)
+    return urlunsplit((target.scheme, target.netloc, parts.path, parts.query, parts.fragment))
+
+
+class HttpClient:
+    """
+    執行緒安全的共用 HTTP 用戶端。
+
+    Parameters
+    ----------
+    pool_connections : int
+        最多同時保留幾個 host 的連線池（histock / yahoo / twse … 遠小於此值）。
+    pool_maxsize : int
+        每個 host 連線池可保留的 keep-alive 連線數，應 >= 同時抓取的執行緒數。
+    timeout : float
+        預設逾時秒數。
+    http2 : bool
+        True 時嘗試使用 httpx 的 HTTP/2；缺套件時印警告並退回 HTTP/1.1。
+    hosts : dict[str, str] | None
+        host → 替代的 base URL，例如 {"histock.tw": "http://127.0.0.1:8765"}；
+        只換連線目標，rate_limiter 與 stats() 仍記在原 host 名下。
+    """
+
+    def __init__(self,
+                pool_connections: int = 16,
+                pool_maxsize: int = 32,
+                timeout: float = DEFAULT_TIMEOUT,
+                http2: bool = False,
+                hosts: dict[str, str] | None = None) -> None:
+        self.timeout = timeout
+        self.hosts = dict(hosts or {})
+        self._lock = threading.Lock()
+        self._requests: dict[str, int] = defaultdict(int)
+        self._connects: dict[str, int] = defaultdict(int)   # 只有 httpx 後端使用
+        self._headers = {"Accept-Encoding": _accept_encoding()}
+
+        self._httpx = None
+        if http2:
+            if importlib.util.find_spec("httpx") and importlib.util.find_spec("h2"):
+                import httpx
+                self._httpx = httpx.Client(
+                    http2=True,
+                    headers=self._headers,
+                    timeout=timeout,
+                    limits=httpx.Limits(max_connections=pool_connections * pool_maxsize,
+                                        max_keepalive_connections=pool_maxsize),
+                )
+            else:
+                logger.warning("http2=True 但未安裝 httpx[http2]，改用 HTTP/1.1 連線池")
+
+        import requests                   # 延遲匯入：只用快取 / 不連網的流程不必載入
+        from requests.adapters import HTTPAdapter
+
+        self._session = requests.Session()
+        self._session.headers.update(self._headers)
+        self._adapter = HTTPAdapter(pool_connections=pool_connections,
+                                    pool_maxsize=pool_maxsize)
+        self._session.mount("https://", self._adapter)
+        self._session.mount("http://", self._adapter)
+
+    @property
+    def backend(self) -> str:
+        return "httpx/h2" if self._httpx is not None else "requests"
+
+    # ---------- 請求 ----------
+    def rewrite(self, url: str) -> str:
+        """依 hosts 換成實際連線的 URL；沒有設定時原樣回傳。"""
+        return _rewrite(url, self.hosts) if self.hosts else url
+
+    def get(self,
+            url: str,
+            *,
+            headers: dict[str, str] | None = None,
+            timeout: float | None = None) -> Any:
+        """
+        送出 GET 並回傳 response（requests.Response 或 httpx.Response，
+        兩者都有 status_code / text / content / headers / json()）。
+        """
+        tape = vcr.active()
+        if tape is not None and tape.replaying:
+            return tape.replay(url)
+
+        host = urlsplit(url).hostname or ""
+        with self._lock:
+            self._requests[host] += 1
+
+        timeout = self.timeout if timeout is None else timeout
+        target = self.rewrite(url)
+        with rate_limiter.limit(host) as slot:
+            if self._httpx is not None:
+                resp = self._httpx.get(target, headers=headers, timeout=timeout,
+                                       extensions={"trace": self._trace(host)})
+            else:
+                resp = self._session.get(target, headers=headers, timeout=timeout)
+            slot.status = resp.status_code
+            slot.retry_after = rate_limiter.parse_retry_after(resp.headers.get("Retry-After"))
+        if tape is not None:
+            tape.record(url, resp)
+        return resp
+
+    def _trace(self, host: str):
+        """httpcore trace hook：每次真正建立 TCP 連線就記一筆。"""
+        def hook(event_name: str, info: dict) -> None:
+            if event_name == "connection.connect_tcp.complete":
+                with self._lock:
+                    self._connects[host] += 1
+        return hook
+
+    # ---------- 統計 ----------
+    def _connections_by_host(self) -> dict[str, int]:
+        if self._httpx is not None:
+            with self._lock:
+                return dict(self._connects)
+
+        opened: dict[str, int] = defaultdict(int)
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                opened[pool.host] += pool.num_connections
+        return opened
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """
+        回傳 {host: {"requests": n, "connections": m, "reused": n - m}}。
+        reused 即省下的 TCP+TLS 握手次數。
+        """
+        opened = self._connections_by_host()
+        with self._lock:
+            requests_by_host = dict(self._requests)
+
+        return {
+            host: {
+                "requests": n,
+                "connections": opened.get(host, 0),
+                "reused": max(n - opened.get(host, 0), 0),
+            }
+            for host, n in sorted(requests_by_host.items())
+        }
+
+    def log_stats(self) -> None:
+        for host, s in self.stats().items():
+            logger.info(
+                f"[http] {host}: {s['requests']} 次請求 / {s['connections']} 條連線"
+                f"（重用 {s['reused']} 次，{self.backend}）"
+            )
+
+    def close(self) -> None:
+        self._session.close()
+        if self._httpx is not None:
+            self._httpx.close()
+
+
+# ──────────────────────────────
+# 模組層級共用實例
+# ──────────────────────────────
+_client: HttpClient | None = None
+_client_lock = threading.Lock()
+
+
+def configure(**kwargs) -> HttpClient:
+    """以新參數重建共用用戶端（通常由 read.run 依 setting.json 的 "http" 區塊呼叫）。"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = HttpClient(**kwargs)
+        return _client
+
+
+def get_client() -> HttpClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
+
+
+def get(url: str, **kwargs) -> Any:
+    """等同 get_client().get(url, ...)。"""
+    return get_client().get(url, **kwargs)
+
+
+def rewrite(url: str) -> str:
+    """等同 get_client().rewrite(url)；給不經 http_client 送出的請求（asyncio 引擎、twstock）使用。"""
+    return get_client().rewrite(url)
+
+
+def log_stats() -> None:
+    get_client().log_stats()
@@ -0,0 +1,331 @@
+# instrumentation.py
+"""
+抓取過程的計數器與直方圖：找出慢的是哪個 host、哪種頁面、哪個指標、哪幾檔。
+
+記錄項目：
+- 請求延遲（每 host × 頁面）、回應 bytes、狀態碼、快取命中、重試次數   ← fetch_html / AsyncFetcher
+- 解析時間（每頁面）、擷取時間（每個解析方法 = 指標）                  ← fetch_html / CrawlScheduler
+- 工作佇列等待時間（排入 → 工作執行緒取出）                            ← CrawlScheduler
+- 每檔總時間（排入第一頁 → 最後一頁解析完）
+
+匯出：report() → JSON 執行報告；prometheus_text() → Prometheus 文字格式（可交給 node_exporter textfile）；
+log_summary() 在 read.run 結束時列出最慢的代碼與指標。enabled=False 時所有記錄呼叫都不做事。
+
+使用範例：
+    instrumentation.configure(report=".cache/reports/{date}.json", prometheus=".cache/reports/{date}.prom")
+    m = instrumentation.get_metrics()
+    m.request("histock.tw", "本益比", 0.12, 35_000, 200)
+    m.write()
+    m.log_summary()
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "stock_crawler"
+# 直方圖上界（秒）；與 Prometheus client 的預設值相近，另外補上 30 秒給逾時重試
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEFAULT_TOP = 10
+
+
+class Histogram:
+    """固定上界的累積直方圖（非執行緒安全，由 Metrics 的鎖保護）。"""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)      # 最後一格 = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """依桶內線性內插估計分位數（同 PromQL histogram_quantile）；落在 +Inf 桶時回傳 max。"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                if i == len(BUCKETS):
+                    return self.max
+                lower = BUCKETS[i - 1] if i else 0.0
+                return min(lower + (BUCKETS[i] - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def to_dict(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": round(self.quantile(0.5), 6),
+            "p90": round(self.quantile(0.9), 6),
+            "p99": round(self.quantile(0.99), 6),
+            "max": round(self.max, 6),
+        }
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    pairs = []
+    for name, value in zip(names, values):
+        text = str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+        pairs.append(f'{name}="{text}"')
+    return ",".join(pairs)
+
+
+class Metrics:
+    """
+    Parameters
+    ----------
+    report : str | Path | None
+        write() 輸出的 JSON 執行報告路徑；{date} 換成今天 YYYYMMDD。None = 不輸出。
+    prometheus : str | Path | None
+        write() 輸出的 Prometheus 文字檔路徑；{date} 同上。None = 不輸出。
+    top : int
+        log_summary() / report() 列出最慢的前幾名。
+    """
+
+    enabled = True
+
+    # 名稱 → (說明, 標籤)
+    HISTOGRAMS: dict[str, tuple[str, tuple[str, ...]]] = {
+        "fetch_seconds":   ("單次請求延遲（含快取命中）", ("host", "page")),
+        "parse_seconds":   ("HTML 解析時間", ("page",)),
+        "extract_seconds": ("解析方法（指標）擷取時間", ("metric",)),
+        "queue_wait_seconds": ("工作排入佇列到被取出的等待時間", ("engine",)),
+        "stock_seconds":   ("每檔從排入到完成的時間", ("engine",)),
+    }
+    COUNTERS: dict[str, tuple[str, tuple[str, ...]]] = {
+        "response_bytes_total": ("回應內容 bytes", ("host", "page")),
+        "responses_total":      ("回應數（依狀態碼）", ("host", "status")),
+        "cache_hits_total":     ("由頁面快取回傳的次數", ("host",)),
+        "retries_total":        ("重試次數", ("host", "page")),
+        "fetch_errors_total":   ("重試用盡或連線失敗的頁面數", ("host", "page")),
+    }
+
+    def __init__(self,
+                 report: str | Path | None = None,
+                 prometheus: str | Path | None = None,
+                 top: int = DEFAULT_TOP) -> None:
+        self.report_path = report
+        self.prometheus_path = prometheus
+        self.top = top
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._hist: dict[str, dict[tuple, Histogram]] = {k: defaultdict(Histogram) for k in self.HISTOGRAMS}
+        self._count: dict[str, dict[tuple, float]] = {k: defaultdict(float) for k in self.COUNTERS}
+        self._stocks: dict[str, float] = {}            # 代碼 → 總秒數
+        self._metric_totals: dict[str, float] = defaultdict(float)   # 指標 → 頁面抓取＋解析＋擷取 總秒數
+
+    # ---------- 記錄 ----------
+    def observe(self, name: str, labels: tuple, seconds: float) -> None:
+        with self._lock:
+            self._hist[name][labels].observe(seconds)
+
+    def inc(self, name: str, labels: tuple, amount: float = 1) -> None:
+        with self._lock:
+            self._count[name][labels] += amount
+
+    def request(self, host: str, page: str | None, seconds: float, size: int,
+                status: int, cached: bool = False) -> None:
+        """一次請求（含快取命中）：延遲、bytes、狀態碼。"""
+        page = page or "-"
+        with self._lock:
+            self._hist["fetch_seconds"][(host, page)].observe(seconds)
+            self._count["response_bytes_total"][(host, page)] += size
+            self._count["responses_total"][(host, str(status))] += 1
+            if cached:
+                self._count["cache_hits_total"][(host,)] += 1
+
+    def retry(self, host: str, page: str | None) -> None:
+        self.inc("retries_total", (host, page or "-"))
+
+    def fetch_error(self, host: str, page: str | None) -> None:
+        self.inc("fetch_errors_total", (host, page or "-"))
+
+    def parse(self, page: str | None, seconds: float) -> None:
+        self.observe("parse_seconds", (page or "-",), seconds)
+
+    def extract(self, metric: str, seconds: float, page_seconds: float = 0.0) -> None:
+        """
+        擷取時間；page_seconds（該頁抓取＋解析）也計入此指標的總時間。
+        同一頁供多個指標使用時，每個指標都計入整頁時間。
+        """
+        with self._lock:
+            self._hist["extract_seconds"][(metric,)].observe(seconds)
+            self._metric_totals[metric] += seconds + page_seconds
+
+    def queue_wait(self, engine: str, seconds: float) -> None:
+        self.observe("queue_wait_seconds", (engine,), seconds)
+
+    def stock(self, engine: str, code: str, seconds: float) -> None:
+        with self._lock:
+            self._hist["stock_seconds"][(engine,)].observe(seconds)
+            self._stocks[code] = seconds
+
+    # ---------- 彙整 ----------
+    def slowest_stocks(self, n: int | None = None) -> list[tuple[str, float]]:
+        with self._lock:
+            items = sorted(self._stocks.items(), key=lambda kv: kv[1], reverse=True)
+        return items[:n or self.top]
+
+    def slowest_metrics(self, n: int | None = None) -> list[tuple[str, float]]:
+        with self._lock:
+            items = sorted(self._metric_totals.items(), key=lambda kv: kv[1], reverse=True)
+        return items[:n or self.top]
+
+    def totals(self) -> dict[str, Any]:
+        """各直方圖的累計秒數與次數（跨標籤加總；多執行緒同時進行，總和可大於牆鐘時間）。"""
+        with self._lock:
+            return {
+                name: {"count": sum(h.count for h in series.values()),
+                       "seconds": round(sum(h.sum for h in series.values()), 3)}
+                for name, series in self._hist.items()
+            }
+
+    def report(self) -> dict[str, Any]:
+        """JSON 執行報告：直方圖摘要（count / sum / p50 / p90 / p99 / max）、計數器、最慢的代碼與指標。"""
+        with self._lock:
+            hist = {
+                name: [{**dict(zip(self.HISTOGRAMS[name][1], key)), **h.to_dict()}
+                       for key, h in sorted(series.items())]
+                for name, series in self._hist.items()
+            }
+            counters = {
+                name: [{**dict(zip(self.COUNTERS[name][1], key)), "value": v}
+                       for key, v in sorted(series.items())]
+                for name, series in self._count.items()
+            }
+        return {
+            "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+            "seconds": round(time.time() - self.started, 3),
+            "histograms": hist,
+            "counters": counters,
+            "slowest_stocks": [{"code": c, "seconds": round(s, 3)} for c, s in self.slowest_stocks()],
+            "slowest_metrics": [{"metric": m, "seconds": round(s, 3)} for m, s in self.slowest_metrics()],
+        }
+
+    def prometheus_text(self) -> str:
+        """Prometheus 文字格式（text/plain; version=0.0.4）。"""
+        lines: list[str] = []
+        with self._lock:
+            for name, (doc, label_names) in self.HISTOGRAMS.items():
+                metric = f"{PREFIX}_{name}"
+                lines += [f"# HELP {metric} {doc}", f"# TYPE {metric} histogram"]
+                for key, h in sorted(self._hist[name].items()):
+                    base = _labels(label_names, key)
+                    sep = "," if base else ""
+                    cumulative = 0
+                    for bound, n in zip((*BUCKETS, "+Inf"), h.counts):
+                        cumulative += n
+                        lines.append(f'{metric}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+                    lines.append(f"{metric}_sum{{{base}}} {h.sum:.6f}")
+                    lines.append(f"{metric}_count{{{base}}} {h.count}")
+            for name, (doc, label_names) in self.COUNTERS.items():
+                metric = f"{PREFIX}_{name}"
+                lines += [f"# HELP {metric} {doc}", f"# TYPE {metric} counter"]
+                for key, value in sorted(self._count[name].items()):
+                    lines.append(f"{metric}{{{_labels(label_names, key)}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> list[Path]:
+        """依設定輸出 JSON 報告 / Prometheus 文字檔，回傳寫出的路徑。"""
+        today = date.today().strftime("%Y%m%d")
+        written = []
+        for target, render in ((self.report_path, lambda: json.dumps(self.report(), ensure_ascii=False, indent=2)),
+                               (self.prometheus_path, self.prometheus_text)):
+            if not target:
+                continue
+            path = Path(str(target).format(date=today))
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(render(), encoding="utf-8")
+            written.append(path)
+        return written
+
+    def log_summary(self) -> None:
+        """每個 host 的延遲分位數、重試數，以及最慢的代碼與指標。"""
+        with self._lock:
+            by_host: dict[str, Histogram] = defaultdict(Histogram)
+            for (host, _page), h in self._hist["fetch_seconds"].items():
+                merged = by_host[host]
+                merged.counts = [a + b for a, b in zip(merged.counts, h.counts)]
+                merged.count += h.count
+                merged.sum += h.sum
+                merged.max = max(merged.max, h.max)
+            retries: dict[str, float] = defaultdict(float)
+            for (host, _page), n in self._count["retries_total"].items():
+                retries[host] += n
+            size: dict[str, float] = defaultdict(float)
+            for (host, _page), n in self._count["response_bytes_total"].items():
+                size[host] += n
+        for host, h in sorted(by_host.items()):
+            logger.info(f"[metrics] {host}: {h.count} 次請求 p50 {h.quantile(0.5) * 1000:.0f}ms "
+                        f"p99 {h.quantile(0.99) * 1000:.0f}ms，{size[host] / 2**20:.1f} MB，重試 {retries[host]:g} 次")
+        if slow := self.slowest_stocks():
+            logger.info("[metrics] 最慢的代碼：" + "、".join(f"{c} {s:.1f}s" for c, s in slow))
+        if slow := self.slowest_metrics():
+            logger.info("[metrics] 最耗時的指標（抓取＋解析＋擷取 累計）：" + "、".join(f"{m} {s:.1f}s" for m, s in slow))
+        for path in self.write():
+            logger.info(f"[metrics] 已輸出 {path}")
+
+
+class _NoMetrics:
+    """enabled=False 時的替身：所有記錄呼叫都不做事。"""
+
+    enabled = False
+
+    def __getattr__(self, name: str):
+        return lambda *args, **kwargs: None
+
+    def totals(self) -> dict[str, Any]:
+        return {}
+
+    def report(self) -> dict[str, Any]:
+        return {}
+
+    def prometheus_text(self) -> str:
+        return ""
+
+    def write(self) -> list[Path]:
+        return []
+
+
+# ──────────────────────────────
+# 模組層級共用實例
+# ──────────────────────────────
+_metrics: Metrics | _NoMetrics | None = None
+_metrics_lock = threading.Lock()
+
+
+def configure(enabled: bool = True, **kwargs) -> Metrics | _NoMetrics:
+    """依 setting.json 的 "instrumentation" 區塊建立新的記錄器（每次執行重新計數）。"""
+    global _metrics
+    with _metrics_lock:
+        _metrics = Metrics(**kwargs) if enabled else _NoMetrics()
+        return _metrics
+
+
+def get_metrics() -> Metrics | _NoMetrics:
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics
@@ -0,0 +1,176 @@
+# market_tables.py
+"""
+全市場本益比 / 股價淨值比 / 殖利率整批匯入（證交所、櫃買中心每日 BWIBBU 表）。
+
+- 每個市場每天只抓一個檔案（經 http_cache，TTL 見 DEFAULT_TTL），依代碼建索引
+- 表中有的代碼直接填入 市盈率 / 市淨率 / 殖利率，不再逐檔抓 histock 的三個頁面
+- 表中沒有的代碼（ETF、新上市、當天下載失敗的市場）照舊逐檔抓取；
+  表中有代碼但值空白（""、--、N/A）的欄位視同沒有，也逐檔補抓
+- 來源可以是 URL 或本機檔案路徑，格式支援 OpenAPI JSON、{"fields", "data"} JSON 與下載的 CSV
+
+使用範例：
+    tables = MarketTables()                           # 預設抓證交所 + 櫃買 OpenAPI
+    tables = MarketTables({"twse": "fixtures/twse.json", "tpex": "fixtures/tpex.csv"})
+    tables.lookup("2308")   # → {"市盈率": "25.31", "市淨率": "6.12", "殖利率": "2.05"}
+    update_data_parallel(xls, codes, bulk=tables)
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import logging
+from pathlib import Path
+from typing import Any, Iterator
+
+from . import http_cache
+
+logger = logging.getLogger(__name__)
+
+_BLANK = "-"
+
+DEFAULT_SOURCES: dict[str, str] = {
+    "twse": "https://openapi.twse.com.tw/v1/exchangeReport/BWIBBU_ALL",
+    "tpex": "https://www.tpex.org.tw/openapi/v1/tpex_mainboard_peratio_analysis",
+}
+
+# 本模組填得出來的欄位（metric_registry.FIELDS 的子集）
+FIELDS = ["市盈率", "市淨率", "殖利率"]
+
+# 各來源的欄位名稱 → 本專案欄位；"code" 為股票代號
+_ALIASES: dict[str, tuple[str, ...]] = {
+    "code":   ("Code", "SecuritiesCompanyCode", "證券代號", "股票代號", "代號"),
+    "市盈率": ("PEratio", "PriceEarningRatio", "本益比"),
+    "市淨率": ("PBratio", "PriceBookRatio", "股價淨值比"),
+    "殖利率": ("DividendYield", "YieldRatio", "殖利率(%)", "殖利率"),
+}
+
+
+def _clean(value: Any) -> str:
+    text = str(value if value is not None else "").strip().replace(",", "")
+    return _BLANK if text in ("", "-", "--", "N/A") else text
+
+
+def _column_map(header: list[str]) -> dict[str, int] | None:
+    """表頭 → {欄位: 索引}；找不到代號欄時回傳 None（不是表頭列）。"""
+    header = [h.strip() for h in header]
+    found = {
+        key: next(i for i, h in enumerate(header) if h in names)
+        for key, names in _ALIASES.items()
+        if any(h in names for h in header)
+    }
+    return found if "code" in found else None
+
+
+def _rows_to_index(rows: list[list[Any]], cols: dict[str, int]) -> dict[str, dict[str, str]]:
+    index: dict[str, dict[str, str]] = {}
+    width = max(cols.values())
+    for row in rows:
+        if len(row) <= width:                      # 說明列、空白列
+            continue
+        code = str(row[cols["code"]]).strip().strip('="')
+        if code:
+            index[code] = {f: _clean(row[cols[f]]) for f in FIELDS if f in cols}
+    return index
+
+
+def parse_table(content: bytes) -> dict[str, dict[str, str]]:
+    """解析一個市場的 BWIBBU 檔案內容 → {code: {欄位: 值}}。"""
+    for encoding in ("utf-8-sig", "cp950"):
+        try:
+            text = content.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        text = content.decode("utf-8", errors="replace")
+
+    stripped = text.lstrip()
+    if stripped.startswith(("[", "{")):
+        data = json.loads(stripped)
+        if isinstance(data, dict):                 # {"fields": [...], "data": [[...], ...]}
+            cols = _column_map(data.get("fields", []))
+            return _rows_to_index(data.get("data", []), cols) if cols else {}
+        if not data:
+            return {}
+        header = list(data[0].keys())              # OpenAPI：[{欄位: 值}, ...]
+        cols = _column_map(header)
+        return _rows_to_index([list(d.values()) for d in data], cols) if cols else {}
+
+    # CSV：下載檔前面可能有標題列、後面有說明列，從第一個含代號欄的列開始
+    rows = list(csv.reader(io.StringIO(text)))
+    for i, row in enumerate(rows):
+        cols = _column_map(row)
+        if cols:
+            return _rows_to_index(rows[i + 1:], cols)
+    return {}
+
+
+def load_table(source: str | Path) -> dict[str, dict[str, str]]:
+    """source 為 http(s) URL 時經 http_cache 下載，否則視為本機檔案路徑。"""
+    source = str(source)
+    if source.startswith(("http://", "https://")):
+        resp = http_cache.get(source)
+        if resp.status_code != 200:
+            raise RuntimeError(f"HTTP {resp.status_code}: {source}")
+        return parse_table(resp.content)
+    return parse_table(Path(source).read_bytes())
+
+
+class MarketTables:
+    """
+    Parameters
+    ----------
+    sources : dict[str, str] | None
+        市場名 → URL 或本機檔案路徑；預設 DEFAULT_SOURCES。
+        某個市場載入失敗只記警告，該市場的代碼改回逐檔抓取。
+    """
+
+    def __init__(self, sources: dict[str, str] | None = None) -> None:
+        self.sources = sources or dict(DEFAULT_SOURCES)
+        self._index: dict[str, dict[str, str]] = {}
+        for market, source in self.sources.items():
+            try:
+                table = load_table(source)
+            except Exception as exc:  # noqa: BLE001 — 整批失敗時退回逐檔抓取
+                logger.warning(f"[bulk] {market} 載入失敗，改為逐檔抓取：{exc}")
+                continue
+            logger.info(f"[bulk] {market} 載入 {len(table)} 檔")
+            self._index.update(table)
+        self.filled = 0           # 本次由整批表填入的股票數
+        self.missing = 0          # 表中沒有（或三個值都空白）、需要逐檔抓取的股票數
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def lookup(self, code: str) -> dict[str, str] | None:
+        return self._index.get(code)
+
+    def fill(self, stock: Any) -> list[str]:
+        """
+        把表中有值的欄位填進 stock（只填 stock.fields 要的），回傳已填入的欄位；
+        stock.bulk 記下這些值，End 據此不再排這幾個欄位的頁面。值為 "-" 的欄位不填，照舊逐檔抓。
+        """
+        values = self.lookup(stock.code)
+        wanted = [f for f in FIELDS if stock.fields is None or f in stock.fields]
+        if not wanted:
+            return []
+        filled = {f: values[f] for f in wanted if values.get(f, _BLANK) != _BLANK} if values else {}
+        if not filled:
+            self.missing += 1
+            return []
+        for field, value in filled.items():
+            setattr(stock, field, value)
+        stock.bulk = filled
+        self.filled += 1
+        return list(filled)
+
+    def log_summary(self) -> None:
+        if self.filled or self.missing:
+            logger.info(f"[bulk] 整批填入 {self.filled} 檔 / 逐檔補抓 {self.missing} 檔（表中沒有或全部空白）")
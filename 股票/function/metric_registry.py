@@ -0,0 +1,144 @@
+# metric_registry.py
+"""
+歷史指標登錄表：每個欄位 → (頁面代號, End 解析方法, 適用資產, 更新頻率)。
+
+- 欄位順序即寫入 P:AN 的欄位順序（= End._build_row）
+- 同一欄位可依資產別登錄不同方法（例：股息發放日 個股 / ETF 解析方式不同）
+- plan() 依「要哪些欄位」算出最少需要的 (頁面, 方法)；沒被選到的頁面完全不抓
+- 新增指標 = 在 End 加解析方法（可選擇在 End.PAGE_URLS 加頁面）＋ 在 METRICS 加一筆
+
+refresh 分類：
+    daily     每個交易日都可能變動（昨收、本益比 …）
+    quarterly 季報公布後才變動（毛利率、ROE、負債比 …）
+    event     公告才變動（除息日、股息發放日、股利 …）
+
+dtype（results_store 的欄位型別）：
+    real      數值；"12.5%"、"1,234" 轉成 12.5、1234，"-" 為 NULL
+    date      日期；"2023/06/14" 轉成 "2023-06-14"
+
+使用範例：
+    fields = select(["市盈率", "市淨率", "殖利率"])
+    plan(is_etf=False, fields=fields)
+    # → [("本益比", "get_PE"), ("股價淨值比", "get_PB"), ("除權除息", "財務報表")]
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Literal
+
+from .excel_utils import column_letter
+
+Asset = Literal["stock", "etf"]
+Refresh = Literal["daily", "quarterly", "event"]
+Dtype = Literal["real", "date"]
+
+_BOTH: tuple[Asset, ...] = ("stock", "etf")
+_STOCK: tuple[Asset, ...] = ("stock",)
+_ETF: tuple[Asset, ...] = ("etf",)
+
+FIRST_COLUMN = 16          # P 欄
+
+
+@dataclass(frozen=True)
+class Metric:
+    field: str                     # End 屬性名，同時是欄位名
+    page: str                      # End.PAGE_URLS 的頁面代號
+    extractor: str                 # End 的解析方法名，接受該頁 soup
+    assets: tuple[Asset, ...] = _BOTH
+    refresh: Refresh = "daily"
+    dtype: Dtype = "real"
+
+
+METRICS: list[Metric] = [
+    Metric("昨收",             "quote",          "yesterday_close",   _BOTH,  "daily"),
+    Metric("市盈率",           "本益比",         "get_PE",            _STOCK, "daily"),
+    Metric("市淨率",           "股價淨值比",     "get_PB",            _STOCK, "daily"),
+    Metric("ROE",              "報酬率",         "杜邦分析",          _STOCK, "quarterly"),
+    Metric("資產報酬率",       "報酬率",         "杜邦分析",          _STOCK, "quarterly"),
+    Metric("毛利率",           "利潤比率",       "三率",              _STOCK, "quarterly"),
+    Metric("營益率",           "利潤比率",       "三率",              _STOCK, "quarterly"),
+    Metric("稅後淨利率",       "利潤比率",       "三率",              _STOCK, "quarterly"),
+    Metric("每股淨值",         "profile",        "NAVPS",             _STOCK, "quarterly"),
+    Metric("盈餘",             "除權除息",       "財務報表",          _BOTH,  "event"),
+    Metric("流動比率",         "流速動比率",     "流速動比率",        _STOCK, "quarterly"),
+    Metric("速動比率",         "流速動比率",     "流速動比率",        _STOCK, "quarterly"),
+    Metric("負債比率",         "負債佔資產比",   "負債比",            _STOCK, "quarterly"),
+    Metric("利息保障倍數",     "利息保障倍數",   "get_利息保障倍數",  _STOCK, "quarterly"),
+    Metric("應收帳款收現天數", "營運週轉天數",   "營運週轉天數",      _STOCK, "quarterly"),
+    Metric("存貨週轉天數",     "營運週轉天數",   "營運週轉天數",      _STOCK, "quarterly"),
+    Metric("現金股利",         "除權除息",       "財務報表",          _BOTH,  "event"),
+    Metric("股票股利",         "除權除息",       "財務報表",          _BOTH,  "event"),
+    Metric("殖利率",           "除權除息",       "財務報表",          _BOTH,  "daily"),
+    Metric("除息日",           "除權除息",       "財務報表",          _BOTH,  "event", "date"),
+    Metric("股息發放日",       "profile",        "股息發放日_person", _STOCK, "event", "date"),
+    Metric("股息發放日",       "profile",        "股息發放日_ETF",    _ETF,   "event", "date"),
+    Metric("除權日",           "除權除息",       "財務報表",          _BOTH,  "event", "date"),
+    Metric("盈餘再投資比",     "盈餘再投資比率", "get_盈餘再投資比",  _STOCK, "quarterly"),
+    Metric("現金流",           "cash-flow",      "get_現金流",        _STOCK, "quarterly"),
+    Metric("管理費",           "profile",        "ManagementFee",     _ETF,   "quarterly"),
+]
+
+# 欄位（不重複、依登錄順序）＝ P:AN 欄位順序
+FIELDS: list[str] = list(dict.fromkeys(m.field for m in METRICS))
+
+
+def select(columns: Iterable[str] | None) -> list[str]:
+    """驗證 setting.json 的 columns；None / 空清單代表全部欄位。回傳依欄位順序排列。"""
+    if not columns:
+        return list(FIELDS)
+    wanted = set(columns)
+    unknown = wanted - set(FIELDS)
+    if unknown:
+        raise ValueError(f"未知的欄位：{', '.join(sorted(unknown))}（可用：{', '.join(FIELDS)}）")
+    return [f for f in FIELDS if f in wanted]
+
+
+def applicable(fields: Iterable[str], is_etf: bool) -> list[str]:
+    """fields 中對該資產別有登錄解析方法的欄位（維持原順序）。"""
+    asset: Asset = "etf" if is_etf else "stock"
+    ok = {m.field for m in METRICS if asset in m.assets}
+    return [f for f in fields if f in ok]
+
+
+def fields_of(extractor: str) -> list[str]:
+    """解析方法負責填入的欄位；頁面抓取或解析失敗時據此標記哪些欄位沒抓到。"""
+    return list(dict.fromkeys(m.field for m in METRICS if m.extractor == extractor))
+
+
+def refresh_of(field: str) -> Refresh:
+    return next(m.refresh for m in METRICS if m.field == field)
+
+
+def dtype_of(field: str) -> Dtype:
+    return next(m.dtype for m in METRICS if m.field == field)
+
+
+def plan(is_etf: bool, fields: Iterable[str] | None = None) -> list[tuple[str, str]]:
+    """要抓 fields 時最少需要的 (頁面代號, 解析方法)，依登錄順序、不重複。"""
+    asset: Asset = "etf" if is_etf else "stock"
+    wanted = set(FIELDS if fields is None else fields)
+    steps = [
+        (m.page, m.extractor)
+        for m in METRICS
+        if m.field in wanted and asset in m.assets
+    ]
+    return list(dict.fromkeys(steps))
+
+
+def column_runs(fields: Iterable[str]) -> list[tuple[str, str, list[str]]]:
+    """
+    把要寫入的欄位切成連續區段，回傳 [(起始欄, 結束欄, 欄位清單)]；
+    例：["昨收", "市盈率", "殖利率"] → [("P", "Q", [...]), ("AH", "AH", ["殖利率"])]
+    """
+    index = {f: FIRST_COLUMN + i for i, f in enumerate(FIELDS)}
+    cols = sorted(index[f] for f in set(fields))
+    runs: list[list[int]] = []
+    for col in cols:
+        if runs and col == runs[-1][-1] + 1:
+            runs[-1].append(col)
+        else:
+            runs.append([col])
+    return [
+        (column_letter(r[0]), column_letter(r[-1]), [FIELDS[c - FIRST_COLUMN] for c in r])
+        for r in runs
+    ]
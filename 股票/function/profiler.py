@@ -0,0 +1,313 @@
+# profiler.py
+"""
+read.run 的分段效能剖析（python read.py --profile）：每個階段的牆鐘時間、CPU 時間與記憶體峰值，
+寫成一個 JSON 拆解檔，不同天的檔案可以直接比較，判斷該優化網路、解析還是 Excel。
+
+- wall / cpu：cpu 是整個行程（含所有工作執行緒）的 CPU 時間；cpu / wall 接近 1（或更高）表示卡在解析，
+  遠小於 1 表示在等網路或 Excel COM
+- 記憶體峰值：tracemalloc 的 Python 配置峰值（階段內），巢狀階段各自計算
+- mode="cprofile"：每個最上層階段一個 .prof（snakeviz / pstats 可讀），只涵蓋主執行緒
+- mode="sample"：背景執行緒每 interval 秒取樣所有執行緒的呼叫堆疊（含工作執行緒），
+  輸出 flamegraph.pl / speedscope 可讀的 .folded 檔，並在 JSON 列出每個階段最常出現的函式
+- 階段可巢狀（"history/crawl"），self_s = 扣掉子階段後的時間
+
+使用範例：
+    profiler.configure(enabled=True, mode="sample")
+    with profiler.stage("history"):
+        with profiler.stage("crawl"):
+            ...
+    profiler.get_profiler().finish()        # 寫出 .cache/profile/{date}_{time}.json 並印出摘要
+
+    python -m 股票.function.profiler old.json new.json   # 比較兩次執行的各階段耗時
+"""
+from __future__ import annotations
+
+import json
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Any, ContextManager, Iterator
+
+logger = logging.getLogger(__name__)
+
+MODES = ("timing", "cprofile", "sample")
+DEFAULT_PATH = ".cache/profile/{date}_{time}.json"
+DEFAULT_INTERVAL = 0.01
+TOP_FUNCTIONS = 15
+
+
+class _Frame:
+    """進行中的階段。"""
+
+    __slots__ = ("path", "order", "wall", "cpu", "peak", "children_wall")
+
+    def __init__(self, path: str, order: int) -> None:
+        self.path = path
+        self.order = order
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        self.peak = 0
+        self.children_wall = 0.0
+
+
+class _Sampler(threading.Thread):
+    """每 interval 秒讀一次 sys._current_frames()，依目前階段累計折疊後的堆疊。"""
+
+    def __init__(self, profiler: "StageProfiler", interval: float) -> None:
+        super().__init__(name="profile-sampler", daemon=True)
+        self.profiler = profiler
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.leaves: dict[str, Counter[str]] = {}
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        me = threading.get_ident()
+        while not self._done.wait(self.interval):
+            stage = self.profiler.current or "(outside)"
+            leaves = self.leaves.setdefault(stage, Counter())
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                    frame = frame.f_back
+                if not names:
+                    continue
+                leaves[names[0]] += 1
+                self.stacks[";".join([stage.replace("/", ";"), *reversed(names)])] += 1
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+class StageProfiler:
+    """
+    Parameters
+    ----------
+    mode : {"timing", "cprofile", "sample"}
+        timing 只量時間與記憶體；cprofile / sample 另外輸出剖析檔（見模組說明）。
+    path : str | Path
+        拆解 JSON 的路徑；{date} → YYYYMMDD、{time} → HHMMSS。剖析檔放在同一資料夾、同一檔名前綴。
+    memory : bool
+        是否以 tracemalloc 量測記憶體峰值（會讓 Python 配置變慢約 2–4 倍，比較時兩邊設定要一致）。
+    interval : float
+        sample 模式的取樣間隔秒數。
+    """
+
+    enabled = True
+
+    def __init__(self,
+                 mode: str = "timing",
+                 path: str | Path = DEFAULT_PATH,
+                 memory: bool = True,
+                 interval: float = DEFAULT_INTERVAL) -> None:
+        if mode not in MODES:
+            raise ValueError(f"未知的 profile mode：{mode}（可用：{'、'.join(MODES)}）")
+        now = datetime.now()
+        self.mode = mode
+        self.path = Path(str(path).format(date=now.strftime("%Y%m%d"), time=now.strftime("%H%M%S")))
+        self.trace = memory
+        self.started = now
+        self.stages: list[dict[str, Any]] = []
+        self._order: list[int] = []                  # 與 stages 對應的開始順序
+        self._stack: list[_Frame] = []
+        self._profiles: dict[str, Any] = {}          # 最上層階段 → cProfile.Profile
+        self._t0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        self._sampler: _Sampler | None = None
+        # tracemalloc 可能已由呼叫端（例如 -X tracemalloc）啟動，只停止自己啟動的
+        self._own_trace = self.trace and not tracemalloc.is_tracing()
+        if self._own_trace:
+            tracemalloc.start()
+        if mode == "sample":
+            self._sampler = _Sampler(self, interval)
+            self._sampler.start()
+
+    @property
+    def current(self) -> str | None:
+        """目前的階段路徑（取樣執行緒讀取）。"""
+        stack = self._stack
+        return stack[-1].path if stack else None
+
+    # ---------- 階段 ----------
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """量測一個階段；只在主流程（同一條執行緒）中巢狀使用。"""
+        parent = self._stack[-1] if self._stack else None
+        if self.trace:
+            if parent is not None:
+                parent.peak = max(parent.peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        frame = _Frame(f"{parent.path}/{name}" if parent else name, len(self._order) + len(self._stack))
+        profile = None
+        if self.mode == "cprofile" and parent is None:
+            import cProfile
+            profile = self._profiles[frame.path] = cProfile.Profile()
+        self._stack.append(frame)
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            self._stack.pop()
+            wall = time.perf_counter() - frame.wall
+            cpu = time.process_time() - frame.cpu
+            if self.trace:
+                frame.peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+                if parent is not None:
+                    parent.peak = max(parent.peak, frame.peak)
+            if parent is not None:
+                parent.children_wall += wall
+            self._order.append(frame.order)
+            self.stages.append({
+                "stage": frame.path,
+                "wall_s": round(wall, 3),
+                "self_s": round(wall - frame.children_wall, 3),
+                "cpu_s": round(cpu, 3),
+                "cpu_ratio": round(cpu / wall, 2) if wall > 0 else 0.0,
+                "peak_mb": round(frame.peak / 2**20, 1) if self.trace else None,
+            })
+
+    # ---------- 輸出 ----------
+    def _write_profiles(self) -> dict[str, Any]:
+        """輸出 cProfile / 取樣檔，回傳要併入 JSON 的摘要。"""
+        extra: dict[str, Any] = {}
+        stem = self.path.with_suffix("")
+        if self._profiles:
+            import pstats
+
+            extra["cprofile"] = {}
+            for name, profile in self._profiles.items():
+                out = stem.with_name(f"{stem.name}.{name}.prof")
+                profile.dump_stats(out)
+                stats = pstats.Stats(profile)
+                top = []
+                for (filename, line, func), (_cc, calls, tottime, cumtime, _) in stats.stats.items():
+                    top.append({"function": f"{Path(filename).name}:{line}:{func}", "calls": calls,
+                                "self_s": round(tottime, 4), "cum_s": round(cumtime, 4)})
+                top.sort(key=lambda r: r["cum_s"], reverse=True)
+                extra["cprofile"][name] = {"file": str(out), "top": top[:TOP_FUNCTIONS]}
+        if self._sampler is not None:
+            self._sampler.stop()
+            out = stem.with_name(f"{stem.name}.folded")
+            out.write_text("".join(f"{stack} {n}\n" for stack, n in self._sampler.stacks.most_common()),
+                           encoding="utf-8")
+            interval = self._sampler.interval
+            extra["samples"] = {
+                "file": str(out),
+                "interval_s": interval,
+                "top": {stage: [{"function": f, "samples": n, "approx_s": round(n * interval, 2)}
+                                for f, n in leaves.most_common(TOP_FUNCTIONS)]
+                        for stage, leaves in self._sampler.leaves.items()},
+            }
+        return extra
+
+    def breakdown(self) -> dict[str, Any]:
+        wall = time.perf_counter() - self._t0
+        cpu = time.process_time() - self._cpu0
+        return {
+            "started": self.started.strftime("%Y-%m-%d %H:%M:%S"),
+            "mode": self.mode,
+            "python": sys.version.split()[0],
+            "total": {"wall_s": round(wall, 3), "cpu_s": round(cpu, 3),
+                      "cpu_ratio": round(cpu / wall, 2) if wall > 0 else 0.0,
+                      "peak_mb": round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+                      if self.trace and tracemalloc.is_tracing() else None},
+            # 依開始順序排列（父階段在子階段之前）
+            "stages": [s for _, s in sorted(zip(self._order, self.stages), key=lambda p: p[0])],
+        }
+
+    def finish(self, extra: dict[str, Any] | None = None) -> Path:
+        """寫出拆解檔（含 extra，例如 instrumentation 的摘要）並印出各階段耗時，回傳檔案路徑。"""
+        data = self.breakdown()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data.update(self._write_profiles())
+        if extra:
+            data.update(extra)
+        self.path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+        logger.info(f"[profile] {'階段':<24}{'wall':>9}{'self':>9}{'cpu':>9}{'cpu/wall':>9}{'峰值':>9}")
+        for s in data["stages"]:
+            peak = f"{s['peak_mb']:.1f}MB" if s["peak_mb"] is not None else "-"
+            logger.info(f"[profile] {s['stage']:<24}{s['wall_s']:>8.2f}s{s['self_s']:>8.2f}s"
+                        f"{s['cpu_s']:>8.2f}s{s['cpu_ratio']:>9.2f}{peak:>9}")
+        logger.info(f"[profile] 已輸出 {self.path}")
+        if self._own_trace:
+            tracemalloc.stop()
+        return self.path
+
+
+class _NoProfiler:
+    """未啟用時的替身：stage() 不做任何量測。"""
+
+    enabled = False
+    current = None
+
+    def stage(self, name: str) -> ContextManager[None]:
+        return nullcontext()
+
+    def finish(self, extra: dict[str, Any] | None = None) -> None:
+        return None
+
+
+# ──────────────────────────────
+# 模組層級共用實例
+# ──────────────────────────────
+_profiler: StageProfiler | _NoProfiler = _NoProfiler()
+
+
+def configure(enabled: bool = False, **kwargs) -> StageProfiler | _NoProfiler:
+    """依 setting.json 的 "profile" 區塊（或 read.py --profile）設定。"""
+    global _profiler
+    _profiler = StageProfiler(**kwargs) if enabled else _NoProfiler()
+    return _profiler
+
+
+def get_profiler() -> StageProfiler | _NoProfiler:
+    return _profiler
+
+
+def stage(name: str) -> ContextManager[None]:
+    """等同 get_profiler().stage(name)；未啟用時不做事。"""
+    return _profiler.stage(name)
+
+
+# ──────────────────────────────
+# 比較兩次執行
+# ──────────────────────────────
+def compare(old: dict[str, Any], new: dict[str, Any]) -> list[str]:
+    """各階段 wall / cpu 的差異（新 − 舊），回傳可直接印出的文字列。"""
+    before = {s["stage"]: s for s in old["stages"]}
+    lines = [f"{'階段':<24}{'wall 舊':>9}{'wall 新':>9}{'差':>9}{'cpu 舊':>9}{'cpu 新':>9}"]
+    for s in new["stages"]:
+        b = before.pop(s["stage"], None)
+        if b is None:
+            lines.append(f"{s['stage']:<24}{'—':>9}{s['wall_s']:>8.2f}s{'新':>9}{'—':>9}{s['cpu_s']:>8.2f}s")
+            continue
+        lines.append(f"{s['stage']:<24}{b['wall_s']:>8.2f}s{s['wall_s']:>8.2f}s"
+                     f"{s['wall_s'] - b['wall_s']:>+8.2f}s{b['cpu_s']:>8.2f}s{s['cpu_s']:>8.2f}s")
+    for name, b in before.items():
+        lines.append(f"{name:<24}{b['wall_s']:>8.2f}s{'—':>9}{'移除':>9}{b['cpu_s']:>8.2f}s{'—':>9}")
+    o, n = old["total"], new["total"]
+    lines.append(f"{'(總計)':<24}{o['wall_s']:>8.2f}s{n['wall_s']:>8.2f}s{n['wall_s'] - o['wall_s']:>+8.2f}s"
+                 f"{o['cpu_s']:>8.2f}s{n['cpu_s']:>8.2f}s")
+    return lines
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("用法：python -m 股票.function.profiler 舊.json 新.json")
+    old_run, new_run = (json.loads(Path(p).read_text(encoding="utf-8")) for p in sys.argv[1:])
+    print("\n".join(compare(old_run, new_run)))
@@ -0,0 +1,245 @@
+# rate_limiter.py
+"""
+每個 host 一組「令牌桶 + AIMD 自適應併發」限流器，所有抓取路徑共用：
+http_client.get（fetch_html / is_etf）、async_engine、twstock 即時報價。
+
+- 令牌桶：限制每秒請求數（rate），允許 burst 個突發
+- 併發上限：同時進行中的請求數不超過 concurrency
+- AIMD：
+    * 狀態碼正常且延遲 < slow_latency → rate、concurrency 加法遞增
+    * 429 / 5xx / 逾時 / 連線錯誤     → rate、concurrency 乘法遞減（cooldown 內只砍一次）
+    * 伺服器給 Retry-After 時，整個 host 暫停到指定時間
+- rates() / log_rates() 回報每個 host 目前收斂到的速度
+
+使用範例：
+    from 股票.function import rate_limiter
+
+    with rate_limiter.limit("histock.tw") as slot:
+        resp = session.get(url)
+        slot.status = resp.status_code
+        slot.retry_after = rate_limiter.parse_retry_after(resp.headers.get("Retry-After"))
+"""
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field, replace
+from typing import Iterator, AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LimitConfig:
+    rate: float = 10.0             # 初始每秒請求數
+    min_rate: float = 0.5
+    max_rate: float = 50.0
+    concurrency: float = 8.0       # 初始併發上限
+    min_concurrency: float = 1.0
+    max_concurrency: float = 64.0
+    burst: float = 10.0            # 令牌桶容量
+    increase: float = 1.0          # 每「一輪」健康請求後 +increase
+    backoff: float = 0.5           # 出錯時乘上 backoff
+    slow_latency: float = 3.0      # 超過此秒數視為不健康，不再加速
+    cooldown: float = 2.0          # 兩次降速之間至少間隔秒數
+
+
+@dataclass
+class Slot:
+    """一次請求的結果回報；呼叫端在 with 區塊內填 status（或 retry_after）。"""
+    host: str
+    status: int | None = None
+    retry_after: float | None = None
+    started: float = field(default_factory=time.monotonic)
+
+
+def _is_throttled(status: int | None) -> bool:
+    return status is not None and (status == 429 or status >= 500)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-After 標頭 → 秒數，填進 Slot.retry_after；只處理秒數格式，HTTP-date 格式交給 AIMD 自行退避。"""
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class HostLimiter:
+    """單一 host 的令牌桶＋AIMD 狀態；所有方法皆執行緒安全。"""
+
+    def __init__(self, host: str, cfg: LimitConfig) -> None:
+        self.host = host
+        self.cfg = cfg
+        self.rate = cfg.rate
+        self.concurrency = cfg.concurrency
+        self.in_flight = 0
+        self._tokens = cfg.burst
+        self._stamp = time.monotonic()
+        self._blocked_until = 0.0
+        self._last_cut = 0.0
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+
+    # ---------- 取得許可 ----------
+    def _try_acquire(self) -> float:
+        """已持有鎖時呼叫：成功回傳 0，否則回傳建議等待秒數。"""
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        self._tokens = min(self.cfg.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+        if self.in_flight >= int(self.concurrency):
+            return 0.05                                 # 等 release 喚醒或輪詢
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        self._tokens -= 1
+        self.in_flight += 1
+        return 0.0
+
+    def acquire(self) -> None:
+        with self._cond:
+            while (wait := self._try_acquire()) > 0:
+                self._cond.wait(wait)
+
+    async def acquire_async(self) -> None:
+        import asyncio                    # 已在事件迴圈內，必定已載入；模組層不匯入以免拖慢啟動
+
+        while True:
+            with self._lock:
+                wait = self._try_acquire()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    # ---------- 回報結果 ----------
+    def release(self, slot: Slot, *, error: bool = False) -> None:
+        latency = time.monotonic() - slot.started
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if error or _is_throttled(slot.status):
+                if slot.retry_after:
+                    self._blocked_until = max(self._blocked_until, now + slot.retry_after)
+                if now - self._last_cut >= self.cfg.cooldown:
+                    self._last_cut = now
+                    self.rate = max(self.cfg.min_rate, self.rate * self.cfg.backoff)
+                    self.concurrency = max(self.cfg.min_concurrency,
+                                           self.concurrency * self.cfg.backoff)
+                    logger.info(f"[limit] {self.host} 降速 → {self.rate:.1f} req/s, "
+                                f"併發 {int(self.concurrency)}（status={slot.status}, error={error}）")
+            elif latency < self.cfg.slow_latency:
+                # 每完成約 concurrency 個健康請求，併發 +increase；rate 同理
+                self.concurrency = min(self.cfg.max_concurrency,
+                                       self.concurrency + self.cfg.increase / self.concurrency)
+                self.rate = min(self.cfg.max_rate,
+                                self.rate + self.cfg.increase / max(self.rate, 1.0))
+            self._cond.notify_all()
+
+    def retry_delay(self, attempt: int) -> float:
+        """重試前的等待：指數退避＋抖動，並尊重 Retry-After。"""
+        base = min(8.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5)
+        return max(base, self._blocked_until - time.monotonic())
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            return {
+                "rate": round(self.rate, 2),
+                "concurrency": int(self.concurrency),
+                "in_flight": self.in_flight,
+            }
+
+
+class RateLimiter:
+    """host → HostLimiter；per_host 可針對個別 host 覆寫 LimitConfig 欄位。"""
+
+    def __init__(self,
+                 default: LimitConfig | None = None,
+                 per_host: dict[str, dict] | None = None) -> None:
+        self._default = default or LimitConfig()
+        self._per_host = per_host or {}
+        self._hosts: dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def host(self, host: str) -> HostLimiter:
+        limiter = self._hosts.get(host)
+        if limiter is None:
+            with self._lock:
+                limiter = self._hosts.get(host)
+                if limiter is None:
+                    cfg = replace(self._default, **self._per_host.get(host, {}))
+                    limiter = self._hosts[host] = HostLimiter(host, cfg)
+        return limiter
+
+    @contextmanager
+    def limit(self, host: str) -> Iterator[Slot]:
+        limiter = self.host(host)
+        limiter.acquire()
+        slot = Slot(host)
+        try:
+            yield slot
+        except Exception:
+            limiter.release(slot, error=True)
+            raise
+        limiter.release(slot)
+
+    @asynccontextmanager
+    async def limit_async(self, host: str) -> AsyncIterator[Slot]:
+        limiter = self.host(host)
+        await limiter.acquire_async()
+        slot = Slot(host)
+        try:
+            yield slot
+        except Exception:
+            limiter.release(slot, error=True)
+            raise
+        limiter.release(slot)
+
+    def rates(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {h: lim.snapshot() for h, lim in sorted(hosts.items())}
+
+    def log_rates(self) -> None:
+        for host, s in self.rates().items():
+            logger.info(f"[limit] {host}: {s['rate']} req/s, 併發 {s['concurrency']}")
+
+
+# ──────────────────────────────
+# 模組層級共用實例
+# ──────────────────────────────
+_limiter = RateLimiter()
+
+
+def configure(per_host: dict[str, dict] | None = None, **defaults) -> RateLimiter:
+    """依 setting.json 的 "rate_limit" 區塊重建共用限流器。"""
+    global _limiter
+    _limiter = RateLimiter(LimitConfig(**defaults), per_host)
+    return _limiter
+
+
+def get_limiter() -> RateLimiter:
+    return _limiter
+
+
+def limit(host: str):
+    return _limiter.limit(host)
+
+
+def limit_async(host: str):
+    return _limiter.limit_async(host)
+
+
+def retry_delay(host: str, attempt: int) -> float:
+    return _limiter.host(host).retry_delay(attempt)
+
+
+def rates() -> dict[str, dict[str, float]]:
+    return _limiter.rates()
+
+
+def log_rates() -> None:
+    _limiter.log_rates()
@@ -2,14 +2,17 @@
 from __future__ import annotations
 import logging
 from datetime import time as dtime
-from typing import List,cast
+from typing import TYPE_CHECKING, List,cast
 from pathlib import Path
 
 from .excel_utils import ExcelSession
-from .get_stock import RealtimeStockData   
-from . import classification
+from .get_stock import RealtimeStockData, CHUNK_SIZE, MAX_WORKERS
+from . import classification, profiler
 from .rename_code_only_sheets import rename_code_only_sheets
 
+if TYPE_CHECKING:
+    from .results_store import ResultsStore
+
 logger = logging.getLogger(__name__)
 
 CLOSING_TIME: dtime = dtime(13, 40)
@@ -28,6 +31,9 @@ class RealtimeMarket:
         *,
         closing: dtime = CLOSING_TIME,
         poll_sec: int = POLL_SEC,
+        chunk_size: int = CHUNK_SIZE,
+        max_workers: int = MAX_WORKERS,
+        results: ResultsStore | None = None,
     ) -> None:
         self.codes = codes
         self.xls_path = xls_path
@@ -36,6 +42,9 @@ class RealtimeMarket:
         self.have_changed = have_changed
         self.closing = closing
         self.poll_sec = poll_sec
+        self.chunk_size = chunk_size      # 每批即時報價的代碼數
+        self.max_workers = max_workers    # 同時送出的批次數
+        self.results = results            # 收盤報價同時存入結果資料庫
 
     # -------- 核心流程 -------- #
     def run(self) -> None:
@@ -46,23 +55,32 @@ class RealtimeMarket:
             #self._poll_until_close(xls)
 
             logger.info("♦ 收盤最後一次更新")
-            RealtimeStockData.update_realtime_data(self.codes, xls)   # re-use 函式
+            with profiler.stage("realtime"):
+                RealtimeStockData.update_realtime_data(self.codes, xls,   # re-use 函式
+                                                       chunk_size=self.chunk_size,
+                                                       max_workers=self.max_workers,
+                                                       results=self.results)
             
             if self.have_changed:
                 logger.info("♦ 更新工作頁名稱")
-                rename_code_only_sheets(xls)
+                with profiler.stage("rename"):
+                    rename_code_only_sheets(xls)
 
             logger.info("♦ 分類開始")
-            classification.classification(self.codes, xls)
+            with profiler.stage("classify"):
+                classification.classification(self.codes, xls)
             logger.info("♦ 分類結束")
 
-            xls.save()  # 保存工作簿
+            with profiler.stage("save"):
+                xls.save()  # 保存工作簿
 
     """ 
     # -------- 私有方法 -------- #
     def _poll_until_close(self, xls: ExcelSession) -> None:
         while datetime.now().time() < self.closing:
-            failed = RealtimeStockData.update_realtime_data(self.codes, xls)
+            failed = RealtimeStockData.update_realtime_data(self.codes, xls,
+                                                            chunk_size=self.chunk_size,
+                                                            max_workers=self.max_workers)
             if failed:
                 logger.warning("本回合失敗股票：%s", ", ".join(failed))
             time.sleep(self.poll_sec)
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 from typing import Literal
-from .excel_utils import ExcelSession
+from .excel_utils import ExcelSession, column_index
 import logging
 logger = logging.getLogger(__name__)
 
@@ -31,17 +31,25 @@ def rename_code_only_sheets(
         - error        ：若存在同名工作表就拋例外。
     """
 
-    # ---- 1. 讀取 B、C 欄取得對照表 ----------------------------------
+    # ---- 1. 讀取 B、C 欄取得對照表（只讀這兩欄，一次讀完）------------
     code_name_map: dict[str, str] = {}
-    row = start_row
-    sht = session.sh  # 目前活動工作表
-    while True:
-        code = sht.range(f"{code_col}{row}").value
-        name = sht.range(f"{name_col}{row}").value
+    bottom = int(session.sh.used_range.address.rsplit("$", 1)[-1])   # "$A$1:$O$40" → 40
+    if bottom < start_row:
+        logger.info("找不到任何代碼，結束。")
+        return
+    cols = sorted((code_col, name_col), key=column_index)
+    mirror = session.mirror(f"{cols[0]}{start_row}:{cols[1]}{bottom}")  # 目前活動工作表
+    code_idx = column_index(code_col) - mirror.left
+    name_idx = column_index(name_col) - mirror.left
+    for row in range(mirror.top, mirror.bottom + 1):
+        values = mirror.row(row)
+        code = values[code_idx] if 0 <= code_idx < len(values) else None
+        name = values[name_idx] if 0 <= name_idx < len(values) else None
         if not code:
             break  # 遇到空白列就停
+        if isinstance(code, float) and code.is_integer():
+            code = int(code)   # 數字格式的代碼讀回來是 2308.0
         code_name_map[str(code).strip()] = str(name or "").strip()
-        row += 1
 
     if not code_name_map:
         logger.info("找不到任何代碼，結束。")
@@ -0,0 +1,62 @@
+# results_export.py
+"""
+由 ResultsStore 產生活頁簿：版面與主工作表相同（A:O 即時報價、P:AN 歷史指標），
+以 openpyxl write_only 串流寫出，不需要開啟 Excel，也不讀取既有活頁簿。
+
+用法：
+    python -m 股票.function.results_export out.xlsx                      # 今天
+    python -m 股票.function.results_export out.xlsx 2025-01-02 .cache/results.sqlite
+"""
+from __future__ import annotations
+
+import logging
+import sys
+from datetime import date
+from pathlib import Path
+
+from . import metric_registry
+from .excel_openpyxl import OpenpyxlSession
+from .results_store import REALTIME_COLUMNS, ResultsStore
+
+logger = logging.getLogger(__name__)
+
+HEADER = ["日期", "代碼", *REALTIME_COLUMNS, *metric_registry.FIELDS]   # A:AN
+
+
+def export_workbook(store: ResultsStore,
+                    path: str | Path,
+                    day: str | None = None,
+                    codes: list[str] | None = None,
+                    sheet_name: str = "new title") -> int:
+    """
+    把某天的即時＋歷史資料寫成新的 .xlsx，回傳列數。
+    codes 指定列順序（例如與讀取檔相同）；None 時依代碼排序。
+    """
+    day = day or date.today().isoformat()
+    realtime = store.realtime(day)
+    history = store.history(day)
+    order = codes or sorted(set(realtime) | set(history))
+
+    def rows():
+        yield HEADER
+        for code in order:
+            rt = realtime.get(code, {})
+            hist = history.get(code, {})
+            yield [day, f"'{code}",
+                   *(rt.get(c) for c in REALTIME_COLUMNS),
+                   *(hist.get(f) for f in metric_registry.FIELDS)]
+
+    with OpenpyxlSession(str(path), sheet_name, mode="write") as out:
+        out.append_rows(rows())
+    logger.info(f"[export] {day} {len(order)} 檔 → {path}")
+    return len(order)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    target = sys.argv[1]
+    when = sys.argv[2] if len(sys.argv) > 2 else None
+    db = sys.argv[3] if len(sys.argv) > 3 else ".cache/results.sqlite"
+    export_workbook(ResultsStore(db), target, when)
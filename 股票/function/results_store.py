@@ -0,0 +1,251 @@
+# results_store.py
+"""
+抓取結果的系統紀錄（system of record）：有型別、依日期分區的本機 SQLite，活頁簿只是它的一種輸出。
+
+資料表：
+    history    每 (code, date) 一列、每個指標一欄（型別依 metric_registry 的 dtype：REAL / 日期 TEXT）
+    realtime   每 (code, date) 一列的收盤即時報價（A:O 的數值欄）
+    columns    依日期分區的欄式資料：每 (指標, 日期) 一筆，整天所有代碼的值打包成 float64 陣列；
+               compact() 建立，metric() 讀取時一天只讀一個 BLOB
+索引：history / realtime 主鍵 (code, date)，另對 date 建索引。
+
+同時繼承 SnapshotStore：save() 也寫入當天快照，可直接當作 update_data_parallel 的 snapshots 使用。
+
+使用範例：
+    store = ResultsStore(".cache/results.sqlite")
+    update_data_parallel(xls, codes, snapshots=store)
+    store.compact()                                         # 今天的數值指標建成欄式分區
+    codes, dates, values = store.metric("市盈率", start="2025-01-01")   # values: dates × codes
+"""
+from __future__ import annotations
+
+import json
+import logging
+import re
+from datetime import date, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable
+
+from . import metric_registry
+from .snapshot_store import SnapshotStore
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 即時工作表 C:O 的欄位（A 日期、B 代碼另外存）
+REALTIME_COLUMNS = [
+    "名稱", "買價", "賣價", "成交價", "漲跌", "漲跌幅", "成交量",
+    "買量", "賣量", "總量", "最高", "最低", "開盤",
+]
+_REALTIME_TEXT = {"名稱"}
+
+_DATE = re.compile(r"^(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})")
+
+
+def to_real(value: Any) -> float | None:
+    """"12.5%" → 12.5、"1,234" → 1234.0；"-"、空白與無法解析者為 None。"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().replace(",", "").rstrip("%")
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def to_date(value: Any) -> str | None:
+    """"2023/06/14"、datetime → "2023-06-14"；無法解析的文字原樣保留，"-" 為 None。"""
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    text = str(value).strip()
+    if text in ("", "-"):
+        return None
+    m = _DATE.match(text)
+    if m:
+        y, mo, d = map(int, m.groups())
+        return f"{y:04d}-{mo:02d}-{d:02d}"
+    return text
+
+
+def _typed(field: str, value: Any) -> Any:
+    return to_date(value) if metric_registry.dtype_of(field) == "date" else to_real(value)
+
+
+def _q(name: str) -> str:
+    return f'"{name}"'
+
+
+class ResultsStore(SnapshotStore):
+    def __init__(self, path: str | Path = ".cache/results.sqlite") -> None:
+        super().__init__(path)
+        history_cols = ", ".join(
+            f"{_q(f)} {'TEXT' if metric_registry.dtype_of(f) == 'date' else 'REAL'}"
+            for f in metric_registry.FIELDS
+        )
+        realtime_cols = ", ".join(
+            f"{_q(c)} {'TEXT' if c in _REALTIME_TEXT else 'REAL'}" for c in REALTIME_COLUMNS
+        )
+        with self._lock:
+            self._db.executescript(
+                f"""
+                CREATE TABLE IF NOT EXISTS history (
+                    code TEXT NOT NULL, date TEXT NOT NULL, {history_cols},
+                    updated_at TEXT NOT NULL, PRIMARY KEY (code, date)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_history_date ON history(date);
+                CREATE TABLE IF NOT EXISTS realtime (
+                    code TEXT NOT NULL, date TEXT NOT NULL, {realtime_cols},
+                    updated_at TEXT NOT NULL, PRIMARY KEY (code, date)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_realtime_date ON realtime(date);
+                CREATE TABLE IF NOT EXISTS columns (
+                    field TEXT NOT NULL, date TEXT NOT NULL,
+                    codes TEXT NOT NULL,             -- JSON：代碼順序
+                    data  BLOB NOT NULL,             -- float64 陣列，NaN = 無資料
+                    PRIMARY KEY (field, date)
+                ) WITHOUT ROWID;
+                """
+            )
+            self._db.commit()
+
+    # ---------- 寫入 ----------
+    def save(self, stock: Any, day: date | None = None) -> None:
+        """快照（SnapshotStore）＋ history 表；只更新 stock.fields 的欄位，其他欄位保留。"""
+        super().save(stock, day)
+        day_s = (day or date.today()).isoformat()
+        fields = list(stock.fields or metric_registry.FIELDS)
+        cols = ", ".join(_q(f) for f in fields)
+        updates = ", ".join(f"{_q(f)} = excluded.{_q(f)}" for f in fields)
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self._db.execute(
+                f"INSERT INTO history (code, date, {cols}, updated_at) "
+                f"VALUES (?, ?, {', '.join('?' * len(fields))}, ?) "
+                f"ON CONFLICT (code, date) DO UPDATE SET {updates}, updated_at = excluded.updated_at",
+                (stock.code, day_s, *(_typed(f, getattr(stock, f)) for f in fields), now),
+            )
+            self._db.commit()
+
+    def save_realtime(self, rows: Iterable[tuple[str, Any, list]]) -> int:
+        """rows = [(code, 報價日期, C:O 的 13 個值)]；同一天重複寫入以最後一次為準。"""
+        now = datetime.now().isoformat(timespec="seconds")
+        params = [
+            (code, to_date(day), *(v if c in _REALTIME_TEXT else to_real(v)
+                                   for c, v in zip(REALTIME_COLUMNS, values)), now)
+            for code, day, values in rows
+        ]
+        with self._lock:
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO realtime VALUES ({', '.join('?' * (len(REALTIME_COLUMNS) + 3))})",
+                params,
+            )
+            self._db.commit()
+        return len(params)
+
+    def compact(self, day: date | str | None = None) -> int:
+        """把某天 history 的數值指標打包成欄式分區（每指標一個 BLOB），回傳分區數。"""
+        day_s = day if isinstance(day, str) else (day or date.today()).isoformat()
+        import numpy as np
+
+        fields = [f for f in metric_registry.FIELDS if metric_registry.dtype_of(f) == "real"]
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT code, {', '.join(_q(f) for f in fields)} FROM history WHERE date = ? ORDER BY code",
+                (day_s,),
+            ).fetchall()
+            if not rows:
+                return 0
+            codes = json.dumps([r[0] for r in rows])
+            matrix = np.array([r[1:] for r in rows], dtype=np.float64)   # None → NaN
+            self._db.executemany(
+                "INSERT OR REPLACE INTO columns VALUES (?, ?, ?, ?)",
+                [(f, day_s, codes, matrix[:, i].tobytes()) for i, f in enumerate(fields)],
+            )
+            self._db.commit()
+        logger.info(f"[results] {day_s} {len(rows)} 檔 × {len(fields)} 指標建立欄式分區")
+        return len(fields)
+
+    # ---------- 讀取 ----------
+    def metric(self,
+               field: str,
+               start: str | None = None,
+               end: str | None = None) -> tuple[list[str], list[str], np.ndarray]:
+        """
+        單一數值指標的 (代碼, 日期, 值矩陣[日期 × 代碼])，NaN 表示無資料。
+        有欄式分區的日期每天只讀一個 BLOB；尚未 compact 的日期由 history 表補上。
+        """
+        import numpy as np
+
+        if metric_registry.dtype_of(field) != "real":
+            raise ValueError(f"{field} 不是數值指標，請用 history()")
+        lo, hi = start or "0000-00-00", end or "9999-99-99"
+        with self._lock:
+            parts = self._db.execute(
+                "SELECT date, codes, data FROM columns WHERE field = ? AND date BETWEEN ? AND ? ORDER BY date",
+                (field, lo, hi),
+            ).fetchall()
+            packed = {d for d, _, _ in parts}
+            loose = [
+                r for r in self._db.execute(
+                    f"SELECT date, code, {_q(field)} FROM history WHERE date BETWEEN ? AND ?",
+                    (lo, hi),
+                ) if r[0] not in packed
+            ] if self._has_loose(lo, hi, len(packed)) else []
+
+        columns: dict[str, tuple[list[str], np.ndarray]] = {
+            d: (json.loads(c), np.frombuffer(blob, dtype=np.float64)) for d, c, blob in parts
+        }
+        for d, code, value in loose:
+            codes, values = columns.setdefault(d, ([], []))
+            codes.append(code)
+            values.append(np.nan if value is None else value)
+
+        dates = sorted(columns)
+        layouts = {json.dumps(c) for c, _ in columns.values()}
+        if len(layouts) == 1:                              # 每天代碼相同：直接堆疊
+            codes = next(iter(columns.values()))[0]
+            return list(codes), dates, np.vstack([np.asarray(columns[d][1], dtype=np.float64) for d in dates])
+
+        codes = sorted({c for cs, _ in columns.values() for c in cs})
+        index = {c: i for i, c in enumerate(codes)}
+        out = np.full((len(dates), len(codes)), np.nan)
+        for i, d in enumerate(dates):
+            cs, values = columns[d]
+            out[i, [index[c] for c in cs]] = values
+        return codes, dates, out
+
+    def _has_loose(self, lo: str, hi: str, packed: int) -> bool:
+        """已持有鎖時呼叫：區間內是否有尚未 compact 的日期。"""
+        days = self._db.execute(
+            "SELECT COUNT(DISTINCT date) FROM history WHERE date BETWEEN ? AND ?", (lo, hi)
+        ).fetchone()[0]
+        return days > packed
+
+    def history(self, day: date | str | None = None) -> dict[str, dict[str, Any]]:
+        """某天所有代碼的 {code: {指標: 值}}（值為型別化後的數值 / 日期字串 / None）。"""
+        day_s = day if isinstance(day, str) else (day or date.today()).isoformat()
+        with self._lock:
+            cur = self._db.execute(
+                f"SELECT code, {', '.join(_q(f) for f in metric_registry.FIELDS)} FROM history WHERE date = ?",
+                (day_s,),
+            )
+            return {r[0]: dict(zip(metric_registry.FIELDS, r[1:])) for r in cur}
+
+    def realtime(self, day: date | str | None = None) -> dict[str, dict[str, Any]]:
+        day_s = day if isinstance(day, str) else (day or date.today()).isoformat()
+        with self._lock:
+            cur = self._db.execute(
+                f"SELECT code, {', '.join(_q(c) for c in REALTIME_COLUMNS)} FROM realtime WHERE date = ?",
+                (day_s,),
+            )
+            return {r[0]: dict(zip(REALTIME_COLUMNS, r[1:])) for r in cur}
+
+    def dates(self) -> list[str]:
+        with self._lock:
+            return [r[0] for r in self._db.execute("SELECT DISTINCT date FROM history ORDER BY date")]
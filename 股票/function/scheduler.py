@@ -0,0 +1,153 @@
+# scheduler.py
+"""
+全域 (code, page) 工作排程器：取代「每支股票各開 14 條執行緒再 join」的做法。
+
+- 一條有界工作佇列，固定 max_workers 條執行緒消化所有股票的所有頁面
+- 同一頁面只抓一次，再依序交給用到它的 End 方法解析（例如 profile 給 NAVPS 與股息發放日）
+- 某支股票的最後一個頁面完成時才組成該列，交回呼叫端寫入；
+  慢的 Yahoo 現金流頁只拖住自己那一列，不會卡住其他股票
+- 佇列等待、每個解析方法的擷取時間與每檔總時間記入 instrumentation
+
+使用範例：
+    sched = CrawlScheduler(fetch_html, max_workers=24)
+    for stock in sched.run((End(code, row), is_etf) for ...):
+        session.range(f"P{stock.row}:AN{stock.row}").value = stock._build_row()
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator
+
+from . import instrumentation
+
+logger = logging.getLogger("crawler")
+
+_STOP = object()          # 工作佇列結束標記
+
+
+class _Job:
+    """單一股票的進度：剩餘頁面數歸零即完成。"""
+
+    def __init__(self, stock: Any, pages: int) -> None:
+        self.stock = stock
+        self.started = time.perf_counter()
+        self._pending = pages
+        self._lock = threading.Lock()
+
+    def finish_one(self) -> bool:
+        with self._lock:
+            self._pending -= 1
+            return self._pending == 0
+
+
+class _FeedDone:
+    """餵料執行緒送完所有工作後放進完成佇列，告知總股票數。"""
+
+    def __init__(self, total: int) -> None:
+        self.total = total
+
+
+class CrawlScheduler:
+    """
+    Parameters
+    ----------
+    fetch : Callable[[str, str], BeautifulSoup]
+        抓取＋解析單一頁面的函式 fetch(url, page)（通常是 stock_end.fetch_html）。
+    max_workers : int
+        全域工作執行緒數；整個 run 期間只建立這麼多條執行緒。
+    queue_size : int | None
+        工作佇列上限；預設 max_workers * 4，避免一次把數千個工作全部排進記憶體。
+    """
+
+    def __init__(self,
+                 fetch: Callable[[str, str], Any],
+                 max_workers: int = 24,
+                 queue_size: int | None = None) -> None:
+        self._fetch = fetch
+        self.max_workers = max_workers
+        self._tasks: queue.Queue = queue.Queue(maxsize=queue_size or max_workers * 4)
+        self._done: queue.Queue = queue.Queue()
+
+    # ---------- 內部 ----------
+    def _feed(self, stocks: Iterable[tuple[Any, bool | None]]) -> None:
+        total = 0
+        try:
+            for stock, is_etf in stocks:
+                if is_etf is None:                   # 設定檔沒指定才查 API
+                    is_etf = stock._is_etf(stock.code)
+                by_page: dict[str, list[str]] = {}
+                for page, method in stock.plan(is_etf):
+                    by_page.setdefault(page, []).append(method)
+
+                total += 1
+                if not by_page:                      # 選到的欄位都不適用此資產 → 直接完成
+                    self._done.put(stock)
+                    continue
+                job = _Job(stock, len(by_page))
+                for page, methods in by_page.items():
+                    self._tasks.put((job, page, methods, time.perf_counter()))   # 佇列滿時在此等待
+        except Exception:  # noqa: BLE001
+            logger.exception("排程餵料失敗，只處理已排入的股票")
+        finally:
+            for _ in range(self.max_workers):
+                self._tasks.put(_STOP)
+            self._done.put(_FeedDone(total))
+
+    def _work(self) -> None:
+        metrics = instrumentation.get_metrics()
+        while (task := self._tasks.get()) is not _STOP:
+            job, page, methods, queued = task
+            stock = job.stock
+            t0 = time.perf_counter()
+            metrics.queue_wait("thread", t0 - queued)
+            try:
+                soup = self._fetch(stock.url(page), page)
+            except Exception as exc:  # noqa: BLE001 — 單頁失敗，相關欄位維持 "-" 並記為失敗
+                stock._log(f"[警告] {stock.code} {page} 抓取失敗：{exc}")
+                for method in methods:
+                    stock.mark_failed(method)
+            else:
+                page_seconds = time.perf_counter() - t0          # 抓取（含重試）＋解析
+                for method in methods:
+                    t1 = time.perf_counter()
+                    try:
+                        getattr(stock, method)(soup)
+                    except Exception as exc:  # noqa: BLE001
+                        stock._log(f"[警告] {stock.code} {method} 解析失敗：{exc!r}")
+                        stock.mark_failed(method)
+                    metrics.extract(method, time.perf_counter() - t1, page_seconds)
+            if job.finish_one():
+                metrics.stock("thread", stock.code, time.perf_counter() - job.started)
+                stock._flush_log()
+                self._done.put(stock)
+
+    # ---------- 對外 ----------
+    def run(self, stocks: Iterable[tuple[Any, bool | None]]) -> Iterator[Any]:
+        """
+        排程所有 (End, is_etf)，依完成順序逐一 yield 已填好欄位的 End。
+        is_etf 為 None 時由餵料執行緒呼叫 End._is_etf 判斷。
+        """
+        workers = [
+            threading.Thread(target=self._work, name=f"crawl-{i}", daemon=True)
+            for i in range(self.max_workers)
+        ]
+        for w in workers:
+            w.start()
+        feeder = threading.Thread(target=self._feed, args=(stocks,), name="crawl-feed", daemon=True)
+        feeder.start()
+
+        received, total = 0, None
+        while total is None or received < total:
+            item = self._done.get()
+            if isinstance(item, _FeedDone):
+                total = item.total
+                continue
+            received += 1
+            yield item
+
+        feeder.join()
+        for w in workers:
+            w.join()
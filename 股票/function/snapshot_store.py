@@ -0,0 +1,113 @@
+# snapshot_store.py
+"""
+歷史資料抓取的檢查點：每完成一支股票就立刻寫入本機 SQLite，key 為 (code, 日期)。
+
+- 中途失敗（某列例外、Excel 忙碌、Ctrl+C）時已完成的股票不會遺失
+- resume 模式：今天已抓過的代碼直接略過，並把存下的值一次整塊寫回工作表；
+  只檢查對該代碼適用（個股 / ETF）的欄位，頁面抓取或解析失敗的欄位（End.failed）不算完成、
+  續跑時會重抓；值本來就是 "-"（例如沒有配股）的欄位算完成
+- 同一天多次寫入會合併欄位（增量模式 / columns 只抓部分欄位時）
+
+使用範例：
+    store = SnapshotStore(".cache/snapshots.sqlite")
+    update_data_parallel(xls, codes, snapshots=store, resume=True)
+"""
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Iterable
+
+from . import metric_registry
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotStore:
+    def __init__(self, path: str | Path = ".cache/snapshots.sqlite") -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS snapshots (
+                code     TEXT NOT NULL,
+                date     TEXT NOT NULL,
+                "values" TEXT NOT NULL,          -- JSON：{欄位: 值}
+                failed   TEXT NOT NULL,          -- JSON：抓取 / 解析失敗的欄位
+                is_etf   INTEGER,                -- 抓取時的資產別；NULL = 未知
+                saved_at TEXT NOT NULL,
+                PRIMARY KEY (code, date)
+            )"""
+        )
+        self._db.commit()
+
+    def save(self, stock: Any, day: date | None = None) -> None:
+        """
+        寫入（並與當天既有資料合併）stock.fields 的值、失敗欄位（stock.failed）與資產別；
+        這次重抓成功的欄位從失敗清單移除。每次呼叫都立即 commit。
+        """
+        day_s = (day or date.today()).isoformat()
+        values = {f: getattr(stock, f) for f in stock.fields or metric_registry.FIELDS}
+        with self._lock:
+            row = self._db.execute(
+                'SELECT "values", failed, is_etf FROM snapshots WHERE code = ? AND date = ?',
+                (stock.code, day_s),
+            ).fetchone()
+            if row:
+                merged = {**json.loads(row[0]), **values}
+                failed = (set(json.loads(row[1])) - set(values)) | stock.failed
+                is_etf = row[2] if stock.is_etf is None else stock.is_etf
+            else:
+                merged, failed, is_etf = values, set(stock.failed), stock.is_etf
+            self._db.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?)",
+                (stock.code, day_s, json.dumps(merged, ensure_ascii=False),
+                 json.dumps(sorted(failed), ensure_ascii=False), is_etf,
+                 datetime.now().isoformat(timespec="seconds")),
+            )
+            self._db.commit()
+
+    def _rows(self, day: date | None) -> list[tuple[str, str, str, int | None]]:
+        day_s = (day or date.today()).isoformat()
+        with self._lock:
+            return self._db.execute(
+                'SELECT code, "values", failed, is_etf FROM snapshots WHERE date = ?', (day_s,)
+            ).fetchall()
+
+    def load(self, day: date | None = None) -> dict[str, dict[str, Any]]:
+        """某一天所有股票的 {code: {欄位: 值}}。"""
+        return {code: json.loads(values) for code, values, _, _ in self._rows(day)}
+
+    def done(self,
+             codes: Iterable[str] | dict[str, bool | None],
+             fields: list[str],
+             day: date | None = None) -> set[str]:
+        """
+        今天已完成的代碼：fields 中對該代碼適用的欄位都已存下、且沒有一個失敗。
+        codes 為 dict 時以設定檔的 ETF 旗標判斷適用欄位，否則用抓取時存下的資產別；都不知道時視為未完成。
+        """
+        flags = codes if isinstance(codes, dict) else {}
+        stored = {code: (json.loads(values), set(json.loads(failed)), is_etf)
+                  for code, values, failed, is_etf in self._rows(day)}
+        done: set[str] = set()
+        for code in codes:
+            if code not in stored:
+                continue
+            values, failed, is_etf = stored[code]
+            flag = flags.get(code)
+            if flag is None and is_etf is not None:
+                flag = bool(is_etf)
+            if flag is None:
+                continue
+            if all(f in values and f not in failed for f in metric_registry.applicable(fields, flag)):
+                done.add(code)
+        return done
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
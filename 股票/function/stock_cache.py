@@ -1,25 +1,15 @@
 import json
-import requests
-import twstock
+import logging
+
+from . import code_table, etf_classifier
+
+logger = logging.getLogger(__name__)
 
 SETTING_FILE = "setting.json"
 
 def is_etf(symbol: str) -> bool | None:
-    """利用 Yahoo Finance Search API 判斷代碼是否為 ETF。"""
-    HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; StockScraper/1.0)"}
-    url = f"https://query2.finance.yahoo.com/v1/finance/search?q={symbol}.tw"
-    try:
-        resp = requests.get(url, headers=HEADERS, timeout=5)
-        if resp.status_code != 200:
-            raise RuntimeError(f"HTTP {resp.status_code}")
-        data = resp.json()
-        for quote in data.get("quotes", []):
-            if quote.get("typeDisp", "").split(".")[0] == "ETF":
-                return quote.get("quoteType") == "ETF"
-    except Exception as exc:
-        print(f"[WARN] is_etf({symbol}) API error: {exc}")
-        return 
-    return False
+    """判斷代碼是否為 ETF（代碼表 → 已存結果 → Yahoo API，見 etf_classifier）；None = 無法判斷。"""
+    return etf_classifier.classify(symbol)
 
 def load_setting():
     """讀取 setting.json"""
@@ -33,21 +23,23 @@ def save_setting(setting: dict):
 
 def update_code_section(symbols: list[str]):
     """只更新 setting.json 裡的 code 欄位"""
-    # 先更新 twstock 的股票代碼清單
-    twstock.__update_codes()
+    # 本機代碼表過期才在背景更新（不再每次都重新下載整份 twstock 代碼清單）
+    code_table.get_table().refresh_if_stale()
     setting = load_setting()
     # 若沒有 code 欄位則新增一個空 dict
     code_cache = setting.get("code", {})
 
-    # 產生新 code 快取，只保留當前 symbols 清單
+    # 產生新 code 快取，只保留當前 symbols 清單；之前判斷不出來（None）的也重新判斷
+    missing = [s for s in symbols if code_cache.get(s) is None]
+    fetched = etf_classifier.classify_many(missing)
     new_code = {}
     for symbol in symbols:
-        if symbol in code_cache:
-            result = code_cache[symbol]
-            print(f"{symbol} is ETF (cached): {result}")
+        if symbol in fetched:
+            result = fetched[symbol]
+            logger.debug(f"{symbol} is ETF (fetched): {result}")   # 彙總見 etf_classifier.log_summary
         else:
-            result = is_etf(symbol)
-            print(f"{symbol} is ETF (fetched): {result}")
+            result = code_cache[symbol]
+            logger.debug(f"{symbol} is ETF (cached): {result}")
         new_code[symbol] = result
 
     # 移除快取裡多餘的股票
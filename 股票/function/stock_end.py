@@ -1,34 +1,64 @@
-import requests
-from bs4 import BeautifulSoup
-from bs4.element import Tag
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from __future__ import annotations
+
 import threading
 import time
 import logging
+from typing import TYPE_CHECKING, Iterator
+from urllib.parse import urlsplit
 
 
-from .excel_utils import ExcelSession 
+from .excel_utils import ExcelSession, SheetMirror, column_letter
 from .settings_loader import load_codes
+from . import etf_classifier, http_client, http_cache, instrumentation, rate_limiter
+from .scheduler import CrawlScheduler
+from . import metric_registry
+from .freshness import FreshnessStore
+from .snapshot_store import SnapshotStore
+from .market_tables import MarketTables
+
+if TYPE_CHECKING:                       # bs4 在第一次解析時才匯入（見 parse_html）
+    from bs4 import BeautifulSoup
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s]  %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    handlers=[logging.StreamHandler()],
-)
 logger = logging.getLogger("crawler")
 
+
+def _is_tag(obj: object) -> bool:
+    from bs4.element import Tag
+    return isinstance(obj, Tag)
+
 #=============================================================
 class End:
+    # 頁面代號 → URL 樣板；所有抓取路徑（執行緒 / asyncio）共用
+    PAGE_URLS: dict[str, str] = {
+        "quote":          "https://tw.stock.yahoo.com/quote/{code}",
+        "profile":        "https://tw.stock.yahoo.com/quote/{code}/profile",
+        "cash-flow":      "https://tw.stock.yahoo.com/quote/{code}/cash-flow-statement",
+        "本益比":         "https://histock.tw/stock/{code}/%E6%9C%AC%E7%9B%8A%E6%AF%94",
+        "股價淨值比":     "https://histock.tw/stock/{code}/%E8%82%A1%E5%83%B9%E6%B7%A8%E5%80%BC%E6%AF%94",
+        "除權除息":       "https://histock.tw/stock/{code}/%E9%99%A4%E6%AC%8A%E9%99%A4%E6%81%AF",
+        "報酬率":         "https://histock.tw/stock/{code}/%E5%A0%B1%E9%85%AC%E7%8E%87",
+        "利潤比率":       "https://histock.tw/stock/{code}/%E5%88%A9%E6%BD%A4%E6%AF%94%E7%8E%87",
+        "流速動比率":     "https://histock.tw/stock/{code}/%E6%B5%81%E9%80%9F%E5%8B%95%E6%AF%94%E7%8E%87",
+        "負債佔資產比":   "https://histock.tw/stock/{code}/%E8%B2%A0%E5%82%B5%E4%BD%94%E8%B3%87%E7%94%A2%E6%AF%94",
+        "利息保障倍數":   "https://histock.tw/stock/{code}/%E5%88%A9%E6%81%AF%E4%BF%9D%E9%9A%9C%E5%80%8D%E6%95%B8",
+        "營運週轉天數":   "https://histock.tw/stock/{code}/%E7%87%9F%E9%81%8B%E9%80%B1%E8%BD%89%E5%A4%A9%E6%95%B8",
+        "盈餘再投資比率": "https://histock.tw/stock/{code}/%E7%9B%88%E9%A4%98%E5%86%8D%E6%8A%95%E8%B3%87%E6%AF%94%E7%8E%87",
+    }
+
     def __init__(
             self, 
             code: str, 
             row: int, 
-            is_etf_flag: bool | None = None
+            is_etf_flag: bool | None = None,
+            fields: list[str] | None = None,
             ) -> None:
         self.code=code
         self.row=row
         self._is_etf_flag = is_etf_flag  # ★ 儲存外部傳入的布林值 (True/False/None)
+        self.is_etf = is_etf_flag         # 實際抓取時的判斷結果（plan() 時確定；快照據此判斷適用欄位）
+        self.fields = fields              # 只抓這些欄位；None = metric_registry.FIELDS 全部
+        self.bulk: dict[str, str] = {}    # 由 MarketTables 整批填入的欄位，不再逐檔抓取
+        self.failed: set[str] = set()     # 頁面抓取或解析失敗的欄位（與「值本來就是 "-"」區分）
         self.current_code=""
         # 初始化所有屬性
         self.昨收 = "-"
@@ -60,6 +90,29 @@ class End:
         self._buf: list[str] = []
         self._buf_lock = threading.Lock()
             
+    def url(self, page: str) -> str:
+        """頁面代號 → 本股票的完整 URL。"""
+        return self.PAGE_URLS[page].format(code=self.code)
+
+    def page(self, page: str) -> BeautifulSoup:
+        """抓取並解析本股票的某一頁（只建出該頁解析所需的元素）。"""
+        return fetch_html(self.url(page), page)
+
+    def plan(self, is_etf: bool) -> list[tuple[str, str]]:
+        """本股票要抓的 (頁面代號, 解析方法)，由 metric_registry 依 self.fields 算出。"""
+        self.is_etf = is_etf
+        if not self.bulk:
+            return metric_registry.plan(is_etf, self.fields)
+        fields = [f for f in self.fields or metric_registry.FIELDS if f not in self.bulk]
+        return metric_registry.plan(is_etf, fields)
+
+    def mark_failed(self, method: str) -> None:
+        """method 的頁面抓取失敗或解析擲出例外：其欄位記為失敗，新鮮度不記錄、快照不算完成。"""
+        wanted = self.fields or metric_registry.FIELDS
+        with self._buf_lock:
+            self.failed.update(f for f in metric_registry.fields_of(method)
+                               if f in wanted and f not in self.bulk)
+
     #info 訊息功能
     def _log(self, msg: str) -> None:
         """把訊息暫存到本股票的 buffer；採用 f-string。"""
@@ -76,6 +129,8 @@ class End:
 
     #資料
     def yesterday_close(self,soup:BeautifulSoup) -> None:
+        #获取股票代码
+        self.current_code = soup.find_all("title")
         li_elements = soup.select("li.price-detail-item")
         for li in li_elements:
             # 如果 li 元素的文本包含 "昨收"
@@ -101,7 +156,7 @@ class End:
         elements =soup.find_all("div",class_="table-grid Mb(20px) row-fit-half")
 
         second_element=elements[0]
-        if not isinstance(second_element, Tag):
+        if not _is_tag(second_element):
             return
         desired_elements=second_element.find_all("div",class_="Py(8px) Pstart(12px) Bxz(bb)")
         self.股息發放日=desired_elements[-1].text
@@ -112,7 +167,7 @@ class End:
     def 股息發放日_person(self,soup: BeautifulSoup) -> None:
         elements =soup.find_all("div",class_="table-grid Mb(20px) row-fit-half", attrs={"style": True})
         second_element=elements[1]
-        if not isinstance(second_element, Tag):
+        if not _is_tag(second_element):
             return
         find= second_element.find_all("div",class_="Py(8px) Pstart(12px) Bxz(bb)")
         self.股息發放日=find[-1].text
@@ -120,12 +175,12 @@ class End:
         
 
     #市盈率(PE)
-    def get_PE(self):
+    def get_PE(self, soup: BeautifulSoup | None = None) -> None:
         # 定义获取市盈率的函数
-        url = f"https://histock.tw/stock/{self.code}/%E6%9C%AC%E7%9B%8A%E6%AF%94"
 
         # 获取网页内容
-        soup = fetch_html(url)
+        if soup is None:
+            soup = self.page("本益比")
         # 查找包含市盈率的span元素
         span_elements = soup.find("td", attrs={"style": True})
         # 如果没有找到span元素，则返回
@@ -138,12 +193,12 @@ class End:
         
 
     #市淨率
-    def get_PB(self):
+    def get_PB(self, soup: BeautifulSoup | None = None) -> None:
         # 获取市净率
-        url = f"https://histock.tw/stock/{self.code}/%E8%82%A1%E5%83%B9%E6%B7%A8%E5%80%BC%E6%AF%94"
         
         # 获取网页内容
-        soup = fetch_html(url)
+        if soup is None:
+            soup = self.page("股價淨值比")
         # 查找包含市净率的span元素
         span_elements = soup.find("td", attrs={"style": True})
         # 如果没有找到span元素，则返回
@@ -155,11 +210,10 @@ class End:
         self._log(f"{self.code} 市淨率:{span_elements.text}")
         
 
-    def 財務報表(self):
-        #获取财务报表的url
-        url = f"https://histock.tw/stock/{self.code}/%E9%99%A4%E6%AC%8A%E9%99%A4%E6%81%AF"
+    def 財務報表(self, soup: BeautifulSoup | None = None) -> None:
         #获取网页内容
-        soup = fetch_html(url)
+        if soup is None:
+            soup = self.page("除權除息")
 
         #获取网页中的所有td元素
         elements = soup.find_all("td")
@@ -200,18 +254,18 @@ class End:
         self._log(f'{self.code} EPS:{elements[7].text}')
 
         #現金殖利率(殖利率)
-        #如果現金殖利率不为空，则赋值给self.殖利率
-        if elements[9].text!="":
+        #如果現金殖利率不为空（且未由整批表填入），则赋值给self.殖利率
+        if elements[9].text!="" and "殖利率" not in self.bulk:
             self.殖利率=elements[9].text
         #打印現金殖利率(殖利率)
         self._log(f'{self.code} 現金殖利率:{elements[9].text}')
         
 
-    def 杜邦分析(self):
+    def 杜邦分析(self, soup: BeautifulSoup | None = None) -> None:
         # 获取杜邦分析页面URL
-        url = f"https://histock.tw/stock/{self.code}/%E5%A0%B1%E9%85%AC%E7%8E%87"
         # 获取页面内容
-        soup = fetch_html(url)
+        if soup is None:
+            soup = self.page("報酬率")
 
         # 获取页面中的所有td元素
         elements = soup.find_all("td")
@@ -229,7 +283,7 @@ class End:
     #每股淨值
     def NAVPS(self,soup:BeautifulSoup) -> None:
         elements =soup.find("div",class_="table-grid Mb(20px) row-fit-half", attrs={"style": True})
-        if not isinstance(elements, Tag):
+        if not _is_tag(elements):
             return
         second_element=elements.find_all("div",class_="Py(8px) Pstart(12px) Bxz(bb)")
         if second_element is []:
@@ -240,10 +294,10 @@ class End:
         
         
 
-    def 三率(self):
+    def 三率(self, soup: BeautifulSoup | None = None) -> None:
         #获取毛利率、營益率、稅後淨利率
-        url = f"https://histock.tw/stock/{self.code}/%E5%88%A9%E6%BD%A4%E6%AF%94%E7%8E%87"
-        soup = fetch_html(url)
+        if soup is None:
+            soup = self.page("利潤比率")
 
         elements = soup.find_all("td")
         if elements is []:
@@ -260,9 +314,9 @@ class End:
         self._log(f"{self.code} 淨利率:{elements[4].text}")
         
 
-    def 流速動比率(self):
-        url = f"https://histock.tw/stock/{self.code}/%E6%B5%81%E9%80%9F%E5%8B%95%E6%AF%94%E7%8E%87"
-        soup = fetch_html(url)
+    def 流速動比率(self, soup: BeautifulSoup | None = None) -> None:
+        if soup is None:
+            soup = self.page("流速動比率")
 
         elements = soup.find_all("td")
         if elements is []:
@@ -275,9 +329,9 @@ class End:
         self._log(f"{self.code} 速動比:{elements[2].text}")
         
 
-    def 負債比(self):
-        url = f"https://histock.tw/stock/{self.code}/%E8%B2%A0%E5%82%B5%E4%BD%94%E8%B3%87%E7%94%A2%E6%AF%94"
-        soup = fetch_html(url)
+    def 負債比(self, soup: BeautifulSoup | None = None) -> None:
+        if soup is None:
+            soup = self.page("負債佔資產比")
 
         elements = soup.find_all("td")
         #負債比
@@ -285,9 +339,9 @@ class End:
         self._log(f"{self.code} 負債比:{elements[1].text}")
         
 
-    def get_利息保障倍數(self):
-        url = f"https://histock.tw/stock/{self.code}/%E5%88%A9%E6%81%AF%E4%BF%9D%E9%9A%9C%E5%80%8D%E6%95%B8"
-        soup = fetch_html(url)
+    def get_利息保障倍數(self, soup: BeautifulSoup | None = None) -> None:
+        if soup is None:
+            soup = self.page("利息保障倍數")
 
         elements = soup.find_all("td")
         if elements is None:
@@ -297,9 +351,9 @@ class End:
         self._log(f"{self.code} 利息保障倍數:{elements[1].text}")
         
 
-    def 營運週轉天數(self):
-        url = f"https://histock.tw/stock/{self.code}/%E7%87%9F%E9%81%8B%E9%80%B1%E8%BD%89%E5%A4%A9%E6%95%B8"
-        soup = fetch_html(url)
+    def 營運週轉天數(self, soup: BeautifulSoup | None = None) -> None:
+        if soup is None:
+            soup = self.page("營運週轉天數")
 
         elements = soup.find_all("td")
         if elements is []:
@@ -312,9 +366,9 @@ class End:
         self._log(f"{self.code} 存貨週轉天數:{elements[2].text}")
         
 
-    def get_盈餘再投資比(self):
-        url = f"https://histock.tw/stock/{self.code}/%E7%9B%88%E9%A4%98%E5%86%8D%E6%8A%95%E8%B3%87%E6%AF%94%E7%8E%87"
-        soup = fetch_html(url)
+    def get_盈餘再投資比(self, soup: BeautifulSoup | None = None) -> None:
+        if soup is None:
+            soup = self.page("盈餘再投資比率")
 
         elements = soup.find_all("td")
         if elements is None:
@@ -323,14 +377,14 @@ class End:
         self.盈餘再投資比=elements[1].text
         self._log(f"{self.code} 盈餘再投資比:{elements[1].text}")
 
-    def get_現金流(self):
-        url = f"https://tw.stock.yahoo.com/quote/{self.code}/cash-flow-statement"
-        soup = fetch_html(url)
+    def get_現金流(self, soup: BeautifulSoup | None = None) -> None:
+        if soup is None:
+            soup = self.page("cash-flow")
 
         li = soup.find_all("li",class_="List(n)")[3]
         if li is None:
             return 
-        if not isinstance(li, Tag):
+        if not _is_tag(li):
             return 
         elements=li.find_all("span")
         self.現金流=elements[1].text
@@ -338,130 +392,98 @@ class End:
         self._log(f"{self.code} 現金流:{elements[1].text}")
 
     def _is_etf(self,symbol: str) -> bool:
-        """利用 Yahoo Finance Search API 判斷代碼是否為 ETF。
-
-        API: https://query2.finance.yahoo.com/v1/finance/search?q=<symbol>
-        若找不到 API 或 JSON 解析失敗，返回 False（視為個股），並打印警告。
-        """
-        HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; StockScraper/1.0)"}
-        url = f"https://query2.finance.yahoo.com/v1/finance/search?q={symbol}.tw"
-        try:
-            resp = requests.get(url, headers=HEADERS,timeout=5)
-            if resp.status_code != 200:
-                raise RuntimeError(f"HTTP {resp.status_code}")
-            data = resp.json()
-            for quote in data.get("quotes", []):
-                #logger.info(quote)
-                # 台股符號通常返回形如 "0050.TW"，先取前段比對
-                if quote.get("typeDisp", "").split(".")[0] == "ETF":
-                    return quote.get("quoteType") == "ETF"
-        except Exception as exc:  # noqa: BLE001
-            logger.warning(f"[WARN] is_etf({symbol}) API error: {exc}")
-        return False
+        """判斷代碼是否為 ETF（見 etf_classifier）；無法判斷時視為個股（False）。"""
+        return bool(etf_classifier.classify(symbol))
 
     
 
 
     #判斷
     def judge(self):
-        base_url = f"https://tw.stock.yahoo.com/quote/{self.code}"
-        profile_url = f"{base_url}/profile"
-
-        yahoo_soup   = fetch_html(base_url)
-        profile_soup = fetch_html(profile_url)
-        #获取股票代码
-        self.current_code = yahoo_soup.find_all("title")
-        #logger.info(f"\n {self.current_code}")
-
-
+        """單獨抓一支股票；批次請用 update_data_parallel 共用全域排程器。"""
         #判斷是否為ETF
         if self._is_etf_flag is not None:          # 外部已指定 True/False
             is_etf_result = self._is_etf_flag
         else:                                      # 否則 fallback 用 API 判斷
             is_etf_result = self._is_etf(self.code)
 
-        if is_etf_result:
-            self._handle_etf(profile_soup, yahoo_soup)
-        else:
-            self._handle_stock(profile_soup, yahoo_soup)
-
-    def _handle_etf(self, profile_soup: BeautifulSoup, yahoo_soup: BeautifulSoup):
-        threads=[]
-        threads.append(threading.Thread(target=self.ManagementFee, args=(profile_soup,)))
-        threads.append(threading.Thread(target=self.股息發放日_ETF, args=(profile_soup,)))
-        threads.append(threading.Thread(target=self.財務報表))
-        threads.append(threading.Thread(target=self.yesterday_close, args=(yahoo_soup,)))
-        for thread in threads:
-            thread.start()
-        for thread in threads:
-            thread.join()
-        self._flush_log()     
-
-
-    def _handle_stock(self, profile_soup: BeautifulSoup, yahoo_soup: BeautifulSoup):
-        threads=[]
-        threads.append(threading.Thread(target=self.get_PE))
-        threads.append(threading.Thread(target=self.get_PB))
-        threads.append(threading.Thread(target=self.杜邦分析))
-        threads.append(threading.Thread(target=self.NAVPS,args=(profile_soup,)))
-        threads.append(threading.Thread(target=self.三率))
-        threads.append(threading.Thread(target=self.流速動比率))
-        threads.append(threading.Thread(target=self.負債比))
-        threads.append(threading.Thread(target=self.營運週轉天數))
-        threads.append(threading.Thread(target=self.get_利息保障倍數))
-        threads.append(threading.Thread(target=self.get_盈餘再投資比))
-        threads.append(threading.Thread(target=self.yesterday_close,args=(yahoo_soup,)))
-        threads.append(threading.Thread(target=self.股息發放日_person,args=(profile_soup,)))
-        threads.append(threading.Thread(target=self.get_現金流))
-        threads.append(threading.Thread(target=self.財務報表))
-        for thread in threads:
-            thread.start()
-        for thread in threads:
-            thread.join()
-        self._flush_log() 
-
-        #---------------------------------------
-        
+        pages = {page for page, _ in self.plan(is_etf_result)}
+        for _ in CrawlScheduler(fetch_html, max_workers=len(pages)).run([(self, is_etf_result)]):
+            pass
+
+    #---------------------------------------
+
     def _build_row(self) -> list:
-        """把所有欄位整理成 list；不做任何 I/O。"""
-        return [
-            self.昨收 ,
-            self.市盈率 ,
-            self.市淨率,
-            self.ROE ,
-            self.資產報酬率 ,
-            self.毛利率 ,
-            self.營益率 ,
-            self.稅後淨利率 ,
-            self.每股淨值 ,
-            self.盈餘 ,
-            self.流動比率 ,
-            self.速動比率 ,
-            self.負債比率 ,
-            self.利息保障倍數 ,
-            self.應收帳款收現天數 ,
-            self.存貨週轉天數 ,
-            self.現金股利 ,
-            self.股票股利 ,
-            self.殖利率 ,
-            self.除息日 ,
-            self.股息發放日 ,
-            self.除權日 ,
-            self.盈餘再投資比 ,
-            self.現金流,
-            self.管理費 ,
-        ]
+        """把所有欄位整理成 list（順序同 metric_registry.FIELDS）；不做任何 I/O。"""
+        return [getattr(self, field) for field in metric_registry.FIELDS]
+
+# ──────────────────────────────
+# 解析後端
+# ──────────────────────────────
+# 頁面代號 → 只需要建出的元素；End 的解析方法只會用到這些節點
+#   histock 表格頁：所有 <td>（find / find_all("td") 取第 n 格）
+#   yahoo quote / cash-flow：<li>（昨收、現金流清單）；profile：<div>
+PAGE_ONLY: dict[str, list[str]] = {
+    "quote":     ["li", "title"],
+    "cash-flow": ["li"],
+    "profile":   ["div"],
+    **{page: ["td"] for page in End.PAGE_URLS if page not in ("quote", "profile", "cash-flow")},
+}
+
+_parser = {"backend": "lxml", "strain": True}
+
+
+def configure_parser(backend: str = "lxml", strain: bool = True) -> None:
+    """
+    設定解析後端（通常由 read.run 依 setting.json 的 "parser" 區塊呼叫）。
+
+    backend : "lxml"（C 實作，預設）或 "html.parser"（純 Python，最慢但不需套件）
+    strain  : True 時依 PAGE_ONLY 只建出需要的元素（SoupStrainer）
+    """
+    if backend == "lxml":
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            logger.warning("未安裝 lxml，解析改用 html.parser")
+            backend = "html.parser"
+    _parser.update(backend=backend, strain=strain)
+
+
+def parse_html(content: bytes | str, page: str | None = None) -> BeautifulSoup:
+    """
+    所有抓取路徑共用的 HTML 解析入口。
+
+    傳入 resp.content（bytes）時直接以 UTF-8 解碼，略過 requests 的字元集偵測；
+    指定 page 時只解析 PAGE_ONLY 列出的元素。
+    """
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    only = PAGE_ONLY.get(page) if page and _parser["strain"] else None
+    t0 = time.perf_counter()
+    soup = BeautifulSoup(
+        content,
+        _parser["backend"],
+        parse_only=SoupStrainer(only) if only else None,
+        from_encoding="utf-8" if isinstance(content, bytes) else None,
+    )
+    instrumentation.get_metrics().parse(page, time.perf_counter() - t0)
+    return soup
+
 
 #連接url如果狀態!=200就重抓一次
-def fetch_html(url: str) -> BeautifulSoup:
+def fetch_html(url: str, page: str | None = None) -> BeautifulSoup:
     """
     共用抓取＋重試邏輯，失敗時擲回例外。
 
     该函数用于从指定的URL抓取HTML内容，并使用BeautifulSoup解析。如果请求失败，会尝试重试3次。
+    所有请求共用 http_client 的 keep-alive 连线池，不再每页重新建立连线。
+    请求速度由 rate_limiter 按 host 自动调节；重试前按指数退避等待（并遵守 Retry-After）。
+    未过期的页面直接由 http_cache 返回，过期时以 ETag / Last-Modified 条件式重新验证。
     如果3次请求都失败，则抛出运行时异常。
 
     参数:
     url (str): 要抓取的网页的URL。
+    page (str | None): End.PAGE_URLS 的页面代号；指定时只解析该页需要的元素。
 
     返回:
     BeautifulSoup: 解析后的HTML内容。
@@ -469,46 +491,157 @@ def fetch_html(url: str) -> BeautifulSoup:
     抛出:
     RuntimeError: 如果3次请求都失败，抛出运行时异常，包含HTTP状态码和URL信息。
     """
-    for _ in range(3):  # 尝试3次
-        resp = requests.get(url, timeout=5)  # 发送GET请求，设置超时时间为5秒
+    host = urlsplit(url).hostname or ""
+    metrics = instrumentation.get_metrics()  # 每次请求的耗时 / 大小 / 状态码 / 重试
+    for attempt in range(3):  # 尝试3次
+        if attempt:
+            metrics.retry(host, page)
+        t0 = time.perf_counter()
+        try:
+            resp = http_cache.get(url, timeout=5)  # 先查快取，再经共用连线池发送GET请求，超时5秒
+        except Exception:
+            metrics.fetch_error(host, page)
+            raise
+        metrics.request(host, page, time.perf_counter() - t0, len(resp.content), resp.status_code,
+                        getattr(resp, "from_cache", False))
         if resp.status_code == 200:  # 如果状态码为200，表示请求成功
-            return BeautifulSoup(resp.text, "html.parser")  # 返回BeautifulSoup对象
-        time.sleep(1)  # 如果请求失败，等待1秒后重试
+            return parse_html(resp.content, page)  # 返回BeautifulSoup对象
+        time.sleep(rate_limiter.retry_delay(host, attempt))  # 如果请求失败，退避后重试
+    metrics.fetch_error(host, page)
     raise RuntimeError(f"HTTP {resp.status_code}: {url}")  # 如果3次请求都失败，抛出异常
         
     
-def fetch_one(code: str, row: int) -> tuple[int, list]:
-    stock = End(code, row)
+FLUSH_ROWS = 20          # 每完成幾支股票把鏡像的變動寫回工作表一次
+
+
+def history_mirror(session: ExcelSession, codes: list[str] | dict[str, bool]) -> SheetMirror:
+    """P2:AN{最後一列} 讀成 SheetMirror（每支股票一列，row 從 2 起算）。"""
+    last = column_letter(metric_registry.FIRST_COLUMN + len(metric_registry.FIELDS) - 1)
+    return session.mirror(f"P2:{last}{len(codes) + 1}")
+
+
+def write_row(mirror: SheetMirror, stock: End, fields: list[str]) -> None:
+    """只把 fields 對應的欄位寫進鏡像；實際寫回由 mirror.flush() 合併處理。"""
+    row = stock.row
+    for start, _end, run in metric_registry.column_runs(fields):
+        mirror.set_row(row, start, [getattr(stock, f) for f in run])
+
+
+def iter_stocks(codes: list[str] | dict[str, bool],
+                fields: list[str],
+                freshness: FreshnessStore | None = None,
+                skip: set[str] | None = None,
+                bulk: MarketTables | None = None) -> Iterator[tuple[End, bool | None]]:
+    """
+    依代碼順序產生 (End, is_etf)，row 從 2 起算。
+    有 freshness 時每支股票只帶適用且到期的欄位，全部未到期的股票直接略過
+    （設定檔沒指定 ETF 與否的代碼先判斷，不適用的欄位才不會每次都被當成到期）；
+    skip 內的代碼（resume 時今天已完成者）也略過；
+    有 bulk 時先由整批表填入 市盈率 / 市淨率 / 殖利率，這些欄位不再排入抓取。
+    """
+    if isinstance(codes, dict):
+        iterable = codes.items()
+    else:
+        iterable = ((c, None) for c in codes)
+
+    for idx, (code, flag) in enumerate(iterable):
+        if skip and code in skip:
+            continue
+        if freshness is None:
+            due = fields
+        else:
+            if flag is None:                    # 與 End._is_etf 相同：無法判斷時視為個股
+                flag = bool(etf_classifier.classify(code))
+            due = freshness.due(code, metric_registry.applicable(fields, flag))
+        if due:
+            stock = End(code, idx + 2, flag, due)
+            if bulk is not None:
+                bulk.fill(stock)
+            yield stock, flag
+
+
+def resume_from_snapshots(mirror: SheetMirror,
+                          codes: list[str] | dict[str, bool],
+                          fields: list[str],
+                          snapshots: SnapshotStore) -> set[str]:
+    """
+    把今天已存下的值填進鏡像並寫回（只寫有變動的儲存格），回傳可略過的代碼。
+    只覆寫快照中有的欄位，其他儲存格維持原值。
+    """
+    order = list(codes)
+    stored = snapshots.load()
+    done = snapshots.done(codes, fields)
+    if not done:
+        return done
+
+    for row, code in enumerate(order, start=2):
+        for field, value in stored.get(code, {}).items():
+            mirror.set(row, metric_registry.FIRST_COLUMN + metric_registry.FIELDS.index(field), value)
+    mirror.flush()
+    logger.info(f"[resume] 今天已完成 {len(done)} 檔，由快照寫回，略過重抓")
+    return done
+
+
+def finish_stock(mirror: SheetMirror,
+                 stock: End,
+                 freshness: FreshnessStore | None = None,
+                 snapshots: SnapshotStore | None = None) -> None:
+    """一支股票抓完：先存快照（Excel 出錯也不遺失），再寫進鏡像、記錄新鮮度。"""
+    if snapshots is not None:
+        snapshots.save(stock)
+    write_row(mirror, stock, stock.fields)
+    if freshness is not None:
+        freshness.record(stock)
+    logger.info(f"{stock.code} 完成 (row {stock.row})")
+
+
+def fetch_one(code: str, row: int, is_etf_flag: bool | None = None) -> tuple[int, list]:
+    stock = End(code, row, is_etf_flag)
     stock.judge()            # ← 網路抓取 & 解析
     data = stock._build_row()
     return row, data
 
 def update_data_parallel(session: ExcelSession,
                         codes: list[str] | dict[str, bool],
-                        max_workers: int = 6):
-    if isinstance(codes, dict):
-        iterable = codes.items()
-    else:
-        iterable = ((c, None) for c in codes)
-    
-    # 2) 建立 ThreadPoolExecutor
-    with ThreadPoolExecutor(max_workers=max_workers) as pool:
-        # 對每支股票提交任務
-        futures = {
-            pool.submit(fetch_one, code, idx + 2):  (code, idx + 2)
-            for idx, (code, _) in enumerate(iterable)
-        }
-
-        # 3) 依完成順序寫入 Excel
-        for future in as_completed(futures):
-            row, data = future.result()          # 取 (row, list)
-            addr = f"P{row}:AN{row}"
-            session.range(addr).value = data
-            logger.info(f"{futures[future][0]} 寫入完成 (row {row})")
+                        max_workers: int = 24,
+                        columns: list[str] | None = None,
+                        freshness: FreshnessStore | None = None,
+                        snapshots: SnapshotStore | None = None,
+                        resume: bool = False,
+                        bulk: MarketTables | None = None):
+    """
+    所有股票的所有頁面丟進同一個 CrawlScheduler，
+    max_workers 即整次執行的執行緒總數；P:AN 先讀成鏡像，
+    每完成 FLUSH_ROWS 支股票把變動的儲存格合併寫回一次（中途出錯也會寫回已完成的列）。
+    columns 指定只更新哪些欄位（metric_registry.FIELDS 的子集），其餘頁面不抓、欄位不動。
+    freshness 指定時為增量模式：只重抓到期的 (code, 欄位)，也只寫回那些儲存格。
+    snapshots 指定時每完成一支就存檔；resume=True 時今天已完成的代碼由快照寫回、不再重抓。
+    bulk 指定時 市盈率 / 市淨率 / 殖利率 由全市場整批表填入，表中沒有的代碼才逐檔抓。
+    """
+    fields = metric_registry.select(columns)
+    mirror = history_mirror(session, codes)
+    skip = resume_from_snapshots(mirror, codes, fields, snapshots) if snapshots and resume else None
+    stocks = iter_stocks(codes, fields, freshness, skip, bulk)
+
+    # 依完成順序寫進鏡像，定期合併寫回 Excel
+    try:
+        for n, stock in enumerate(CrawlScheduler(fetch_html, max_workers=max_workers).run(stocks), 1):
+            finish_stock(mirror, stock, freshness, snapshots)
+            if n % FLUSH_ROWS == 0:
+                mirror.flush()
+    finally:
+        mirror.flush()
+    logger.info(f"[excel] 歷史資料 COM 呼叫 {mirror.com_calls} 次")
+
+    if freshness is not None:
+        freshness.log_summary()
+    if bulk is not None:
+        bulk.log_summary()
 
     session.autofit()
     session.save()
-
+    http_client.log_stats()     # 每個 host 的請求數 / 實際連線數
+    rate_limiter.log_rates()    # 每個 host 收斂到的抓取速度
 
 
 
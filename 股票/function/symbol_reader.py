@@ -0,0 +1,215 @@
+# symbol_reader.py
+"""
+讀取股票清單（讀取檔 B 欄）：只串流解析目標工作表的 XML、只看 B 欄、遇到第一個空白格就停止，
+結果依 (檔案路徑, 工作表, mtime, 檔案大小) 快取在 .cache/symbols.json。
+
+- 清單沒有變動時完全不開啟活頁簿
+- 不經過 openpyxl 的 load_workbook：read_only 模式仍會逐一掃過每個工作表的尺寸，
+  每檔一張工作表的大活頁簿光開檔就要數秒；這裡直接從 zip 取出目標工作表
+- 第 1 列視為表頭（與 pd.read_excel 的預設相同）
+- 數字格式的代碼轉成整數字串（2330.0 → "2330"），文字代碼（"0050"）原樣保留
+- 非 .xlsx / .xlsm 或 XML 結構不如預期時退回 openpyxl，再不行退回 pd.read_excel
+
+使用範例：
+    symbols = read_symbols("讀取.xlsx", "工作表1")
+"""
+from __future__ import annotations
+
+import json
+import logging
+import posixpath
+import re
+import threading
+import zipfile
+from pathlib import Path
+from typing import Any, Iterator
+from xml.etree import ElementTree as ET
+
+from .excel_utils import column_letter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE = Path(".cache/symbols.json")
+COLUMN = 2                     # B 欄
+_lock = threading.Lock()
+
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+_CELL_REF = re.compile(r"^([A-Z]+)(\d+)$")
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _blank(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _sheet_part(zf: zipfile.ZipFile, sheet: str) -> str:
+    """工作表名稱 → zip 內的 XML 路徑（xl/workbook.xml + 關聯檔）。"""
+    book = ET.fromstring(zf.read("xl/workbook.xml"))
+    rid = next((s.get(_REL_ID) for s in book.iter(f"{_NS}sheet") if s.get("name") == sheet), None)
+    if rid is None:
+        raise KeyError(f"找不到工作表 {sheet}")
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    target = next(r.get("Target") for r in rels if r.get("Id") == rid)
+    return target.lstrip("/") if target.startswith("/") else posixpath.normpath(f"xl/{target}")
+
+
+def _iter_cells(zf: zipfile.ZipFile, part: str, letter: str) -> Iterator[tuple[int, str | None, str | None]]:
+    """串流產生該欄的 (列號, 型別, 原始值)；逐列清除已解析的元素，記憶體只留一列。"""
+    with zf.open(part) as fp:
+        for _, elem in ET.iterparse(fp):
+            if elem.tag != f"{_NS}c":
+                if elem.tag == f"{_NS}row":
+                    elem.clear()
+                continue
+            m = _CELL_REF.match(elem.get("r", ""))
+            if m is None:
+                raise ValueError("儲存格沒有位址")        # 少見的省略寫法 → 交給 openpyxl
+            if m.group(1) == letter:
+                kind = elem.get("t")
+                if kind == "inlineStr":
+                    raw = "".join(t.text or "" for t in elem.iter(f"{_NS}t"))
+                else:
+                    v = elem.find(f"{_NS}v")
+                    raw = v.text if v is not None else None
+                yield int(m.group(2)), kind, raw
+
+
+def _shared_strings(zf: zipfile.ZipFile, wanted: set[int]) -> dict[int, str]:
+    """只取需要的共用字串；讀到最大索引就停止。"""
+    if not wanted or "xl/sharedStrings.xml" not in zf.namelist():
+        return {}
+    out: dict[int, str] = {}
+    last = max(wanted)
+    with zf.open("xl/sharedStrings.xml") as fp:
+        i = 0
+        for _, elem in ET.iterparse(fp):
+            if elem.tag != f"{_NS}si":
+                continue
+            if i in wanted:
+                out[i] = "".join(t.text or "" for t in elem.iter(f"{_NS}t"))
+            elem.clear()
+            if i >= last:
+                break
+            i += 1
+    return out
+
+
+def _scan_xlsx(file: str | Path, sheet: str, column: int) -> list[str]:
+    letter = column_letter(column)
+    cells: list[tuple[str | None, str]] = []
+    with zipfile.ZipFile(file) as zf:
+        expected = 2
+        for row, kind, raw in _iter_cells(zf, _sheet_part(zf, sheet), letter):
+            if row < expected:                     # 表頭
+                continue
+            if row > expected or raw is None or not raw.strip():
+                break                              # 第一個空白格
+            cells.append((kind, raw))
+            expected += 1
+        strings = _shared_strings(zf, {int(raw) for kind, raw in cells if kind == "s"})
+
+    symbols = []
+    for kind, raw in cells:
+        if kind == "s":
+            value: Any = strings[int(raw)]
+        elif kind in ("str", "inlineStr", "b", "e"):
+            value = raw
+        else:
+            value = float(raw)                     # 數值儲存格
+        if _blank(value):
+            break
+        symbols.append(_text(value))
+    return symbols
+
+
+def scan_column(file: str | Path, sheet: str, column: int = COLUMN) -> list[str]:
+    """讀取某欄第 2 列起的值，直到第一個空白格。"""
+    if Path(file).suffix.lower() in (".xlsx", ".xlsm"):
+        try:
+            return _scan_xlsx(file, sheet, column)
+        except KeyError:
+            raise
+        except Exception as exc:  # noqa: BLE001 — 結構不如預期，交給 openpyxl
+            logger.debug(f"[symbols] 直接解析 {file} 失敗（{exc}），改用 openpyxl")
+    return _scan_openpyxl(file, sheet, column)
+
+
+def _scan_openpyxl(file: str | Path, sheet: str, column: int) -> list[str]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        return _scan_pandas(file, sheet, column)
+
+    try:
+        wb = load_workbook(file, read_only=True, data_only=True)
+    except Exception as exc:  # noqa: BLE001 — .xls 等 openpyxl 不支援的格式
+        logger.debug(f"[symbols] openpyxl 無法開啟 {file}（{exc}），改用 pandas")
+        return _scan_pandas(file, sheet, column)
+    try:
+        ws = wb[sheet]
+        symbols: list[str] = []
+        for (value,) in ws.iter_rows(min_row=2, min_col=column, max_col=column, values_only=True):
+            if _blank(value):
+                break
+            symbols.append(_text(value))
+        return symbols
+    finally:
+        wb.close()                                 # read_only 模式會保留檔案 handle
+
+
+def _scan_pandas(file: str | Path, sheet: str, column: int) -> list[str]:
+    import pandas as pd
+
+    df = pd.read_excel(file, sheet, usecols=[column - 1], dtype=object)
+    symbols: list[str] = []
+    for value in df.iloc[:, 0]:
+        if _blank(value) or value != value:        # NaN
+            break
+        symbols.append(_text(value))
+    return symbols
+
+
+def _load_cache(path: Path) -> dict[str, Any]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def read_symbols(file: str | Path,
+                 sheet: str,
+                 cache_path: str | Path | None = DEFAULT_CACHE) -> list[str]:
+    """
+    回傳讀取檔 B 欄的代碼清單；cache_path=None 時不使用快取。
+    檔案的 mtime 或大小改變才會重新讀取。
+    """
+    src = Path(file).resolve()
+    stat = src.stat()
+    key = f"{src}::{sheet}"
+    stamp = [stat.st_mtime_ns, stat.st_size]
+
+    if cache_path is None:
+        return scan_column(src, sheet)
+
+    cache_path = Path(cache_path)
+    with _lock:
+        cache = _load_cache(cache_path)
+        entry = cache.get(key)
+        if entry and entry.get("stamp") == stamp:
+            logger.debug(f"[symbols] {src.name}/{sheet} 未變動，使用快取 {len(entry['symbols'])} 檔")
+            return list(entry["symbols"])
+
+        symbols = scan_column(src, sheet)
+        cache[key] = {"stamp": stamp, "symbols": symbols}
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(cache, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(cache_path)                    # 中途中斷不會留下半個檔案
+    logger.info(f"[symbols] 讀取 {src.name}/{sheet}：{len(symbols)} 檔")
+    return symbols
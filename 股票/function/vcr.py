@@ -0,0 +1,236 @@
+# vcr.py
+"""
+錄製 / 重播模式（VCR）：把一次執行看到的所有回應存成單一壓縮檔，之後完全不連網地重跑同一天的抓取。
+
+- record：http_client.get（fetch_html、etf_classifier、code_table、market_tables 都經過這裡）、
+  asyncio 引擎的請求與 twstock.realtime.get 的結果，依序存進 SQLite（內容以 zlib 壓縮）
+- replay：同一個 key 依錄製順序回傳（重試 → 同樣先失敗再成功），用完後重複最後一筆；
+  錄影帶沒有的請求擲出 ReplayMiss，不會退回連網；重播時也不經 rate_limiter，不必等待限流
+- key 是原始 URL（http_client hosts 改寫之前）或 "函式名:參數 JSON"
+- 錄製 / 重播時 read.run 會停用頁面快取，確保每個請求都進到錄影帶
+
+使用範例：
+    vcr.configure(mode="record", path=".cache/vcr/{date}.sqlite")   # {date} → 今天 YYYYMMDD
+    ...                                                              # 照常執行 read.run
+    vcr.configure(mode="replay", path=".cache/vcr/20240102.sqlite")
+    vcr.close()                                                      # 印出重播 / 缺少筆數
+"""
+from __future__ import annotations
+
+import builtins
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "record", "replay")
+DEFAULT_PATH = ".cache/vcr/{date}.sqlite"
+_KEEP_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Retry-After")
+
+
+class ReplayMiss(ConnectionError):
+    """重播模式下錄影帶沒有這個請求。"""
+
+
+@dataclass
+class RecordedResponse:
+    """與 requests.Response 相容的最小介面（同 http_cache.CachedResponse，另有 json()）。"""
+    url: str
+    status_code: int
+    content: bytes
+    headers: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class Cassette:
+    """
+    Parameters
+    ----------
+    path : str | Path
+        錄影帶（SQLite）路徑。
+    mode : {"record", "replay"}
+        record 會清空舊內容重新錄製；replay 時檔案必須存在。
+    """
+
+    def __init__(self, path: str | Path, mode: str) -> None:
+        self.path = Path(path)
+        self.mode = mode
+        if mode == "replay" and not self.path.exists():
+            raise FileNotFoundError(f"找不到錄影帶 {self.path}（先以 mode=record 執行一次）")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")      # 每筆 commit 不 fsync，錄製不拖慢抓取
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key     TEXT NOT NULL,
+                seq     INTEGER NOT NULL,              -- 同一 key 的第幾次（0 起）
+                status  INTEGER,                       -- HTTP 狀態碼；函式結果為 NULL
+                headers TEXT,
+                body    BLOB NOT NULL,                 -- zlib 壓縮
+                PRIMARY KEY (key, seq)
+            )"""
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)")
+        if mode == "record":
+            self._db.execute("DELETE FROM entries")
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('recorded_at', ?)",
+                             (time.strftime("%Y-%m-%d %H:%M:%S"),))
+        self._db.commit()
+        self._seq: dict[str, int] = defaultdict(int)
+        self.counts = {"recorded": 0, "replayed": 0, "missed": 0}
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    # ---------- 底層存取 ----------
+    def _put(self, key: str, status: int | None, headers: dict[str, str] | None, content: bytes) -> None:
+        with self._lock:
+            seq = self._seq[key]
+            self._seq[key] += 1
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, seq, status, json.dumps(headers) if headers is not None else None,
+                 zlib.compress(content, 6)),
+            )
+            self._db.commit()
+            self.counts["recorded"] += 1
+
+    def _take(self, key: str) -> tuple[int | None, dict[str, str], bytes]:
+        """依錄製順序取下一筆；用完後重複最後一筆。"""
+        with self._lock:
+            seq = self._seq[key]
+            row = self._db.execute(
+                "SELECT status, headers, body FROM entries WHERE key = ? AND seq <= ? "
+                "ORDER BY seq DESC LIMIT 1", (key, seq),
+            ).fetchone()
+            if row is None:
+                self.counts["missed"] += 1
+                raise ReplayMiss(f"錄影帶沒有 {key}")
+            self._seq[key] += 1
+            self.counts["replayed"] += 1
+        status, headers, body = row
+        return status, json.loads(headers) if headers else {}, zlib.decompress(body)
+
+    # ---------- HTTP 回應 ----------
+    def record(self, url: str, resp: Any) -> None:
+        """存下 requests / httpx 的回應。"""
+        headers = {k: resp.headers[k] for k in _KEEP_HEADERS if resp.headers.get(k) is not None}
+        self._put(url, resp.status_code, headers, resp.content)
+
+    def replay(self, url: str) -> RecordedResponse:
+        status, headers, content = self._take(url)
+        return RecordedResponse(url, status or 200, content, headers)
+
+    # ---------- 函式結果 ----------
+    def record_call(self, key: str, value: Any = None, error: BaseException | None = None) -> None:
+        """存下 JSON 可序列化的回傳值，或擲出的例外（類別名稱與訊息）。"""
+        if error is not None:
+            args = error.args
+            message = args[0] if len(args) == 1 and isinstance(args[0], str) else str(error)
+            payload = {"error": [type(error).__name__, message]}
+        else:
+            payload = {"value": value}
+        self._put(key, None, None, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+    def replay_call(self, key: str) -> Any:
+        """回傳錄下的值；錄下的是例外時重新擲出（內建例外保留原類別，其餘以 RuntimeError）。"""
+        _, _, content = self._take(key)
+        payload = json.loads(content)
+        if "error" in payload:
+            name, message = payload["error"]
+            exc_type = getattr(builtins, name, None)
+            if not (isinstance(exc_type, type) and issubclass(exc_type, Exception)):
+                exc_type = RuntimeError
+            raise exc_type(message)
+        return payload["value"]
+
+    # ---------- 報表 ----------
+    def log_summary(self) -> None:
+        c = self.counts
+        if self.mode == "record":
+            size = self.path.stat().st_size / 1024 / 1024 if self.path.exists() else 0
+            logger.info(f"[vcr] 已錄製 {c['recorded']} 筆 → {self.path}（{size:.1f} MB）")
+        else:
+            logger.info(f"[vcr] 重播 {c['replayed']} 筆，錄影帶缺少 {c['missed']} 筆（{self.path}）")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.commit()
+            if self.mode == "record":
+                self._db.execute("VACUUM")               # 清掉上次錄製刪除後留下的空頁
+            self._db.close()
+
+
+# ──────────────────────────────
+# 模組層級共用實例
+# ──────────────────────────────
+_cassette: Cassette | None = None
+_cassette_lock = threading.Lock()
+
+
+def configure(mode: str = "off", path: str | Path = DEFAULT_PATH) -> Cassette | None:
+    """依 setting.json 的 "vcr" 區塊設定；mode=off 時不錄也不重播。path 中的 {date} 換成今天。"""
+    global _cassette
+    if mode not in MODES:
+        raise ValueError(f"未知的 vcr mode：{mode}（可用：{'、'.join(MODES)}）")
+    with _cassette_lock:
+        if _cassette is not None:
+            _cassette.close()
+        _cassette = None
+        if mode != "off":
+            _cassette = Cassette(str(path).format(date=date.today().strftime("%Y%m%d")), mode)
+            logger.info(f"[vcr] {mode}：{_cassette.path}")
+        return _cassette
+
+
+def active() -> Cassette | None:
+    """目前的錄影帶；未啟用時為 None。"""
+    return _cassette
+
+
+def call(name: str, args: Any, fn: Callable[[], Any]) -> Any:
+    """
+    經錄影帶呼叫 fn()：未啟用 → 直接呼叫；record → 呼叫並存下結果（含例外）；
+    replay → 不呼叫 fn，回傳錄下的結果。key 為 "name:args 的 JSON"。
+    """
+    tape = _cassette
+    if tape is None:
+        return fn()
+    key = f"{name}:{json.dumps(args, ensure_ascii=False)}"
+    if tape.replaying:
+        return tape.replay_call(key)
+    try:
+        value = fn()
+    except Exception as exc:
+        tape.record_call(key, error=exc)
+        raise
+    tape.record_call(key, value)
+    return value
+
+
+def close() -> None:
+    """印出摘要並關閉錄影帶（read.run 結束時呼叫）。"""
+    global _cassette
+    with _cassette_lock:
+        if _cassette is not None:
+            _cassette.log_summary()
+            _cassette.close()
+            _cassette = None
@@ -1,2 +1,19 @@
-import twstock
-twstock.__update_codes()
+"""
+手動強制更新本機上市櫃代碼表（.cache/codes.json）。
+平常不需要執行：code_table 會在代碼表超過 max_age_days 時於背景自動更新。
+
+用法：
+    python 股票/update.py
+"""
+import logging
+import sys
+from pathlib import Path
+
+# 讓本模組可以從 CLI 執行
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+# ──────────────────────────────
+from 股票.function import code_table
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    code_table.get_table().refresh()